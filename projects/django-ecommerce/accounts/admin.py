@@ -5,11 +5,12 @@ Admin configuration for accounts app.
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
+from ecommerce.admin_changelist import LargeTableAdminMixin
 from .models import User, UserProfile, Address
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     """
     Custom User admin.
     """
@@ -36,7 +37,7 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     User Profile admin.
     """
@@ -44,10 +45,12 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
     search_fields = ('user__email', 'user__first_name', 'user__last_name', 'location')
     readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
 
 
 @admin.register(Address)
-class AddressAdmin(admin.ModelAdmin):
+class AddressAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Address admin.
     """
@@ -55,6 +58,8 @@ class AddressAdmin(admin.ModelAdmin):
     list_filter = ('address_type', 'is_default', 'country', 'created_at')
     search_fields = ('user__email', 'first_name', 'last_name', 'city', 'state', 'postal_code')
     readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
     
     fieldsets = (
         (_('User'), {'fields': ('user', 'address_type', 'is_default')}),
@@ -17,6 +17,8 @@ from datetime import timedelta
 import uuid
 
 from .models import User, UserProfile, Address
+from cart.stores import merge_guest_cart
+from orders.models import CustomerStats
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer,
     UserProfileUpdateSerializer, UserProfileDetailSerializer, AddressSerializer,
@@ -41,6 +43,7 @@ class UserRegistrationView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        merge_guest_cart(request, user)
         
         # Generate JWT tokens
         refresh = RefreshToken.for_user(user)
@@ -69,6 +72,7 @@ class UserLoginView(TokenObtainPairView):
         serializer.is_valid(raise_exception=True)
         
         user = serializer.validated_data['user']
+        merge_guest_cart(request, user)
         refresh = RefreshToken.for_user(user)
         
         return Response({
@@ -233,7 +237,9 @@ def user_dashboard_view(request):
     user = request.user
     
     # Get user's recent orders
-    recent_orders = user.orders.all()[:5]
+    recent_orders = user.orders.only(
+        'id', 'order_number', 'status', 'total_amount', 'created_at'
+    )[:5]
     
     # Get user's addresses
     addresses = Address.objects.filter(user=user)[:3]
@@ -254,5 +260,5 @@ def user_dashboard_view(request):
         ],
         'addresses': AddressSerializer(addresses, many=True).data,
         'wishlist_count': user.wishlist.count(),
-        'orders_count': user.orders.count()
+        'orders_count': CustomerStats.objects.for_user(user).total_orders
     })
\ No newline at end of file
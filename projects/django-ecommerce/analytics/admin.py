@@ -0,0 +1,22 @@
+from django.contrib import admin
+from ecommerce.admin_changelist import LargeTableAdminMixin
+from .models import CountedOrder, DailySales
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'date', 'dimension', 'key', 'units', 'revenue', 'discount', 'orders', 'updated_at'
+    )
+    list_filter = ('dimension', 'date')
+    search_fields = ('key',)
+    date_hierarchy = 'date'
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(CountedOrder)
+class CountedOrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('order_id', 'date', 'created_at')
+    list_filter = ('date',)
+    search_fields = ('order_id',)
+    readonly_fields = ('created_at',)
@@ -0,0 +1,17 @@
+"""
+Outbox handlers keeping the daily sales rollups current.
+"""
+
+from outbox.events import handler
+
+from . import rollups
+
+
+@handler('order.created')
+@handler('order.status_changed')
+def record_order_sales(event):
+    """
+    Add a placed order to the rollups, or remove it once it is cancelled
+    or refunded. ``record_order`` is idempotent, so redelivery is safe.
+    """
+    rollups.record_order(int(event.aggregate_id))
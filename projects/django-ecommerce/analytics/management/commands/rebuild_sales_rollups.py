@@ -0,0 +1,65 @@
+"""
+Management command to rebuild the daily sales rollups.
+"""
+
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from analytics import rollups
+from analytics.tasks import rebuild_in_parallel
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily sales rollups for a date range from the orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='First day to rebuild (YYYY-MM-DD), defaults to the first order',
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last day to rebuild (YYYY-MM-DD), defaults to today',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=settings.ANALYTICS_REBUILD_CHUNK_DAYS,
+            help='Number of days rebuilt per transaction',
+        )
+        parser.add_argument(
+            '--parallel',
+            action='store_true',
+            help='Queue the chunks as Celery tasks instead of running them here',
+        )
+
+    def handle(self, *args, **options):
+        start = options['start'] or rollups.first_order_date()
+        end = options['end'] or timezone.localdate()
+        if start is None:
+            self.stdout.write('No orders to roll up')
+            return
+        if start > end:
+            raise CommandError('--start must not be after --end')
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        chunks = rollups.date_chunks(start, end, options['chunk_days'])
+        if options['parallel']:
+            rebuild_in_parallel(start, end, options['chunk_days'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Queued {len(chunks)} rebuild tasks from {start} to {end}')
+            )
+            return
+
+        counted = 0
+        for first, last in chunks:
+            counted += rollups.rebuild(first, last)
+            self.stdout.write(f'Rebuilt {first} to {last}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt daily sales from {start} to {end}: {counted} orders')
+        )
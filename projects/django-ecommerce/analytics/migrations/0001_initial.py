@@ -0,0 +1,107 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CountedOrder",
+            fields=[
+                (
+                    "order_id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="order id"
+                    ),
+                ),
+                ("date", models.DateField(db_index=True, verbose_name="date")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Counted Order",
+                "verbose_name_plural": "Counted Orders",
+                "db_table": "daily_sales_orders",
+            },
+        ),
+        migrations.CreateModel(
+            name="DailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="date")),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("total", "Total"),
+                            ("product", "Product"),
+                            ("category", "Category"),
+                            ("brand", "Brand"),
+                            ("coupon", "Coupon"),
+                        ],
+                        max_length=20,
+                        verbose_name="dimension",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(blank=True, max_length=50, verbose_name="key"),
+                ),
+                ("units", models.BigIntegerField(default=0, verbose_name="units")),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="revenue",
+                    ),
+                ),
+                (
+                    "discount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="discount",
+                    ),
+                ),
+                ("orders", models.BigIntegerField(default=0, verbose_name="orders")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Sales",
+                "verbose_name_plural": "Daily Sales",
+                "db_table": "daily_sales",
+                "ordering": ["-date"],
+                "indexes": [
+                    models.Index(
+                        fields=["dimension", "date"],
+                        name="daily_sales_dimension_date_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "key", "date"), name="daily_sales_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+"""
+Sales analytics models for the e-commerce platform.
+"""
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class DailySales(models.Model):
+    """
+    Sales of one product, category, brand or coupon (or the whole store)
+    on one day.
+
+    ``revenue`` is the value of the items sold before order discounts and
+    ``discount`` the share of order discounts allocated to them, so net
+    revenue is ``revenue - discount``. ``orders`` counts the orders that
+    contributed. Cancelled and refunded orders are not included.
+    """
+    DIMENSION_CHOICES = [
+        ('total', _('Total')),
+        ('product', _('Product')),
+        ('category', _('Category')),
+        ('brand', _('Brand')),
+        ('coupon', _('Coupon')),
+    ]
+
+    date = models.DateField(_('date'))
+    dimension = models.CharField(_('dimension'), max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(_('key'), max_length=50, blank=True)
+    units = models.BigIntegerField(_('units'), default=0)
+    revenue = models.DecimalField(_('revenue'), max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(_('discount'), max_digits=14, decimal_places=2, default=0)
+    orders = models.BigIntegerField(_('orders'), default=0)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Daily Sales')
+        verbose_name_plural = _('Daily Sales')
+        db_table = 'daily_sales'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dimension', 'key', 'date'],
+                name='daily_sales_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'date'], name='daily_sales_dimension_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.dimension} {self.key}: {self.revenue}"
+
+    @property
+    def net_revenue(self):
+        return self.revenue - self.discount
+
+
+class CountedOrder(models.Model):
+    """
+    An order whose sales are currently included in ``DailySales``.
+
+    Recording an order is idempotent: it is added to the rollups only if it
+    is not counted yet, and subtracted only if it is.
+    """
+    order_id = models.BigIntegerField(_('order id'), primary_key=True)
+    date = models.DateField(_('date'), db_index=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Counted Order')
+        verbose_name_plural = _('Counted Orders')
+        db_table = 'daily_sales_orders'
+
+    def __str__(self):
+        return f"Order {self.order_id} ({self.date})"
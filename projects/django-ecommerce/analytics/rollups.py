@@ -0,0 +1,281 @@
+"""
+Daily sales rollups.
+
+Every order that is not cancelled or refunded adds its items to
+``DailySales`` rows for the day it was placed: one per product, category
+and brand it contains, one for its coupon and one for the store total.
+``record_order`` keeps the rollups current as orders are placed and change
+status; ``rebuild`` recomputes a date range from the live and archived
+order tables. Reports read only the rollups.
+"""
+
+import itertools
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Min, Sum
+from django.utils import timezone
+
+from .models import CountedOrder, DailySales
+
+logger = logging.getLogger(__name__)
+
+# Orders in these states are not sales.
+EXCLUDED_ORDER_STATUSES = ['cancelled', 'refunded']
+
+ITEM_DIMENSIONS = ['product', 'category', 'brand']
+
+ITEM_FIELDS = [
+    'order_id', 'order__created_at', 'order__subtotal', 'order__discount_amount',
+    'order__coupon_code', 'product_id', 'product__category_id', 'product__brand_id',
+    'quantity', 'total_price',
+]
+
+CENT = Decimal('0.01')
+
+
+def _item_rows(item_model, **filters):
+    return item_model.objects.filter(**filters).order_by('order_id').values_list(
+        *ITEM_FIELDS, named=True
+    )
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _add(totals, key, units, revenue, discount):
+    entry = totals[key]
+    entry[0] += units
+    entry[1] += revenue
+    entry[2] += discount
+
+
+def contributions(rows):
+    """
+    Fold item rows ordered by order id into daily totals.
+
+    Returns ``(totals, days)``: ``totals`` maps ``(date, dimension, key)``
+    to ``[units, revenue, discount, orders]`` and ``days`` maps each order
+    id to the day it counts for.
+    """
+    totals = defaultdict(lambda: [0, Decimal('0'), Decimal('0'), 0])
+    days = {}
+    for order_id, items in itertools.groupby(rows, key=lambda row: row.order_id):
+        items = list(items)
+        order = items[0]
+        day = timezone.localtime(order.order__created_at).date()
+        subtotal = order.order__subtotal
+        days[order_id] = day
+
+        keys = set()
+        for item in items:
+            share = Decimal('0')
+            if subtotal:
+                share = (order.order__discount_amount * item.total_price / subtotal).quantize(CENT)
+            for dimension, key in zip(
+                ITEM_DIMENSIONS,
+                (item.product_id, item.product__category_id, item.product__brand_id)
+            ):
+                if key is not None:
+                    keys.add((day, dimension, str(key)))
+                    _add(totals, (day, dimension, str(key)), item.quantity, item.total_price, share)
+
+        order_keys = {(day, 'total', '')}
+        if order.order__coupon_code:
+            order_keys.add((day, 'coupon', order.order__coupon_code))
+        for key in order_keys:
+            _add(
+                totals, key,
+                sum(item.quantity for item in items),
+                sum(item.total_price for item in items),
+                order.order__discount_amount
+            )
+        for key in keys | order_keys:
+            totals[key][3] += 1
+    return totals, days
+
+
+def _add_to_rollups(totals, sign=1):
+    """
+    Add (or with ``sign=-1`` subtract) totals to ``DailySales`` with one
+    INSERT ... ON CONFLICT statement.
+    """
+    if not totals:
+        return
+    quote = connection.ops.quote_name
+    table = quote(DailySales._meta.db_table)
+    columns = ['date', 'dimension', 'key', 'units', 'revenue', 'discount', 'orders', 'updated_at']
+    now = timezone.now()
+    params = []
+    for (day, dimension, key), (units, revenue, discount, orders) in totals.items():
+        params.extend([
+            day, dimension, key, sign * units, sign * revenue, sign * discount,
+            sign * orders, now,
+        ])
+    row = f"({', '.join(['%s'] * len(columns))})"
+    counters = ', '.join(
+        f'{quote(column)} = {table}.{quote(column)} + excluded.{quote(column)}'
+        for column in ['units', 'revenue', 'discount', 'orders']
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) "
+            f"VALUES {', '.join([row] * len(totals))} "
+            f"ON CONFLICT ({quote('dimension')}, {quote('key')}, {quote('date')}) "
+            f"DO UPDATE SET {counters}, {quote('updated_at')} = excluded.{quote('updated_at')}",
+            params
+        )
+
+
+def record_order(order_id):
+    """
+    Bring the rollups in line with the current status of ``order_id``.
+
+    Adds the order if it counts as a sale and is not counted yet, and
+    subtracts it if it is counted but was cancelled or refunded since.
+    Returns 1, -1 or 0 for added, subtracted or unchanged.
+    """
+    from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+    with transaction.atomic():
+        # Locking the order serializes concurrent updates of its sales.
+        item_model = OrderItem
+        status = Order.objects.select_for_update().filter(
+            pk=order_id
+        ).values_list('status', flat=True).first()
+        if status is None:
+            item_model = ArchivedOrderItem
+            status = ArchivedOrder.objects.filter(
+                pk=order_id
+            ).values_list('status', flat=True).first()
+
+        counts = status is not None and status not in EXCLUDED_ORDER_STATUSES
+        counted = CountedOrder.objects.filter(order_id=order_id).exists()
+        if counts == counted:
+            return 0
+
+        totals, days = contributions(_item_rows(item_model, order_id=order_id))
+        if counts:
+            if not days:
+                return 0
+            _add_to_rollups(totals)
+            CountedOrder.objects.create(order_id=order_id, date=days[order_id])
+            return 1
+        _add_to_rollups(totals, sign=-1)
+        CountedOrder.objects.filter(order_id=order_id).delete()
+        return -1
+
+
+def rebuild(start, end, batch_size=2000):
+    """
+    Recompute the rollups of the days from ``start`` to ``end`` inclusive
+    from the live and archived orders.
+
+    Returns the number of orders counted.
+    """
+    from orders.models import ArchivedOrderItem, OrderItem
+
+    filters = {
+        'order__created_at__gte': _day_start(start),
+        'order__created_at__lt': _day_start(end + timedelta(days=1)),
+    }
+    rows = itertools.chain.from_iterable(
+        _item_rows(item_model, **filters).exclude(
+            order__status__in=EXCLUDED_ORDER_STATUSES
+        ).iterator(chunk_size=batch_size)
+        for item_model in (OrderItem, ArchivedOrderItem)
+    )
+
+    with transaction.atomic():
+        DailySales.objects.filter(date__range=(start, end)).delete()
+        CountedOrder.objects.filter(date__range=(start, end)).delete()
+        totals, days = contributions(rows)
+        DailySales.objects.bulk_create(
+            [
+                DailySales(
+                    date=day, dimension=dimension, key=key, units=units,
+                    revenue=revenue, discount=discount, orders=orders
+                )
+                for (day, dimension, key), (units, revenue, discount, orders) in totals.items()
+            ],
+            batch_size=batch_size,
+        )
+        CountedOrder.objects.bulk_create(
+            [CountedOrder(order_id=order_id, date=day) for order_id, day in days.items()],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['order_id'],
+            update_fields=['date'],
+        )
+
+    logger.info("Rebuilt daily sales from %s to %s: %s orders", start, end, len(days))
+    return len(days)
+
+
+def first_order_date():
+    """
+    Return the day of the oldest live or archived order, or ``None``.
+    """
+    from orders.models import ArchivedOrder, Order
+
+    dates = [
+        model.objects.aggregate(first=Min('created_at'))['first']
+        for model in (Order, ArchivedOrder)
+    ]
+    dates = [value for value in dates if value is not None]
+    return timezone.localtime(min(dates)).date() if dates else None
+
+
+def date_chunks(start, end, chunk_days):
+    """
+    Split the days from ``start`` to ``end`` inclusive into
+    ``(first, last)`` ranges of at most ``chunk_days`` days.
+    """
+    chunks = []
+    while start <= end:
+        last = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start, last))
+        start = last + timedelta(days=1)
+    return chunks
+
+
+def sales_by_key(dimension, start, end, limit=None):
+    """
+    Total sales per key of ``dimension`` from ``start`` to ``end``, best
+    selling first.
+    """
+    queryset = DailySales.objects.filter(
+        dimension=dimension, date__range=(start, end)
+    ).values('key').annotate(
+        units=Sum('units'),
+        revenue=Sum('revenue'),
+        discount=Sum('discount'),
+        orders=Sum('orders'),
+    ).order_by('-revenue', 'key')
+    return queryset[:limit] if limit else queryset
+
+
+def daily_sales(dimension, start, end, key=''):
+    """
+    Sales of one key of ``dimension`` for every day from ``start`` to
+    ``end``, with zeros for days without sales.
+    """
+    rows = {
+        row['date']: row
+        for row in DailySales.objects.filter(
+            dimension=dimension, key=key, date__range=(start, end)
+        ).values('date', 'units', 'revenue', 'discount', 'orders')
+    }
+    series = []
+    day = start
+    while day <= end:
+        series.append(rows.get(day) or {
+            'date': day, 'units': 0, 'revenue': Decimal('0'),
+            'discount': Decimal('0'), 'orders': 0,
+        })
+        day += timedelta(days=1)
+    return series
@@ -0,0 +1,56 @@
+"""
+Serializers for the analytics app.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import DailySales
+
+
+class SalesQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the sales reports.
+    """
+    dimension = serializers.ChoiceField(choices=DailySales.DIMENSION_CHOICES, default='total')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    key = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    limit = serializers.IntegerField(min_value=1, max_value=1000, required=False, default=50)
+
+    def validate(self, attrs):
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=29))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('start must not be after end.')
+        if (attrs['end'] - attrs['start']).days >= settings.ANALYTICS_MAX_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f'The range must not exceed {settings.ANALYTICS_MAX_RANGE_DAYS} days.'
+            )
+        return attrs
+
+
+class SalesTotalsSerializer(serializers.Serializer):
+    """
+    Sales figures of one key or day.
+    """
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    net_revenue = serializers.SerializerMethodField()
+    orders = serializers.IntegerField()
+
+    def get_net_revenue(self, obj):
+        return f"{obj['revenue'] - obj['discount']:.2f}"
+
+
+class SalesByKeySerializer(SalesTotalsSerializer):
+    key = serializers.CharField()
+    name = serializers.CharField()
+
+
+class DailySalesSerializer(SalesTotalsSerializer):
+    date = serializers.DateField()
@@ -0,0 +1,43 @@
+"""
+Background tasks for sales analytics.
+"""
+
+from datetime import date, timedelta
+
+from celery import group, shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from . import rollups
+
+
+@shared_task
+def rebuild_sales_rollups(start, end):
+    """
+    Recompute the rollups of the days from ``start`` to ``end`` (ISO dates).
+    """
+    return rollups.rebuild(date.fromisoformat(start), date.fromisoformat(end))
+
+
+def rebuild_in_parallel(start, end, chunk_days=None):
+    """
+    Queue one ``rebuild_sales_rollups`` task per chunk of days so workers
+    rebuild the range in parallel.
+    """
+    chunk_days = chunk_days or settings.ANALYTICS_REBUILD_CHUNK_DAYS
+    return group(
+        rebuild_sales_rollups.s(first.isoformat(), last.isoformat())
+        for first, last in rollups.date_chunks(start, end, chunk_days)
+    ).apply_async()
+
+
+@shared_task
+def rebuild_recent_sales_rollups():
+    """
+    Recompute the last few days, correcting any drift of the incremental
+    updates, such as orders deleted outright.
+    """
+    today = timezone.localdate()
+    return rollups.rebuild(
+        today - timedelta(days=settings.ANALYTICS_REBUILD_RECENT_DAYS), today
+    )
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('sales/', views.sales_report, name='sales_report'),
+    path('sales/daily/', views.sales_timeseries, name='sales_timeseries'),
+]
@@ -0,0 +1,75 @@
+"""
+API views for sales analytics (admin only).
+
+Reports are answered from the ``DailySales`` rollups, never from the order
+tables.
+"""
+
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from products.models import Brand, Category, Product
+from .rollups import daily_sales, sales_by_key
+from .serializers import DailySalesSerializer, SalesByKeySerializer, SalesQuerySerializer
+
+NAMED_DIMENSIONS = {
+    'product': Product,
+    'category': Category,
+    'brand': Brand,
+}
+
+
+def _names(dimension, keys):
+    model = NAMED_DIMENSIONS.get(dimension)
+    if model is None:
+        return {key: key for key in keys}
+    ids = [int(key) for key in keys]
+    return {
+        str(pk): name
+        for pk, name in model.objects.filter(pk__in=ids).values_list('pk', 'name')
+    }
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def sales_report(request):
+    """
+    Sales per product, category, brand or coupon over a date range, best
+    selling first.
+    """
+    query = SalesQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+
+    rows = list(sales_by_key(params['dimension'], params['start'], params['end'], params['limit']))
+    names = _names(params['dimension'], [row['key'] for row in rows])
+    for row in rows:
+        row['name'] = names.get(row['key'], '')
+
+    return Response({
+        'dimension': params['dimension'],
+        'start': params['start'],
+        'end': params['end'],
+        'results': SalesByKeySerializer(rows, many=True).data,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def sales_timeseries(request):
+    """
+    Daily sales of one key (or the store total) over a date range.
+    """
+    query = SalesQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+
+    series = daily_sales(params['dimension'], params['start'], params['end'], params['key'])
+    return Response({
+        'dimension': params['dimension'],
+        'key': params['key'],
+        'start': params['start'],
+        'end': params['end'],
+        'results': DailySalesSerializer(series, many=True).data,
+    })
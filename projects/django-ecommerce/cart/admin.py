@@ -4,11 +4,16 @@ Cart admin configuration for the e-commerce platform.
 
 from django.contrib import admin
 from django.utils.html import format_html
+from ecommerce.admin_changelist import LargeTableAdminMixin, UserEmailFilter
 from .models import Cart, CartItem, Wishlist
 
 
+class CartUserEmailFilter(UserEmailFilter):
+    lookup = 'cart__user__email'
+
+
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Admin interface for Cart model.
     """
@@ -19,6 +24,8 @@ class CartAdmin(admin.ModelAdmin):
     list_filter = ['created_at', 'updated_at']
     search_fields = ['user__email', 'session_key']
     readonly_fields = ['created_at', 'updated_at', 'total_items', 'total_price']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
     ordering = ['-created_at']
 
     def total_items(self, obj):
@@ -33,18 +40,21 @@ class CartAdmin(admin.ModelAdmin):
 
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Admin interface for CartItem model.
     """
     list_display = [
         'id', 'cart', 'product', 'variant', 'quantity', 'unit_price',
-        'total_price', 'created_at'
+        'total_price', 'price_changed', 'created_at'
     ]
-    list_filter = ['created_at', 'cart__user']
+    list_filter = ['created_at', 'price_changed', CartUserEmailFilter]
     search_fields = ['product__name', 'cart__user__email']
     readonly_fields = ['created_at', 'updated_at', 'unit_price', 'total_price']
-    ordering = ['-created_at']
+    # unit_price and total_price read the product and variant prices.
+    list_select_related = ['cart__user', 'product', 'variant']
+    raw_id_fields = ['cart', 'product', 'variant']
+    keyset_pagination = True
 
     def unit_price(self, obj):
         """Display unit price of item."""
@@ -58,7 +68,7 @@ class CartItemAdmin(admin.ModelAdmin):
 
 
 @admin.register(Wishlist)
-class WishlistAdmin(admin.ModelAdmin):
+class WishlistAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Admin interface for Wishlist model.
     """
@@ -66,4 +76,6 @@ class WishlistAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['user__email', 'product__name']
     readonly_fields = ['created_at']
+    list_select_related = ['user', 'product']
+    raw_id_fields = ['user', 'product']
     ordering = ['-created_at']
\ No newline at end of file
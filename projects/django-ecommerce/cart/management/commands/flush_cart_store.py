@@ -0,0 +1,40 @@
+"""
+Management command to write cached carts back to the database.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from cart.stores import get_cart_store
+
+
+class Command(BaseCommand):
+    help = 'Write pending cart changes from the cart store back to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of carts written per transaction',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing until interrupted',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between flushes when looping',
+        )
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        while True:
+            flushed = store.flush(batch_size=options['batch_size'])
+            if flushed or not options['loop']:
+                self.stdout.write(f'Flushed {flushed} carts')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
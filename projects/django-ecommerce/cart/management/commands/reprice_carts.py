@@ -0,0 +1,27 @@
+"""
+Management command to flag cart lines whose price has changed.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from cart.models import CartItem
+
+
+class Command(BaseCommand):
+    help = 'Compare cart price snapshots with current prices and flag changed lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--active-days',
+            type=int,
+            default=settings.CART_REPRICE_ACTIVE_DAYS,
+            help='Only reprice carts updated within this many days',
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['active_days'])
+        changed = CartItem.objects.filter(cart__updated_at__gte=since).reprice()
+        self.stdout.write(self.style.SUCCESS(f'Updated price flags on {changed} cart lines'))
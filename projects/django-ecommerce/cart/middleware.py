@@ -0,0 +1,22 @@
+"""
+Cart middleware for the e-commerce platform.
+"""
+
+from .stores import CART_TOKEN_HEADER
+
+
+class CartTokenMiddleware:
+    """
+    Return the signed guest cart token on responses to anonymous cart requests,
+    so clients without cookies can send it back as ``X-Cart-Token``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        owner = getattr(request, 'cart_owner', None)
+        if owner is not None and not owner.user_id:
+            response[CART_TOKEN_HEADER] = owner.token
+        return response
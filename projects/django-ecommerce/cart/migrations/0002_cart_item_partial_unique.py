@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:13
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    # The old unique_together never matched lines without a variant, so a
+    # cart may hold several of them for the same product.
+    CartItem = apps.get_model("cart", "CartItem")
+    duplicates = (
+        CartItem.objects.filter(variant__isnull=True)
+        .values("cart_id", "product_id")
+        .annotate(lines=Count("id"), keep_id=Min("id"), total=Sum("quantity"))
+        .filter(lines__gt=1)
+    )
+    for row in duplicates.iterator():
+        CartItem.objects.filter(id=row["keep_id"]).update(quantity=row["total"])
+        CartItem.objects.filter(
+            cart_id=row["cart_id"], product_id=row["product_id"], variant__isnull=True
+        ).exclude(id=row["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0001_initial"),
+        ("products", "0002_copurchaserun_productcopurchase"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="cartitem",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("variant__isnull", True)),
+                fields=("cart", "product"),
+                name="cart_item_unique_product",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("variant__isnull", False)),
+                fields=("cart", "product", "variant"),
+                name="cart_item_unique_variant",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0002_cart_item_partial_unique"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="cart",
+            name="session_key",
+            field=models.CharField(
+                blank=True,
+                max_length=40,
+                null=True,
+                unique=True,
+                verbose_name="session key",
+            ),
+        ),
+    ]
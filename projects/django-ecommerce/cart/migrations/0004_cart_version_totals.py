@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:18
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Cart = apps.get_model("cart", "Cart")
+    CartItem = apps.get_model("cart", "CartItem")
+    lines = CartItem.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+    Cart.objects.update(
+        item_count=Coalesce(Subquery(lines.annotate(count=Count("id")).values("count")), 0),
+        total_items=Coalesce(
+            Subquery(lines.annotate(total=Sum("quantity")).values("total")), 0
+        ),
+        total_price=Coalesce(
+            Subquery(
+                lines.annotate(
+                    total=Sum(F("quantity") * Coalesce("variant__price", "product__price"))
+                ).values("total")
+            ),
+            Decimal("0"),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0003_alter_cart_session_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="item count"),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="total_items",
+            field=models.PositiveIntegerField(default=0, verbose_name="total items"),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="total_price",
+            field=models.DecimalField(
+                decimal_places=2, default=0, max_digits=12, verbose_name="total price"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="version",
+            field=models.PositiveBigIntegerField(default=0, verbose_name="version"),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def snapshot_current_prices(apps, schema_editor):
+    CartItem = apps.get_model("cart", "CartItem")
+    Product = apps.get_model("products", "Product")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+    CartItem.objects.filter(price_at_add__isnull=True).update(
+        price_at_add=Coalesce(
+            Subquery(
+                ProductVariant.objects.filter(pk=OuterRef("variant_id")).values("price")[:1]
+            ),
+            Subquery(Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1]),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0004_cart_version_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cartitem",
+            name="price_at_add",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=10,
+                null=True,
+                verbose_name="price at add",
+            ),
+        ),
+        migrations.AddField(
+            model_name="cartitem",
+            name="price_changed",
+            field=models.BooleanField(default=False, verbose_name="price changed"),
+        ),
+        migrations.RunPython(snapshot_current_prices, migrations.RunPython.noop),
+    ]
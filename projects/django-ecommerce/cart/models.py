@@ -2,14 +2,119 @@
 Cart models for the e-commerce platform.
 """
 
-from django.db import models
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import (
+    Case, Count, Exists, F, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 
 
+def _stock_queryset(product, variant=None):
+    """
+    Return a queryset of the single row holding stock for a cart line.
+    """
+    if variant:
+        return variant.__class__.objects.filter(pk=variant.pk)
+    return product.__class__.objects.filter(pk=product.pk)
+
+
+def _stock_error(variant):
+    if variant:
+        return ValueError("Not enough stock for this variant")
+    return ValueError("Not enough stock for this product")
+
+
+def stock_shortfalls(lines):
+    """
+    Check ``{(product_id, variant_id): quantity}`` against available stock
+    (stock not held by checkout reservations) in one query.
+
+    Returns ``{(product_id, variant_id): available}`` for every line asking for
+    more than is available. Unknown products or variants count as out of stock.
+    """
+    available = F('stock_quantity') - F('reserved_quantity')
+    from products.models import Product, ProductVariant
+
+    product_ids = {product_id for product_id, variant_id in lines if not variant_id}
+    variant_ids = {variant_id for product_id, variant_id in lines if variant_id}
+    querysets = []
+    if product_ids:
+        querysets.append(
+            Product.objects.filter(id__in=product_ids).order_by().values_list(
+                Value('p', output_field=models.CharField()), 'id', available
+            )
+        )
+    if variant_ids:
+        querysets.append(
+            ProductVariant.objects.filter(id__in=variant_ids).order_by().values_list(
+                Value('v', output_field=models.CharField()), 'id', available
+            )
+        )
+    if not querysets:
+        return {}
+
+    queryset = querysets[0].union(*querysets[1:], all=True)
+    stock = {(kind, pk): max(in_stock, 0) for kind, pk, in_stock in queryset}
+    shortfalls = {}
+    for (product_id, variant_id), quantity in lines.items():
+        in_stock = stock.get(('v', variant_id) if variant_id else ('p', product_id), 0)
+        if quantity > in_stock:
+            shortfalls[(product_id, variant_id)] = in_stock
+    return shortfalls
+
+
+class CartVersionConflict(Exception):
+    """
+    Raised when a cart mutation expects a version the cart is no longer at.
+    """
+
+
+class CartQuerySet(models.QuerySet):
+    """
+    QuerySet for carts.
+    """
+
+    def refresh_totals(self, bump=True):
+        """
+        Recompute the cached totals of every cart in the queryset from its
+        lines, and bump their versions, in a single UPDATE.
+        """
+        lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        values = {
+            'item_count': Coalesce(
+                Subquery(lines.annotate(count=Count('id')).values('count')), 0
+            ),
+            'total_items': Coalesce(
+                Subquery(lines.annotate(total=Sum('quantity')).values('total')), 0
+            ),
+            'total_price': Coalesce(
+                Subquery(lines.annotate(
+                    total=Sum(F('quantity') * Coalesce(
+                        'price_at_add', 'variant__price', 'product__price'
+                    ))
+                ).values('total')),
+                Decimal('0'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            ),
+            'updated_at': timezone.now(),
+        }
+        if bump:
+            values['version'] = F('version') + 1
+        return self.update(**values)
+
+
 class Cart(models.Model):
     """
     Shopping cart model.
+
+    ``version`` increases with every change to the cart's lines, and the
+    totals are cached on the row by ``refresh_totals()`` in the same
+    transaction, so summaries and ETags never need to read the lines.
     """
     user = models.OneToOneField(
         'accounts.User',
@@ -18,10 +123,27 @@ class Cart(models.Model):
         null=True,
         blank=True
     )
-    session_key = models.CharField(_('session key'), max_length=40, null=True, blank=True)
+    session_key = models.CharField(
+        _('session key'),
+        max_length=40,
+        unique=True,
+        null=True,
+        blank=True
+    )
+    version = models.PositiveBigIntegerField(_('version'), default=0)
+    total_items = models.PositiveIntegerField(_('total items'), default=0)
+    total_price = models.DecimalField(
+        _('total price'),
+        max_digits=12,
+        decimal_places=2,
+        default=0
+    )
+    item_count = models.PositiveIntegerField(_('item count'), default=0)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Cart')
         verbose_name_plural = _('Carts')
@@ -32,50 +154,194 @@ class Cart(models.Model):
             return f"Cart for {self.user.email}"
         return f"Cart {self.id}"
 
-    @property
-    def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+    def refresh_totals(self):
+        """
+        Recompute the cached totals and bump the version.
+        """
+        Cart.objects.filter(pk=self.pk).refresh_totals()
 
-    @property
-    def total_price(self):
-        return sum(item.total_price for item in self.items.all())
+    def claim(self, version):
+        """
+        Check that the cart is still at ``version`` and lock its row until the
+        end of the transaction. Raises ``CartVersionConflict`` otherwise.
+        """
+        if not Cart.objects.filter(pk=self.pk, version=version).update(updated_at=timezone.now()):
+            raise CartVersionConflict("Cart has been modified")
+
+    def get_items(self):
+        """
+        Return the cart's lines; a cart not saved yet has none.
+        """
+        if self.pk is None:
+            return CartItem.objects.none()
+        return self.items.all()
+
+    def get_totals(self):
+        """
+        Return ``(total_items, total_price)`` computed from the cart lines.
+
+        Prefetched items (see ``CartItemQuerySet.with_product_snapshot``) are
+        summed in a single pass; otherwise both totals come from one
+        aggregate query.
+        """
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            total_items = 0
+            total_price = Decimal('0')
+            for item in self.items.all():
+                total_items += item.quantity
+                total_price += item.total_price
+            return total_items, total_price
+
+        totals = self.items.aggregate(
+            total_items=Coalesce(Sum('quantity'), 0),
+            total_price=Coalesce(
+                Sum(F('quantity') * Coalesce('price_at_add', 'variant__price', 'product__price')),
+                Decimal('0'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+        return totals['total_items'], totals['total_price']
 
     def add_item(self, product, quantity=1, variant=None):
         """
         Add an item to the cart.
+
+        Inserting or incrementing the line and checking stock happen in one
+        statement, so concurrent adds of the same line are never lost. New
+        lines take a snapshot of the current price.
+        Raises ``ValueError`` if the new quantity would exceed the stock not
+        held by checkout reservations. The returned item carries the line's
+        id and new quantity.
         """
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=self,
-            product=product,
-            variant=variant,
-            defaults={'quantity': quantity}
+        features = connection.features
+        with transaction.atomic():
+            if features.supports_update_conflicts_with_target and features.can_return_columns_from_insert:
+                row = self._upsert_item(product, quantity, variant)
+            else:
+                row = self._increment_item(product, quantity, variant)
+            if row is None:
+                raise _stock_error(variant)
+            self.refresh_totals()
+        item_id, new_quantity = row
+        return CartItem(
+            id=item_id, cart=self, product=product, variant=variant, quantity=new_quantity
         )
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
-        return cart_item
+
+    def _upsert_item(self, product, quantity, variant):
+        """
+        ``INSERT ... ON CONFLICT DO UPDATE`` guarded by the stock of the line.
+
+        Returns ``(id, quantity)``, or ``None`` if stock is insufficient.
+        """
+        quote = connection.ops.quote_name
+        items_table = quote(CartItem._meta.db_table)
+        stock = _stock_queryset(product, variant)
+        stock_table = quote(stock.model._meta.db_table)
+        if variant:
+            conflict = '(cart_id, product_id, variant_id) WHERE variant_id IS NOT NULL'
+            variant_value = '%s'
+            params = [self.id, product.id, variant.id, quantity]
+        else:
+            conflict = '(cart_id, product_id) WHERE variant_id IS NULL'
+            variant_value = 'NULL'
+            params = [self.id, product.id, quantity]
+
+        # The SELECT yields no row when the quantity alone exceeds available
+        # stock; the DO UPDATE ... WHERE skips the increment when the sum would.
+        sql = f"""
+            INSERT INTO {items_table} (
+                cart_id, product_id, variant_id, quantity, price_at_add, price_changed,
+                created_at, updated_at
+            )
+            SELECT %s, %s, {variant_value}, %s, price, FALSE, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+            FROM {stock_table} WHERE id = %s AND stock_quantity - reserved_quantity >= %s
+            ON CONFLICT {conflict} DO UPDATE
+            SET quantity = {items_table}.quantity + excluded.quantity,
+                updated_at = excluded.updated_at
+            WHERE {items_table}.quantity + excluded.quantity <= (
+                SELECT stock_quantity - reserved_quantity FROM {stock_table} WHERE id = %s
+            )
+            RETURNING id, quantity
+        """
+        stock_id = variant.id if variant else product.id
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [stock_id, quantity, stock_id])
+            return cursor.fetchone()
+
+    def _increment_item(self, product, quantity, variant):
+        """
+        Conditional ``F()`` increment for backends without upsert support.
+        """
+        lines = CartItem.objects.filter(cart=self, product=product, variant=variant)
+        updated = lines.filter(
+            Exists(_stock_queryset(product, variant).filter(
+                stock_quantity__gte=F('reserved_quantity') + OuterRef('quantity') + quantity
+            ))
+        ).update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+        if updated:
+            return lines.values_list('id', 'quantity').get()
+        if lines.exists():
+            return None
+
+        if stock_shortfalls({(product.id, variant.id if variant else None): quantity}):
+            return None
+        try:
+            with transaction.atomic():
+                # Not CartItem.save(), which would bump the version a second
+                # time; add_item refreshes the totals once.
+                CartItem.objects.bulk_create([CartItem(
+                    cart=self, product=product, variant=variant, quantity=quantity,
+                    price_at_add=variant.price if variant else product.price
+                )])
+        except IntegrityError:
+            # Another request inserted the line first; increment it instead.
+            return self._increment_item(product, quantity, variant)
+        return lines.values_list('id', 'quantity').get()
+
+    def update_item(self, product, quantity, variant=None):
+        """
+        Set the quantity of a cart line with one conditional update.
+
+        Raises ``CartItem.DoesNotExist`` if the line is not in the cart and
+        ``ValueError`` if the quantity exceeds the stock not held by checkout
+        reservations.
+        """
+        lines = CartItem.objects.filter(cart=self, product=product, variant=variant)
+        with transaction.atomic():
+            updated = lines.filter(
+                Exists(_stock_queryset(product, variant).filter(
+                    stock_quantity__gte=F('reserved_quantity') + quantity
+                ))
+            ).update(quantity=quantity, updated_at=timezone.now())
+            if not updated:
+                if lines.exists():
+                    raise _stock_error(variant)
+                raise CartItem.DoesNotExist("Cart item not found")
+            self.refresh_totals()
 
     def remove_item(self, product, variant=None):
         """
         Remove an item from the cart.
         """
-        try:
-            cart_item = CartItem.objects.get(
+        with transaction.atomic():
+            deleted, _rows = CartItem.objects.filter(
                 cart=self,
                 product=product,
                 variant=variant
-            )
-            cart_item.delete()
-            return True
-        except CartItem.DoesNotExist:
-            return False
+            ).delete()
+            if deleted:
+                self.refresh_totals()
+        return bool(deleted)
 
     def clear(self):
         """
         Clear all items from the cart.
         """
-        self.items.all().delete()
+        with transaction.atomic():
+            self.items.all().delete()
+            self.refresh_totals()
 
+    @staticmethod
     def get_or_create_cart(user=None, session_key=None):
         """
         Get or create a cart for a user or session.
@@ -87,6 +353,55 @@ class Cart(models.Model):
         return cart
 
 
+class CartItemQuerySet(models.QuerySet):
+    """
+    QuerySet for cart items.
+    """
+
+    def with_product_snapshot(self):
+        """
+        Load everything a cart line needs to render in a fixed number of
+        queries: product and variant in the same row, primary images in one
+        extra query (available as ``product.primary_images``).
+        """
+        from products.models import ProductImage
+
+        return self.select_related('product', 'variant').prefetch_related(
+            Prefetch(
+                'product__images',
+                queryset=ProductImage.objects.filter(is_primary=True),
+                to_attr='primary_images'
+            )
+        )
+
+    def reprice(self):
+        """
+        Flag lines whose price snapshot no longer matches the current price,
+        and clear the flag on lines where it matches again.
+
+        Bumps the versions of the affected carts so cached responses are
+        revalidated. Returns the number of lines whose flag changed.
+        """
+        from products.models import Product, ProductVariant
+
+        current_price = Coalesce(
+            Subquery(ProductVariant.objects.filter(pk=OuterRef('variant_id')).values('price')[:1]),
+            Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1]),
+        )
+        stale = self.alias(current_price=current_price).filter(
+            Q(price_changed=False) & ~Q(price_at_add=F('current_price'))
+            | Q(price_changed=True, price_at_add=F('current_price'))
+        )
+        with transaction.atomic():
+            Cart.objects.filter(
+                pk__in=Subquery(stale.values('cart_id'))
+            ).update(version=F('version') + 1, updated_at=timezone.now())
+            return stale.update(price_changed=Case(
+                When(price_at_add=current_price, then=Value(False)),
+                default=Value(True)
+            ))
+
+
 class CartItem(models.Model):
     """
     Cart item model.
@@ -110,28 +425,60 @@ class CartItem(models.Model):
         _('quantity'),
         validators=[MinValueValidator(1)]
     )
+    price_at_add = models.DecimalField(
+        _('price at add'),
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    price_changed = models.BooleanField(_('price changed'), default=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Cart Item')
         verbose_name_plural = _('Cart Items')
         db_table = 'cart_items'
-        unique_together = ['cart', 'product', 'variant']
+        # Two partial constraints because NULL variants never conflict in a
+        # plain unique index; the upsert in Cart.add_item targets them.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cart', 'product'],
+                condition=Q(variant__isnull=True),
+                name='cart_item_unique_product'
+            ),
+            models.UniqueConstraint(
+                fields=['cart', 'product', 'variant'],
+                condition=Q(variant__isnull=False),
+                name='cart_item_unique_variant'
+            ),
+        ]
 
     def __str__(self):
         variant_text = f" - {self.variant.name}" if self.variant else ""
         return f"{self.product.name}{variant_text} x {self.quantity}"
 
     @property
-    def unit_price(self):
+    def current_price(self):
         """
-        Get the unit price for this item.
+        Get the live price of the product or variant.
         """
         if self.variant:
             return self.variant.price
         return self.product.price
 
+    @property
+    def unit_price(self):
+        """
+        Get the unit price for this item, as of when it was added.
+        """
+        if self.price_at_add is not None:
+            return self.price_at_add
+        return self.current_price
+
     @property
     def total_price(self):
         """
@@ -143,13 +490,19 @@ class CartItem(models.Model):
         """
         Override save to validate stock availability.
         """
-        if self.variant:
-            if self.quantity > self.variant.stock_quantity:
-                raise ValueError("Not enough stock for this variant")
-        else:
-            if self.quantity > self.product.stock_quantity:
-                raise ValueError("Not enough stock for this product")
-        super().save(*args, **kwargs)
+        if stock_shortfalls({(self.product_id, self.variant_id): self.quantity}):
+            raise _stock_error(self.variant_id)
+        if self.price_at_add is None:
+            self.price_at_add = self.current_price
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Cart.objects.filter(pk=self.cart_id).refresh_totals()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Cart.objects.filter(pk=self.cart_id).refresh_totals()
+        return result
 
 
 class Wishlist(models.Model):
@@ -4,17 +4,27 @@ Cart serializers for the e-commerce platform.
 
 from rest_framework import serializers
 from .models import Cart, CartItem, Wishlist
-from products.serializers import ProductListSerializer, ProductVariantSerializer
+from .stores import CartOperation
+from products.recommendations import also_bought
+from promotions.engine import evaluate_items
+from products.serializers import (
+    ProductListSerializer, ProductSummarySerializer, ProductVariantSerializer,
+    VariantSummarySerializer
+)
 
 
 class CartItemSerializer(serializers.ModelSerializer):
     """
     Serializer for cart items.
+
+    ``product_id`` and ``variant_id`` identify the line under every cart
+    store; ``id`` is null for lines not yet written back by
+    ``CacheCartStore``.
     """
     product = ProductListSerializer(read_only=True)
-    product_id = serializers.IntegerField(write_only=True)
+    product_id = serializers.IntegerField()
     variant = ProductVariantSerializer(read_only=True)
-    variant_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
+    variant_id = serializers.IntegerField(required=False, allow_null=True)
     unit_price = serializers.ReadOnlyField()
     total_price = serializers.ReadOnlyField()
 
@@ -48,36 +58,84 @@ class CartItemSerializer(serializers.ModelSerializer):
                     product=product,
                     is_active=True
                 )
-                if quantity > variant.stock_quantity:
+                if quantity > variant.available_quantity:
                     raise serializers.ValidationError(
-                        f"Not enough stock. Available: {variant.stock_quantity}"
+                        f"Not enough stock. Available: {variant.available_quantity}"
                     )
             except ProductVariant.DoesNotExist:
                 raise serializers.ValidationError("Product variant not found or inactive")
         else:
-            if quantity > product.stock_quantity:
+            if quantity > product.available_quantity:
                 raise serializers.ValidationError(
-                    f"Not enough stock. Available: {product.stock_quantity}"
+                    f"Not enough stock. Available: {product.available_quantity}"
                 )
 
         return data
 
 
+class CartLineSerializer(serializers.ModelSerializer):
+    """
+    Read-only cart line with a compact product snapshot.
+
+    Prices are those snapshotted when the line was added; ``price_changed``
+    is set by the repricing job when the live price differs.
+    Expects items loaded with ``CartItem.objects.with_product_snapshot()``.
+    """
+    product = ProductSummarySerializer(read_only=True)
+    variant = VariantSummarySerializer(read_only=True)
+    unit_price = serializers.ReadOnlyField()
+    total_price = serializers.ReadOnlyField()
+
+    class Meta:
+        model = CartItem
+        fields = [
+            'id', 'product', 'variant', 'quantity', 'unit_price',
+            'total_price', 'price_changed', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class CartSerializer(serializers.ModelSerializer):
     """
     Serializer for shopping cart.
+
+    Prefetch ``items`` with ``CartItem.objects.with_product_snapshot()`` to
+    render a cart in a fixed number of queries. Totals are the values cached
+    on the cart row, before the ``promotions`` discount. Both use the
+    prices snapshotted on the lines; checkout charges live prices, which
+    differ on lines with ``price_changed`` set.
     """
-    items = CartItemSerializer(many=True, read_only=True)
-    total_items = serializers.ReadOnlyField()
-    total_price = serializers.ReadOnlyField()
+    items = CartLineSerializer(source='get_items', many=True, read_only=True)
+    promotions = serializers.SerializerMethodField()
+    also_bought = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
         fields = [
-            'id', 'user', 'session_key', 'items', 'total_items',
-            'total_price', 'created_at', 'updated_at'
+            'id', 'user', 'session_key', 'version', 'items', 'total_items',
+            'total_price', 'item_count', 'promotions', 'also_bought', 'created_at',
+            'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'version', 'total_items', 'total_price', 'item_count',
+            'created_at', 'updated_at'
+        ]
+
+    def get_promotions(self, obj):
+        evaluation = evaluate_items(obj.get_items())
+        return {
+            'discount': str(evaluation.discount),
+            'applied': [
+                dict(promotion, discount=str(promotion['discount']))
+                for promotion in evaluation.promotions
+            ],
+        }
+
+    def get_also_bought(self, obj):
+        product_ids = [item.product_id for item in obj.get_items()]
+        return ProductSummarySerializer(
+            also_bought(product_ids), many=True, context=self.context
+        ).data
 
 
 class WishlistSerializer(serializers.ModelSerializer):
@@ -146,9 +204,9 @@ class AddToCartSerializer(serializers.Serializer):
                     product=product,
                     is_active=True
                 )
-                if quantity > variant.stock_quantity:
+                if quantity > variant.available_quantity:
                     raise serializers.ValidationError(
-                        f"Not enough stock. Available: {variant.stock_quantity}"
+                        f"Not enough stock. Available: {variant.available_quantity}"
                     )
             except ProductVariant.DoesNotExist:
                 raise serializers.ValidationError("Product variant not found or inactive")
@@ -156,6 +214,33 @@ class AddToCartSerializer(serializers.Serializer):
         return data
 
 
+class CartOperationSerializer(serializers.Serializer):
+    """
+    Serializer for a single operation of a batch cart update.
+    """
+    op = serializers.ChoiceField(choices=CartOperation.CHOICES)
+    product_id = serializers.IntegerField()
+    variant_id = serializers.IntegerField(required=False, allow_null=True)
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        """
+        Default ``add`` to one item and require a quantity for ``set``.
+        """
+        if data['op'] == CartOperation.SET and 'quantity' not in data:
+            raise serializers.ValidationError({'quantity': "This field is required."})
+        if data['op'] == CartOperation.ADD:
+            data.setdefault('quantity', 1)
+        return data
+
+
+class BatchCartSerializer(serializers.Serializer):
+    """
+    Serializer for batch cart updates.
+    """
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
+
+
 class UpdateCartItemSerializer(serializers.Serializer):
     """
     Serializer for updating cart item quantities.
@@ -169,13 +254,13 @@ class UpdateCartItemSerializer(serializers.Serializer):
         cart_item = self.context.get('cart_item')
         if cart_item:
             if cart_item.variant:
-                if value > cart_item.variant.stock_quantity:
+                if value > cart_item.variant.available_quantity:
                     raise serializers.ValidationError(
-                        f"Not enough stock. Available: {cart_item.variant.stock_quantity}"
+                        f"Not enough stock. Available: {cart_item.variant.available_quantity}"
                     )
             else:
-                if value > cart_item.product.stock_quantity:
+                if value > cart_item.product.available_quantity:
                     raise serializers.ValidationError(
-                        f"Not enough stock. Available: {cart_item.product.stock_quantity}"
+                        f"Not enough stock. Available: {cart_item.product.available_quantity}"
                     )
         return value
@@ -0,0 +1,994 @@
+"""
+Cart storage backends for the e-commerce platform.
+
+``DatabaseCartStore`` reads and writes the ``Cart`` and ``CartItem`` tables on
+every request. ``CacheCartStore`` keeps active carts in the cache as hashes of
+line quantities and writes changes back to the database in batches
+(write-behind); carts missing from the cache are loaded from the database on
+first access. A changed cart does not expire from the cache until it has
+been written back.
+
+Code that reads carts from the database must call ``sync()`` first, and code
+that writes cart rows directly must call ``invalidate()`` afterwards.
+
+Guest carts are keyed by a random cart key stored in ``Cart.session_key``.
+Clients send it back either through the session or as a signed
+``X-Cart-Token`` header, which ``CartTokenMiddleware`` adds to responses.
+"""
+
+import contextlib
+import functools
+import logging
+import threading
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.dispatch import receiver
+from django.utils.crypto import get_random_string
+from django.utils.module_loading import import_string
+
+from .models import Cart, CartItem, CartVersionConflict
+from products.models import Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+CART_TOKEN_HEADER = 'X-Cart-Token'
+CART_TOKEN_SALT = 'cart.token'
+SESSION_CART_KEY = 'cart_key'
+
+
+def guest_cart_key(request):
+    """
+    Return the guest cart key sent with the request, or ``None``.
+
+    A valid ``X-Cart-Token`` header wins over the key stored in the session.
+    """
+    token = request.headers.get(CART_TOKEN_HEADER)
+    if token:
+        try:
+            return signing.loads(token, salt=CART_TOKEN_SALT)
+        except signing.BadSignature:
+            pass
+    session = getattr(request, 'session', None)
+    if session is not None:
+        return session.get(SESSION_CART_KEY)
+    return None
+
+
+class CartOwner(namedtuple('CartOwner', ['user_id', 'session_key'])):
+    """
+    Identifies whose cart is being accessed.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        return cls(user_id=user.pk, session_key=None)
+
+    @classmethod
+    def for_guest(cls, cart_key):
+        return cls(user_id=None, session_key=cart_key)
+
+    @classmethod
+    def from_request(cls, request):
+        """
+        Return the owner of the request's cart, issuing a new guest cart key
+        when an anonymous request does not carry one.
+        """
+        if request.user.is_authenticated:
+            return cls.for_user(request.user)
+
+        cart_key = guest_cart_key(request) or get_random_string(32)
+        session = getattr(request, 'session', None)
+        if session is not None and session.get(SESSION_CART_KEY) != cart_key:
+            session[SESSION_CART_KEY] = cart_key
+        owner = cls.for_guest(cart_key)
+        # Read by CartTokenMiddleware to return the token to the client.
+        getattr(request, '_request', request).cart_owner = owner
+        return owner
+
+    @classmethod
+    def from_key(cls, key):
+        """
+        Rebuild an owner from the value of ``CartOwner.key``.
+        """
+        if key.startswith('u'):
+            return cls(user_id=int(key[1:]), session_key=None)
+        return cls(user_id=None, session_key=key[1:])
+
+    @property
+    def token(self):
+        """
+        Signed cart key for the ``X-Cart-Token`` header.
+        """
+        return signing.dumps(self.session_key, salt=CART_TOKEN_SALT)
+
+    @property
+    def key(self):
+        if self.user_id:
+            return f"u{self.user_id}"
+        return f"s{self.session_key}"
+
+    def cart_lookup(self, prefix=''):
+        if self.user_id:
+            return {f'{prefix}user_id': self.user_id}
+        return {f'{prefix}session_key': self.session_key}
+
+
+class CartOperation(namedtuple('CartOperation', ['op', 'product', 'variant', 'quantity'])):
+    """
+    A single add, set or remove applied by ``BaseCartStore.apply()``.
+    """
+    ADD = 'add'
+    SET = 'set'
+    REMOVE = 'remove'
+    CHOICES = (ADD, SET, REMOVE)
+
+
+def operation_result(operation, quantity=None, error=None):
+    return {
+        'op': operation.op,
+        'product_id': operation.product.id,
+        'variant_id': operation.variant.id if operation.variant else None,
+        'status': 'error' if error else 'ok',
+        'quantity': quantity,
+        'error': error,
+    }
+
+
+def line_key(product_id, variant_id=None):
+    return f"{product_id}:{variant_id or ''}"
+
+
+# Cached carts hold the price snapshot of each line, in cents, next to its
+# quantity under this prefix.
+PRICE_FIELD_PREFIX = '_price:'
+
+
+def _price_field(field):
+    return f"{PRICE_FIELD_PREFIX}{field}"
+
+
+def _to_cents(price):
+    return int(price * 100)
+
+
+def _from_cents(cents):
+    return Decimal(cents) / 100
+
+
+def _next_version(data, expected):
+    """
+    Return the version after a change to the cached cart ``data``, raising
+    ``CartVersionConflict`` if it is not at ``expected``.
+    """
+    version = data.get('_version', 0)
+    if expected is not None and version != expected:
+        raise CartVersionConflict("Cart has been modified")
+    return version + 1
+
+
+def parse_line_key(field):
+    product_id, variant_id = field.split(':')
+    return int(product_id), int(variant_id) if variant_id else None
+
+
+def _stock_for(product, variant):
+    return variant.available_quantity if variant else product.available_quantity
+
+
+def _not_enough_stock(variant):
+    if variant:
+        return ValueError("Not enough stock for this variant")
+    return ValueError("Not enough stock for this product")
+
+
+def _apply_operations(lines, operations):
+    """
+    Apply ``CartOperation`` in order to ``{(product_id, variant_id): quantity}``
+    in place and return one result dict per operation.
+    """
+    results = []
+    for operation in operations:
+        variant = operation.variant
+        line = (operation.product.id, variant.id if variant else None)
+        if operation.op == CartOperation.REMOVE:
+            if lines.pop(line, None) is None:
+                results.append(operation_result(operation, error="Item not found in cart"))
+            else:
+                results.append(operation_result(operation, 0))
+            continue
+
+        quantity = operation.quantity
+        if operation.op == CartOperation.ADD:
+            quantity += lines.get(line, 0)
+        if quantity > _stock_for(operation.product, variant):
+            results.append(operation_result(operation, error=str(_not_enough_stock(variant))))
+            continue
+        lines[line] = quantity
+        results.append(operation_result(operation, quantity))
+    return results
+
+
+def write_lines(carts, snapshots=None):
+    """
+    Replace the database lines of each cart in ``{Cart: {(product_id, variant_id): quantity}}``
+    with a diff of bulk inserts, bulk updates and one delete.
+
+    ``snapshots`` optionally gives the price snapshot of lines as
+    ``{Cart: {(product_id, variant_id): price}}``; other new lines take the
+    current price and other existing lines keep theirs.
+
+    Returns ``(created, updated, deleted)`` counts. Must run inside a transaction.
+    """
+    snapshots = snapshots or {}
+    existing = {}
+    for item in CartItem.objects.filter(cart__in=list(carts)).only(
+        'id', 'cart_id', 'product_id', 'variant_id', 'quantity', 'price_at_add'
+    ):
+        existing[(item.cart_id, item.product_id, item.variant_id)] = item
+
+    to_create, to_update = [], []
+    for cart, lines in carts.items():
+        cart_snapshots = snapshots.get(cart, {})
+        for (product_id, variant_id), quantity in lines.items():
+            item = existing.pop((cart.id, product_id, variant_id), None)
+            price = cart_snapshots.get((product_id, variant_id))
+            if item is None:
+                to_create.append(CartItem(
+                    cart=cart, product_id=product_id,
+                    variant_id=variant_id, quantity=quantity, price_at_add=price
+                ))
+            elif item.quantity != quantity or price not in (None, item.price_at_add):
+                item.quantity = quantity
+                if price is not None:
+                    item.price_at_add = price
+                to_update.append(item)
+
+    prices = current_prices({
+        (item.product_id, item.variant_id) for item in to_create if item.price_at_add is None
+    })
+    for item in to_create:
+        if item.price_at_add is None:
+            item.price_at_add = prices.get((item.product_id, item.variant_id))
+    CartItem.objects.bulk_create(to_create)
+    CartItem.objects.bulk_update(to_update, ['quantity', 'price_at_add'])
+    if existing:
+        CartItem.objects.filter(id__in=[item.id for item in existing.values()]).delete()
+    Cart.objects.filter(pk__in=[cart.pk for cart in carts]).refresh_totals()
+    return len(to_create), len(to_update), len(existing)
+
+
+def merge_lines(source_cart, target_cart):
+    """
+    Move the lines of ``source_cart`` into ``target_cart`` and delete it.
+
+    Quantities of lines present in both carts are summed and clamped to
+    stock; lines that would end up with no stock are dropped. Reads both
+    carts in one query and writes the result with bulk inserts and updates.
+    """
+    with transaction.atomic():
+        list(Cart.objects.select_for_update().filter(pk__in=[source_cart.pk, target_cart.pk]))
+        rows = CartItem.objects.filter(cart__in=[source_cart, target_cart]).annotate(
+            stock=Coalesce(
+                F('variant__stock_quantity') - F('variant__reserved_quantity'),
+                F('product__stock_quantity') - F('product__reserved_quantity')
+            )
+        ).values_list('cart_id', 'product_id', 'variant_id', 'quantity', 'stock')
+
+        lines, incoming, stock = {}, {}, {}
+        for cart_id, product_id, variant_id, quantity, available in rows:
+            line = (product_id, variant_id)
+            stock[line] = available
+            if cart_id == target_cart.pk:
+                lines[line] = quantity
+            else:
+                incoming[line] = quantity
+
+        for line, quantity in incoming.items():
+            current = lines.get(line, 0)
+            merged = max(current, min(current + quantity, stock[line]))
+            if merged:
+                lines[line] = merged
+
+        write_lines({target_cart: lines})
+        source_cart.delete()
+    return len(incoming)
+
+
+def current_prices(lines):
+    """
+    Return ``{(product_id, variant_id): price}`` for the given lines with one
+    price query per table.
+    """
+    product_ids = {product_id for product_id, variant_id in lines if not variant_id}
+    variant_ids = {variant_id for product_id, variant_id in lines if variant_id}
+    product_prices = dict(
+        Product.objects.filter(id__in=product_ids).values_list('id', 'price')
+    ) if product_ids else {}
+    variant_prices = dict(
+        ProductVariant.objects.filter(id__in=variant_ids).values_list('id', 'price')
+    ) if variant_ids else {}
+
+    prices = {}
+    for product_id, variant_id in lines:
+        if variant_id:
+            price = variant_prices.get(variant_id)
+        else:
+            price = product_prices.get(product_id)
+        if price is not None:
+            prices[(product_id, variant_id)] = price
+    return prices
+
+
+def price_lines(lines, prices=None):
+    """
+    Compute ``(total_items, total_price)`` for ``{(product_id, variant_id): quantity}``
+    at ``prices``, or at current prices if not given.
+    """
+    if prices is None:
+        prices = current_prices(lines)
+    total_items = 0
+    total_price = Decimal('0')
+    for line, quantity in lines.items():
+        price = prices.get(line)
+        if price is None:
+            continue
+        total_items += quantity
+        total_price += price * quantity
+    return total_items, total_price
+
+
+class BaseCartStore:
+    """
+    Interface shared by cart storage backends.
+    """
+
+    def get_lines(self, owner):
+        """
+        Return ``{(product_id, variant_id): quantity}`` for the owner's cart.
+        """
+        raise NotImplementedError
+
+    # Every mutation takes an optional ``version``: when given, the change is
+    # only applied if the cart is still at that version, and
+    # ``CartVersionConflict`` is raised otherwise.
+
+    def add(self, owner, product, quantity=1, variant=None, version=None):
+        """
+        Add ``quantity`` of a product to the cart and return the ``CartItem``.
+        """
+        raise NotImplementedError
+
+    def set_quantity(self, owner, product, quantity, variant=None, version=None):
+        """
+        Set the quantity of a cart line and return the ``CartItem``.
+        """
+        raise NotImplementedError
+
+    def remove(self, owner, product, variant=None, version=None):
+        """
+        Remove a cart line. Returns ``False`` if it was not in the cart.
+        """
+        raise NotImplementedError
+
+    def clear(self, owner, version=None):
+        raise NotImplementedError
+
+    def get_version(self, owner):
+        """
+        Return the current version of the owner's cart.
+        """
+        raise NotImplementedError
+
+    def apply(self, owner, operations, version=None):
+        """
+        Apply a sequence of ``CartOperation`` in order and return one result
+        dict per operation. A failed operation does not stop the others.
+        """
+        results = []
+        for operation in operations:
+            # Only the first operation is checked against the expected version.
+            expected, version = version, None
+            try:
+                if operation.op == CartOperation.REMOVE:
+                    if not self.remove(owner, operation.product, operation.variant, expected):
+                        results.append(operation_result(operation, error="Item not found in cart"))
+                        continue
+                    quantity = 0
+                elif operation.op == CartOperation.SET:
+                    quantity = self.set_quantity(
+                        owner, operation.product, operation.quantity, operation.variant, expected
+                    ).quantity
+                else:
+                    quantity = self.add(
+                        owner, operation.product, operation.quantity, operation.variant, expected
+                    ).quantity
+            except ValueError as e:
+                results.append(operation_result(operation, error=str(e)))
+            else:
+                results.append(operation_result(operation, quantity))
+        return results
+
+    def summary(self, owner):
+        """
+        Return the version and totals of the owner's cart.
+        """
+        lines = self.get_lines(owner)
+        total_items, total_price = price_lines(lines)
+        return {
+            'version': self.get_version(owner),
+            'total_items': total_items,
+            'total_price': total_price,
+            'item_count': len(lines),
+        }
+
+    def merge(self, source, target):
+        """
+        Merge the cart of ``source`` (usually a guest) into ``target``'s cart.
+
+        Returns the number of lines taken from the source cart.
+        """
+        source_cart = self.sync(source, create=False)
+        if source_cart.pk is None:
+            return 0
+        target_cart = self.sync(target)
+        merged = merge_lines(source_cart, target_cart)
+        self.invalidate(source)
+        self.invalidate(target)
+        return merged
+
+    def sync(self, owner, create=True):
+        """
+        Persist pending changes for the owner and return their ``Cart`` row.
+
+        With ``create=False`` an owner without a cart gets an empty unsaved
+        ``Cart``, so reads do not insert a row for every visitor; the row is
+        created by the owner's first change.
+        """
+        if create:
+            cart, created = Cart.objects.get_or_create(**owner.cart_lookup())
+            return cart
+        return Cart.objects.filter(**owner.cart_lookup()).first() or Cart(**owner.cart_lookup())
+
+    def invalidate(self, owner):
+        """
+        Drop any copy of the owner's cart held outside the database.
+        """
+
+    def flush(self, batch_size=None):
+        """
+        Write pending changes for all carts back to the database.
+        """
+        return 0
+
+
+class DatabaseCartStore(BaseCartStore):
+    """
+    Cart store backed directly by the ``Cart`` and ``CartItem`` tables.
+    """
+
+    def get_lines(self, owner):
+        items = CartItem.objects.filter(**owner.cart_lookup('cart__'))
+        return {
+            (product_id, variant_id): quantity
+            for product_id, variant_id, quantity in items.values_list(
+                'product_id', 'variant_id', 'quantity'
+            )
+        }
+
+    @contextlib.contextmanager
+    def _mutation(self, owner, version):
+        with transaction.atomic():
+            cart = self.sync(owner)
+            if version is not None:
+                cart.claim(version)
+            yield cart
+
+    def add(self, owner, product, quantity=1, variant=None, version=None):
+        with self._mutation(owner, version) as cart:
+            return cart.add_item(product, quantity, variant)
+
+    def set_quantity(self, owner, product, quantity, variant=None, version=None):
+        with self._mutation(owner, version) as cart:
+            cart.update_item(product, quantity, variant)
+        return CartItem(cart=cart, product=product, variant=variant, quantity=quantity)
+
+    def remove(self, owner, product, variant=None, version=None):
+        with self._mutation(owner, version) as cart:
+            return cart.remove_item(product, variant)
+
+    def clear(self, owner, version=None):
+        with self._mutation(owner, version) as cart:
+            cart.clear()
+
+    def get_version(self, owner):
+        return Cart.objects.filter(**owner.cart_lookup()).values_list(
+            'version', flat=True
+        ).first() or 0
+
+    def summary(self, owner):
+        """
+        Read the totals cached on the cart row.
+        """
+        return Cart.objects.filter(**owner.cart_lookup()).values(
+            'version', 'total_items', 'total_price', 'item_count'
+        ).first() or {
+            'version': 0,
+            'total_items': 0,
+            'total_price': Decimal('0'),
+            'item_count': 0,
+        }
+
+    def apply(self, owner, operations, version=None):
+        """
+        Apply all operations in memory against the locked cart lines, then
+        write the result back with bulk inserts and updates.
+        """
+        with self._mutation(owner, version) as cart:
+            lines = {
+                (product_id, variant_id): quantity
+                for product_id, variant_id, quantity in CartItem.objects.select_for_update().filter(
+                    cart=cart
+                ).values_list('product_id', 'variant_id', 'quantity')
+            }
+
+            results = _apply_operations(lines, operations)
+            write_lines({cart: lines})
+        return results
+
+
+class _RedisHashes:
+    """
+    Cart hashes stored natively in Redis.
+    """
+
+    def __init__(self, cache):
+        from django_redis import get_redis_connection
+
+        self.cache = cache
+        self.client = get_redis_connection(settings.CART_CACHE_ALIAS)
+
+    def _key(self, key):
+        return self.cache.make_key(key)
+
+    def load(self, key, mapping, timeout):
+        key = self._key(key)
+
+        def load(pipe):
+            # Loaded by whoever gets there first; the others keep that copy.
+            if pipe.exists(key):
+                return
+            pipe.multi()
+            pipe.hset(key, mapping=dict(mapping, _loaded=1))
+            pipe.expire(key, timeout)
+
+        self.client.transaction(load, key)
+
+    def _decode(self, data):
+        return {field.decode(): int(value) for field, value in data.items()}
+
+    def get_all(self, key):
+        return self._decode(self.client.hgetall(self._key(key)))
+
+    def update(self, key, change):
+        key = self._key(key)
+
+        def update(pipe):
+            data = self._decode(pipe.hgetall(key))
+            if '_loaded' not in data:
+                return None
+            updates, result = change(data)
+            removed = [field for field, value in updates.items() if value is None]
+            values = {field: value for field, value in updates.items() if value is not None}
+            pipe.multi()
+            if removed:
+                pipe.hdel(key, *removed)
+            if values:
+                pipe.hset(key, mapping=values)
+                # Changed carts are kept until written back.
+                pipe.persist(key)
+            return updates, result
+
+        return self.client.transaction(update, key, value_from_callable=True)
+
+    def expire_if(self, key, version, timeout):
+        key = self._key(key)
+
+        def expire(pipe):
+            if int(pipe.hget(key, '_version') or 0) != version:
+                return
+            pipe.multi()
+            pipe.expire(key, timeout)
+
+        self.client.transaction(expire, key)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def add_member(self, key, member):
+        self.client.sadd(self._key(key), member)
+
+    def remove_member(self, key, member):
+        return bool(self.client.srem(self._key(key), member))
+
+    def pop_members(self, key, count):
+        return [member.decode() for member in self.client.spop(self._key(key), count) or []]
+
+
+class _LocalHashes:
+    """
+    Cart hashes emulated on any Django cache backend.
+
+    Read-modify-write cycles are serialized with a process-wide lock, so this
+    is only suitable for tests and single-process development servers.
+    """
+    lock = threading.RLock()
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def load(self, key, mapping, timeout):
+        with self.lock:
+            if self.cache.get(key) is None:
+                self.cache.set(key, dict(mapping, _loaded=1), timeout)
+
+    def get_all(self, key):
+        return dict(self.cache.get(key) or {})
+
+    def update(self, key, change):
+        with self.lock:
+            data = self.get_all(key)
+            if '_loaded' not in data:
+                return None
+            updates, result = change(dict(data))
+            if updates:
+                for field, value in updates.items():
+                    if value is None:
+                        data.pop(field, None)
+                    else:
+                        data[field] = value
+                self.cache.set(key, data, None)
+            return updates, result
+
+    def expire_if(self, key, version, timeout):
+        with self.lock:
+            data = self.get_all(key)
+            if data and data.get('_version', 0) == version:
+                self.cache.set(key, data, timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def add_member(self, key, member):
+        with self.lock:
+            members = self.cache.get(key) or set()
+            members.add(member)
+            self.cache.set(key, members, None)
+
+    def remove_member(self, key, member):
+        with self.lock:
+            members = self.cache.get(key) or set()
+            if member not in members:
+                return False
+            members.discard(member)
+            self.cache.set(key, members, None)
+            return True
+
+    def pop_members(self, key, count):
+        with self.lock:
+            members = self.cache.get(key) or set()
+            popped = [members.pop() for _ in range(min(count, len(members)))]
+            self.cache.set(key, members, None)
+            return popped
+
+
+class CacheCartStore(BaseCartStore):
+    """
+    Cart store that keeps active carts in the cache and writes them back to
+    the database in batches via ``flush()``.
+
+    Each change is one atomic read-modify-write of the cart's hash (a
+    ``WATCH`` transaction on Redis) that also bumps its version. Line prices
+    are snapshotted in the hash when a line is added, as the database store
+    does. Changed carts do not expire until written back.
+
+    Lines returned by ``add()`` and ``set_quantity()`` are not saved, so
+    they have no id until the cart is written back. Clients address them by
+    product and variant, as the remove and batch endpoints do; the id-based
+    line endpoints sync the cart first, so ids read from the cart work too.
+
+    Uses native Redis hashes when the cache is backed by django-redis, and an
+    emulation on the configured cache otherwise.
+    """
+    DIRTY_KEY = 'cart:dirty'
+
+    def __init__(self):
+        self.cache = caches[settings.CART_CACHE_ALIAS]
+        self.timeout = settings.CART_CACHE_TIMEOUT
+        if self.cache.__class__.__module__.startswith('django_redis'):
+            self.hashes = _RedisHashes(self.cache)
+        else:
+            self.hashes = _LocalHashes(self.cache)
+
+    def _key(self, owner):
+        return f"cart:{owner.key}"
+
+    def _load(self, owner):
+        items = CartItem.objects.filter(**owner.cart_lookup('cart__'))
+        mapping = {}
+        for product_id, variant_id, quantity, price in items.values_list(
+            'product_id', 'variant_id', 'quantity', 'price_at_add'
+        ):
+            field = line_key(product_id, variant_id)
+            mapping[field] = quantity
+            if price is not None:
+                mapping[_price_field(field)] = _to_cents(price)
+        mapping['_version'] = Cart.objects.filter(**owner.cart_lookup()).values_list(
+            'version', flat=True
+        ).first() or 0
+        self.hashes.load(self._key(owner), mapping, self.timeout)
+
+    def _data(self, owner):
+        key = self._key(owner)
+        data = self.hashes.get_all(key)
+        if '_loaded' not in data:
+            self._load(owner)
+            data = self.hashes.get_all(key)
+        return data
+
+    def _update(self, owner, change):
+        """
+        Apply ``change`` to the owner's cart hash atomically, loading it first
+        if needed.
+
+        ``change(data)`` returns ``({field: value or None to delete}, result)``
+        and may be called more than once.
+        """
+        key = self._key(owner)
+        while True:
+            outcome = self.hashes.update(key, change)
+            if outcome is not None:
+                break
+            self._load(owner)
+        updates, result = outcome
+        if updates:
+            self._mark_dirty(owner)
+        return result
+
+    def _mark_dirty(self, owner):
+        self.hashes.add_member(self.DIRTY_KEY, owner.key)
+
+    def _lines(self, data):
+        return {
+            parse_line_key(field): quantity
+            for field, quantity in data.items()
+            if not field.startswith('_') and quantity > 0
+        }
+
+    def _snapshots(self, data):
+        return {
+            parse_line_key(field[len(PRICE_FIELD_PREFIX):]): _from_cents(cents)
+            for field, cents in data.items()
+            if field.startswith(PRICE_FIELD_PREFIX)
+        }
+
+    def get_lines(self, owner):
+        return self._lines(self._data(owner))
+
+    def get_version(self, owner):
+        return self._data(owner).get('_version', 0)
+
+    def summary(self, owner):
+        """
+        Total the cart at its price snapshots, like the cart row's totals.
+        """
+        data = self._data(owner)
+        lines = self._lines(data)
+        prices = self._snapshots(data)
+        prices.update(current_prices([line for line in lines if line not in prices]))
+        total_items, total_price = price_lines(lines, prices)
+        return {
+            'version': data.get('_version', 0),
+            'total_items': total_items,
+            'total_price': total_price,
+            'item_count': len(lines),
+        }
+
+    def add(self, owner, product, quantity=1, variant=None, version=None):
+        field = line_key(product.id, variant.id if variant else None)
+        stock = _stock_for(product, variant)
+        price = _to_cents(variant.price if variant else product.price)
+
+        def change(data):
+            updates = {'_version': _next_version(data, version)}
+            updates[field] = data.get(field, 0) + quantity
+            if updates[field] > stock:
+                raise _not_enough_stock(variant)
+            if field not in data:
+                updates[_price_field(field)] = price
+            return updates, (updates[field], data.get(_price_field(field), price))
+
+        new_quantity, price = self._update(owner, change)
+        return CartItem(
+            product=product, variant=variant, quantity=new_quantity, price_at_add=_from_cents(price)
+        )
+
+    def set_quantity(self, owner, product, quantity, variant=None, version=None):
+        field = line_key(product.id, variant.id if variant else None)
+        stock = _stock_for(product, variant)
+
+        def change(data):
+            updates = {'_version': _next_version(data, version)}
+            if field not in data:
+                raise CartItem.DoesNotExist("Cart item not found")
+            if quantity > stock:
+                raise _not_enough_stock(variant)
+            updates[field] = quantity
+            return updates, data.get(_price_field(field))
+
+        price = self._update(owner, change)
+        return CartItem(
+            product=product, variant=variant, quantity=quantity,
+            price_at_add=_from_cents(price) if price is not None else None
+        )
+
+    def remove(self, owner, product, variant=None, version=None):
+        field = line_key(product.id, variant.id if variant else None)
+
+        def change(data):
+            next_version = _next_version(data, version)
+            if field not in data:
+                return {}, False
+            return {field: None, _price_field(field): None, '_version': next_version}, True
+
+        return self._update(owner, change)
+
+    def clear(self, owner, version=None):
+        def change(data):
+            updates = {field: None for field in data if not field.startswith('_')}
+            updates.update({field: None for field in data if field.startswith(PRICE_FIELD_PREFIX)})
+            updates['_version'] = _next_version(data, version)
+            return updates, None
+
+        self._update(owner, change)
+
+    def apply(self, owner, operations, version=None):
+        """
+        Apply all operations to the cart hash in one atomic update.
+        """
+        prices = {
+            line_key(operation.product.id, operation.variant.id if operation.variant else None):
+                _to_cents(operation.variant.price if operation.variant else operation.product.price)
+            for operation in operations
+        }
+
+        def change(data):
+            updates = {'_version': _next_version(data, version)}
+            lines = self._lines(data)
+            results = _apply_operations(lines, operations)
+            fields = {line_key(*line): quantity for line, quantity in lines.items()}
+            for field in data:
+                if not field.startswith('_') and field not in fields:
+                    updates[field] = None
+                    updates[_price_field(field)] = None
+            for field, quantity in fields.items():
+                if data.get(field) != quantity:
+                    updates[field] = quantity
+                if field not in data:
+                    updates[_price_field(field)] = prices[field]
+            return updates, results
+
+        return self._update(owner, change)
+
+    def sync(self, owner, create=True):
+        if self.hashes.remove_member(self.DIRTY_KEY, owner.key):
+            try:
+                self._write_back([owner])
+            except Exception:
+                self._mark_dirty(owner)
+                raise
+        return super().sync(owner, create)
+
+    def invalidate(self, owner):
+        self.hashes.delete(self._key(owner))
+
+    def flush(self, batch_size=None):
+        batch_size = batch_size or settings.CART_FLUSH_BATCH_SIZE
+        flushed = 0
+        while True:
+            keys = self.hashes.pop_members(self.DIRTY_KEY, batch_size)
+            if not keys:
+                return flushed
+            owners = [CartOwner.from_key(key) for key in keys]
+            try:
+                self._write_back(owners)
+            except Exception:
+                for key in keys:
+                    self.hashes.add_member(self.DIRTY_KEY, key)
+                raise
+            flushed += len(owners)
+
+    def _write_back(self, owners):
+        """
+        Replace the database lines of the given carts with the cached ones,
+        then let the cached copies expire again.
+        """
+        snapshots, prices, versions = {}, {}, {}
+        for owner in owners:
+            data = self.hashes.get_all(self._key(owner))
+            if '_loaded' in data:
+                snapshots[owner] = self._lines(data)
+                prices[owner] = self._snapshots(data)
+                versions[owner] = data.get('_version', 0)
+
+        with transaction.atomic():
+            carts = self._get_or_create_carts(snapshots)
+            created, updated, deleted = write_lines(
+                {carts[owner]: lines for owner, lines in snapshots.items()},
+                {carts[owner]: prices[owner] for owner in snapshots}
+            )
+            # Keep the database version in step with the cached one.
+            for owner, cart in carts.items():
+                cart.version = versions[owner]
+            Cart.objects.bulk_update(carts.values(), ['version'])
+
+        # A cart changed since it was read stays dirty and keeps no expiry.
+        for owner, version in versions.items():
+            self.hashes.expire_if(self._key(owner), version, self.timeout)
+
+        logger.debug(
+            "Flushed %s carts: %s created, %s updated, %s deleted",
+            len(snapshots), created, updated, deleted
+        )
+
+    def _get_or_create_carts(self, owners):
+        carts = {}
+        user_ids = [owner.user_id for owner in owners if owner.user_id]
+        session_keys = [owner.session_key for owner in owners if not owner.user_id]
+        by_user = Cart.objects.in_bulk(user_ids, field_name='user_id') if user_ids else {}
+        by_session = {
+            cart.session_key: cart
+            for cart in Cart.objects.filter(session_key__in=session_keys)
+        } if session_keys else {}
+
+        for owner in owners:
+            cart = by_user.get(owner.user_id) if owner.user_id else by_session.get(owner.session_key)
+            if cart is None:
+                cart = Cart.objects.create(**owner.cart_lookup())
+            carts[owner] = cart
+        return carts
+
+
+def merge_guest_cart(request, user):
+    """
+    Merge the guest cart sent with ``request`` into ``user``'s cart on login.
+    """
+    cart_key = guest_cart_key(request)
+    if not cart_key:
+        return 0
+    merged = get_cart_store().merge(CartOwner.for_guest(cart_key), CartOwner.for_user(user))
+    session = getattr(request, 'session', None)
+    if session is not None:
+        session.pop(SESSION_CART_KEY, None)
+    return merged
+
+
+@functools.lru_cache(maxsize=None)
+def get_cart_store():
+    """
+    Return the cart store configured by ``CART_STORE_BACKEND``.
+    """
+    return import_string(settings.CART_STORE_BACKEND)()
+
+
+@receiver(setting_changed)
+def _reset_cart_store(setting, **kwargs):
+    if setting.startswith('CART_'):
+        get_cart_store.cache_clear()
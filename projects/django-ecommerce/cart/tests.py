@@ -1,3 +1,92 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from products.models import Product
+from promotions.models import Promotion
+
+
+class CartPromotionsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='shopper@example.com', username='shopper', password='secret',
+            first_name='Shopper', last_name='One'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Kettle', description='Description', sku='KETTLE',
+            price=Decimal('10.00'), stock_quantity=10
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_discount_uses_the_same_prices_as_the_totals(self):
+        now = timezone.now()
+        Promotion.objects.create(
+            name='Half price', promotion_type='percentage', value=Decimal('50'),
+            product=self.product, valid_from=now - timedelta(days=1),
+            valid_until=now + timedelta(days=1)
+        )
+        response = self.client.post(
+            '/api/cart/add/', {'product_id': self.product.id, 'quantity': 2}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        self.product.price = Decimal('30.00')
+        self.product.save()
+        call_command('reprice_carts')
+
+        data = self.client.get('/api/cart/').data
+        self.assertTrue(data['items'][0]['price_changed'])
+        self.assertEqual(data['total_price'], '20.00')
+        self.assertEqual(data['promotions']['discount'], '10.00')
+
+
+@override_settings(CART_STORE_BACKEND='cart.stores.CacheCartStore')
+class CacheCartStoreApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='shopper@example.com', username='shopper', password='secret',
+            first_name='Shopper', last_name='One'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name='Kettle', description='Description', sku='KETTLE',
+            price=Decimal('10.00'), stock_quantity=10
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_added_line_is_addressable(self):
+        response = self.client.post(
+            '/api/cart/add/', {'product_id': self.product.id, 'quantity': 2}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['product_id'], self.product.id)
+        self.assertIsNone(response.data['variant_id'])
+        self.assertEqual(response.data['quantity'], 2)
+
+        item_id = self.client.get('/api/cart/').data['items'][0]['id']
+        response = self.client.post(
+            f'/api/cart/items/{item_id}/update/', {'quantity': 3}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], item_id)
+
+        response = self.client.post(f'/api/cart/remove/{self.product.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/cart/').data['items'], [])
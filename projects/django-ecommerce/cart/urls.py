@@ -13,6 +13,7 @@ urlpatterns = [
     path('items/', views.CartItemListView.as_view(), name='cart_items'),
     path('items/<int:pk>/', views.CartItemDetailView.as_view(), name='cart_item_detail'),
     path('add/', views.add_to_cart, name='add_to_cart'),
+    path('batch/', views.batch_update_cart, name='batch_update_cart'),
     path('remove/<int:product_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('items/<int:item_id>/update/', views.update_cart_item, name='update_cart_item'),
     path('clear/', views.clear_cart, name='clear_cart'),
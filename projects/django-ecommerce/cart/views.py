@@ -7,29 +7,121 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils import timezone
+from django.utils.http import parse_etags
 
-from .models import Cart, CartItem, Wishlist
+from .models import CartItem, CartVersionConflict, Wishlist
+from .stores import CartOperation, CartOwner, get_cart_store
 from .serializers import (
     CartSerializer, CartItemSerializer, WishlistSerializer,
-    AddToCartSerializer, UpdateCartItemSerializer
+    AddToCartSerializer, BatchCartSerializer, UpdateCartItemSerializer
 )
-from products.models import Product, ProductVariant
+from products.models import CoPurchaseRun, Product, ProductVariant
+from promotions.engine import get_compiled
+
+
+def _load_cart(store, owner):
+    """
+    Sync the owner's cart and prefetch everything ``CartSerializer`` renders.
+
+    Owners without a cart get an empty unsaved one.
+    """
+    cart = store.sync(owner, create=False)
+    if cart.pk is not None:
+        prefetch_related_objects(
+            [cart], Prefetch('items', queryset=CartItem.objects.with_product_snapshot())
+        )
+    return cart
+
+
+def _cart_items(store, owner):
+    """
+    Return the lines of the owner's cart without creating it.
+    """
+    return store.sync(owner, create=False).get_items().select_related('product', 'variant')
+
+
+def _cart_etag(owner, version, generation=None):
+    if generation is None:
+        return f'"{owner.key}:{version}"'
+    return f'"{owner.key}:{version}:{generation}"'
+
+
+def _content_generation():
+    """
+    Identify what a rendered cart shows besides its lines: the active
+    promotions and the latest "also bought" recommendations.
+    """
+    run_id = CoPurchaseRun.objects.values_list('id', flat=True).first() or 0
+    return f"{get_compiled().generation}.{run_id}"
+
+
+def _not_modified(request, etag):
+    """
+    Return a 304 response if the request's ``If-None-Match`` matches ``etag``.
+    """
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return None
+
+
+def _expected_version(request, owner):
+    """
+    Return the cart version required by the request's ``If-Match`` header,
+    or ``None`` if the request is unconditional.
+    """
+    etags = parse_etags(request.headers.get('If-Match', ''))
+    if not etags or etags == ['*']:
+        return None
+    for etag in etags:
+        key, _sep, version = etag.removeprefix('W/').strip('"').partition(':')
+        version = version.partition(':')[0]
+        if key == owner.key and version.isdigit():
+            return int(version)
+    raise CartVersionConflict("Cart has been modified")
+
+
+def _with_etag(response, store, owner):
+    response['ETag'] = _cart_etag(owner, store.get_version(owner))
+    return response
+
+
+def _version_conflict(store, owner):
+    return _with_etag(Response(
+        {'error': 'Cart has been modified'},
+        status=status.HTTP_412_PRECONDITION_FAILED
+    ), store, owner)
 
 
 class CartView(generics.RetrieveAPIView):
     """
-    Retrieve the current user's cart.
+    Retrieve the current user's or guest's cart.
+
+    Responses carry an ETag of the cart version and of the promotions and
+    recommendations shown with it; a matching ``If-None-Match`` returns 304
+    without loading the cart lines.
     """
     serializer_class = CartSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.AllowAny]
 
     def get_object(self):
         """
-        Get or create cart for the current user.
+        Get the current user's cart, or an empty one if they have none yet.
         """
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        return _load_cart(get_cart_store(), CartOwner.from_request(self.request))
+
+    def retrieve(self, request, *args, **kwargs):
+        owner = CartOwner.from_request(request)
+        generation = _content_generation()
+        not_modified = _not_modified(
+            request, _cart_etag(owner, get_cart_store().get_version(owner), generation)
+        )
+        if not_modified:
+            return not_modified
+        response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = _cart_etag(owner, response.data['version'], generation)
+        return response
 
 
 class CartItemListView(generics.ListCreateAPIView):
@@ -37,21 +129,22 @@ class CartItemListView(generics.ListCreateAPIView):
     List and create cart items.
     """
     serializer_class = CartItemSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
         """
         Get cart items for the current user.
         """
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart)
+        return _cart_items(get_cart_store(), CartOwner.from_request(self.request))
 
     def perform_create(self, serializer):
         """
         Create a new cart item.
         """
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        serializer.save(cart=cart)
+        owner = CartOwner.from_request(self.request)
+        store = get_cart_store()
+        serializer.save(cart=store.sync(owner))
+        store.invalidate(owner)
 
 
 class CartItemDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -59,18 +152,25 @@ class CartItemDetailView(generics.RetrieveUpdateDestroyAPIView):
     Retrieve, update, or delete a cart item.
     """
     serializer_class = CartItemSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
         """
         Get cart items for the current user.
         """
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart)
+        return _cart_items(get_cart_store(), CartOwner.from_request(self.request))
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        get_cart_store().invalidate(CartOwner.from_request(self.request))
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        get_cart_store().invalidate(CartOwner.from_request(self.request))
 
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
 def add_to_cart(request):
     """
     Add an item to the cart.
@@ -103,12 +203,18 @@ def add_to_cart(request):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        
+        owner = CartOwner.from_request(request)
+        store = get_cart_store()
         try:
-            cart_item = cart.add_item(product, quantity, variant)
+            cart_item = store.add(
+                owner, product, quantity, variant, _expected_version(request, owner)
+            )
             cart_item_serializer = CartItemSerializer(cart_item)
-            return Response(cart_item_serializer.data, status=status.HTTP_201_CREATED)
+            return _with_etag(
+                Response(cart_item_serializer.data, status=status.HTTP_201_CREATED), store, owner
+            )
+        except CartVersionConflict:
+            return _version_conflict(store, owner)
         except ValueError as e:
             return Response(
                 {'error': str(e)},
@@ -119,7 +225,7 @@ def add_to_cart(request):
 
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
 def remove_from_cart(request, product_id):
     """
     Remove an item from the cart.
@@ -148,11 +254,17 @@ def remove_from_cart(request, product_id):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    success = cart.remove_item(product, variant)
+    owner = CartOwner.from_request(request)
+    store = get_cart_store()
+    try:
+        success = store.remove(owner, product, variant, _expected_version(request, owner))
+    except CartVersionConflict:
+        return _version_conflict(store, owner)
     
     if success:
-        return Response({'message': 'Item removed from cart'}, status=status.HTTP_200_OK)
+        return _with_etag(
+            Response({'message': 'Item removed from cart'}, status=status.HTTP_200_OK), store, owner
+        )
     else:
         return Response(
             {'error': 'Item not found in cart'},
@@ -161,16 +273,15 @@ def remove_from_cart(request, product_id):
 
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
 def update_cart_item(request, item_id):
     """
     Update cart item quantity.
     """
+    owner = CartOwner.from_request(request)
+    store = get_cart_store()
     try:
-        cart_item = CartItem.objects.get(
-            id=item_id,
-            cart__user=request.user
-        )
+        cart_item = _cart_items(store, owner).get(id=item_id)
     except CartItem.DoesNotExist:
         return Response(
             {'error': 'Cart item not found'},
@@ -185,10 +296,17 @@ def update_cart_item(request, item_id):
     if serializer.is_valid():
         quantity = serializer.validated_data['quantity']
         try:
+            store.set_quantity(
+                owner, cart_item.product, quantity, cart_item.variant,
+                _expected_version(request, owner)
+            )
             cart_item.quantity = quantity
-            cart_item.save()
             cart_item_serializer = CartItemSerializer(cart_item)
-            return Response(cart_item_serializer.data, status=status.HTTP_200_OK)
+            return _with_etag(
+                Response(cart_item_serializer.data, status=status.HTTP_200_OK), store, owner
+            )
+        except CartVersionConflict:
+            return _version_conflict(store, owner)
         except ValueError as e:
             return Response(
                 {'error': str(e)},
@@ -199,14 +317,82 @@ def update_cart_item(request, item_id):
 
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
+def batch_update_cart(request):
+    """
+    Apply a list of add, set and remove operations to the cart.
+
+    Products and variants are loaded with one query each. Operations that
+    reference unknown or inactive items, or exceed stock, are reported in
+    ``results`` without affecting the rest of the batch.
+    """
+    serializer = BatchCartSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    operations = serializer.validated_data['operations']
+    products = Product.objects.filter(is_active=True).in_bulk(
+        {operation['product_id'] for operation in operations}
+    )
+    variants = ProductVariant.objects.filter(is_active=True).in_bulk(
+        {operation['variant_id'] for operation in operations if operation.get('variant_id')}
+    )
+
+    results = [None] * len(operations)
+    valid = []
+    for index, data in enumerate(operations):
+        product = products.get(data['product_id'])
+        variant = variants.get(data.get('variant_id')) if data.get('variant_id') else None
+        if product is None:
+            error = 'Product not found or inactive'
+        elif data.get('variant_id') and (variant is None or variant.product_id != product.id):
+            error = 'Product variant not found or inactive'
+        else:
+            valid.append((index, CartOperation(data['op'], product, variant, data.get('quantity'))))
+            continue
+        results[index] = {
+            'op': data['op'],
+            'product_id': data['product_id'],
+            'variant_id': data.get('variant_id'),
+            'status': 'error',
+            'quantity': None,
+            'error': error,
+        }
+
+    owner = CartOwner.from_request(request)
+    store = get_cart_store()
+    try:
+        applied = store.apply(
+            owner, [operation for index, operation in valid], _expected_version(request, owner)
+        )
+    except CartVersionConflict:
+        return _version_conflict(store, owner)
+    for (index, operation), result in zip(valid, applied):
+        results[index] = result
+
+    generation = _content_generation()
+    cart = _load_cart(store, owner)
+    return Response({
+        'results': results,
+        'cart': CartSerializer(cart, context={'request': request}).data
+    }, status=status.HTTP_200_OK, headers={'ETag': _cart_etag(owner, cart.version, generation)})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
 def clear_cart(request):
     """
     Clear all items from the cart.
     """
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    cart.clear()
-    return Response({'message': 'Cart cleared'}, status=status.HTTP_200_OK)
+    owner = CartOwner.from_request(request)
+    store = get_cart_store()
+    try:
+        store.clear(owner, _expected_version(request, owner))
+    except CartVersionConflict:
+        return _version_conflict(store, owner)
+    return _with_etag(
+        Response({'message': 'Cart cleared'}, status=status.HTTP_200_OK), store, owner
+    )
 
 
 class WishlistView(generics.ListCreateAPIView):
@@ -309,17 +495,22 @@ def remove_from_wishlist(request, product_id):
 
 
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
 def cart_summary(request):
     """
     Get cart summary information.
+
+    Served from the cart's cached totals, with an ETag of the cart version.
     """
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    
-    summary = {
-        'total_items': cart.total_items,
-        'total_price': float(cart.total_price),
-        'item_count': cart.items.count()
-    }
+    owner = CartOwner.from_request(request)
+    store = get_cart_store()
+    etag = _cart_etag(owner, store.get_version(owner))
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    summary = store.summary(owner)
+    etag = _cart_etag(owner, summary.pop('version'))
+    summary['total_price'] = float(summary['total_price'])
     
-    return Response(summary, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response(summary, status=status.HTTP_200_OK, headers={'ETag': etag})
\ No newline at end of file
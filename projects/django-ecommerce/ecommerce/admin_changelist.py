@@ -0,0 +1,190 @@
+"""
+Admin changelists for large tables.
+
+The stock changelist runs ``COUNT(*)`` twice per page (filtered and
+unfiltered) and pages with ``OFFSET``, both of which scan the table and get
+slower as it grows. ``LargeTableAdminMixin`` replaces them:
+
+* the unfiltered count comes from the planner's row estimate on
+  PostgreSQL, and other counts stop at ``ADMIN_EXACT_COUNT_LIMIT`` rows;
+* the full result count is not shown;
+* with ``keyset_pagination`` the list is ordered by newest id first and
+  paged with "next page" links that continue below the last id shown, so
+  every page costs the same as the first and nothing is counted.
+
+``InputFilter`` is a list filter that takes a typed value, for relations
+with too many rows to list as filter choices.
+"""
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+KEYSET_VAR = 'after'
+
+
+def estimated_count(queryset):
+    """
+    Return the planner's row estimate for the table of ``queryset`` on
+    PostgreSQL, or ``None`` when there is none.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed.
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never counts more than ``ADMIN_EXACT_COUNT_LIMIT`` rows.
+
+    Unfiltered tables larger than that report the planner's estimate;
+    filtered results are counted up to the limit plus one.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit + 1].count()
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist ordered by descending primary key and paged by the last
+    primary key shown instead of a page number.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.keyset_after = request.GET.get(KEYSET_VAR)
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(KEYSET_VAR, None)
+        return lookup_params
+
+    def get_ordering(self, request, queryset):
+        return ['-pk']
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.keyset_after:
+            try:
+                queryset = queryset.filter(pk__lt=int(self.keyset_after))
+            except ValueError as e:
+                raise IncorrectLookupParameters(e)
+        return queryset
+
+    def get_results(self, request):
+        result_list = self.queryset[:self.list_per_page]
+        rows = list(result_list)
+
+        self.result_count = len(rows)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = result_list
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = None
+
+        self.keyset_first_url = (
+            self.get_query_string(remove=[KEYSET_VAR, PAGE_VAR]) if self.keyset_after else None
+        )
+        self.keyset_next_url = None
+        if len(rows) == self.list_per_page:
+            self.keyset_next_url = self.get_query_string(
+                {KEYSET_VAR: rows[-1].pk}, remove=[PAGE_VAR]
+            )
+
+
+class LargeTableAdminMixin:
+    """
+    ``ModelAdmin`` mixin for tables too large to count or page by offset.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    keyset_pagination = False
+
+    def get_changelist(self, request, **kwargs):
+        if self.keyset_pagination:
+            return KeysetChangeList
+        return super().get_changelist(request, **kwargs)
+
+    def get_sortable_by(self, request):
+        # Keyset pages only follow the primary key.
+        if self.keyset_pagination:
+            return ()
+        return super().get_sortable_by(request)
+
+    @property
+    def change_list_template(self):
+        if self.keyset_pagination:
+            return 'admin/keyset_change_list.html'
+        return None
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter with a text box, matching ``lookup`` against the typed
+    value. Subclasses set ``title``, ``parameter_name`` and ``lookup``.
+    """
+
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if value:
+            return queryset.filter(**{self.lookup: value})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name, KEYSET_VAR, PAGE_VAR]
+            ),
+            'display': _('All'),
+            'value': self.value() or '',
+            'query_parts': [
+                (key, value)
+                for key, values in changelist.filter_params.items()
+                if key not in (self.parameter_name, KEYSET_VAR)
+                for value in values
+            ],
+        }
+
+
+class UserEmailFilter(InputFilter):
+    """
+    Filter by the exact email address of the related user.
+    """
+
+    title = _('user email')
+    parameter_name = 'user_email'
+    lookup = 'user__email'
@@ -0,0 +1,34 @@
+"""
+Celery application for the ecommerce project.
+"""
+
+import logging
+import os
+
+from celery import Celery
+from django.db import transaction
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings.production')
+
+app = Celery('ecommerce')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+logger = logging.getLogger(__name__)
+
+
+def delay_on_commit(task, *args, **kwargs):
+    """
+    Enqueue ``task`` once the current transaction commits.
+
+    Tasks are dropped with the transaction if it rolls back. A broker outage
+    is logged rather than raised, since the request's writes are already
+    committed by then.
+    """
+    def enqueue():
+        try:
+            task.delay(*args, **kwargs)
+        except Exception:
+            logger.exception("Could not enqueue task %s", task.name)
+
+    transaction.on_commit(enqueue)
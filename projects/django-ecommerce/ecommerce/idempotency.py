@@ -0,0 +1,122 @@
+"""
+Idempotency keys for API endpoints that create orders or payments.
+
+A client sends a unique ``Idempotency-Key`` header with a POST. The first
+response for that key is stored in the cache and replayed for retries, so a
+retried request never runs the view twice. While the first request is still
+running, retries wait for its response instead of racing it. Keys are scoped
+to the user and endpoint and expire after ``IDEMPOTENCY_KEY_TTL`` seconds.
+"""
+
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http.request import RawPostDataException
+from django.utils.crypto import get_random_string
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+
+
+def _cache():
+    return caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+
+
+def _fingerprint(request):
+    try:
+        body = request.body
+    except RawPostDataException:
+        # Multipart bodies are streamed and cannot be read twice.
+        body = repr(sorted(request.data.items())).encode()
+    return hashlib.sha256(body).hexdigest()
+
+
+def _replay(record):
+    response = Response(record['data'], status=record['status'])
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _reused_key():
+    return Response(
+        {'detail': 'Idempotency-Key was already used for a different request.'},
+        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+    )
+
+
+def idempotency_key_for(request, *scope):
+    """
+    Derive a key for a downstream call (e.g. Stripe) from the request's
+    Idempotency-Key, or ``None`` if the request did not send one.
+
+    Use a distinct ``scope`` for every downstream call a view makes.
+    """
+    key = getattr(request, 'idempotency_key', None)
+    if not key:
+        return None
+    return ':'.join([str(request.user.pk), key, *scope])
+
+
+def idempotent(view):
+    """
+    Make a view honour the ``Idempotency-Key`` header.
+
+    Wrap the view function below ``@api_view`` (or use ``method_decorator``
+    on a view method), so the request is already authenticated. Responses
+    with a 5xx status are not stored and may be retried.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache = _cache()
+        cache_key = f'idempotency:{request.user.pk}:{request.method}:{request.path}:{key}'
+        lock_key = f'{cache_key}:lock'
+        fingerprint = _fingerprint(request)
+        token = get_random_string(16)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+
+        while True:
+            record = cache.get(cache_key)
+            if record is not None:
+                if record['fingerprint'] != fingerprint:
+                    return _reused_key()
+                return _replay(record)
+            if cache.add(lock_key, token, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                break
+            if time.monotonic() >= deadline:
+                return Response(
+                    {'detail': 'A request with this Idempotency-Key is still in progress.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            request.idempotency_key = key
+            response = view(request, *args, **kwargs)
+            if response.status_code < 500:
+                cache.set(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                }, timeout=settings.IDEMPOTENCY_KEY_TTL)
+            return response
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    return wrapper
@@ -45,6 +45,9 @@ LOCAL_APPS = [
     'cart',
     'orders',
     'payments',
+    'analytics',
+    'outbox',
+    'promotions',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -56,6 +59,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cart.middleware.CartTokenMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -182,7 +186,11 @@ SIMPLE_JWT = {
 }
 
 # CORS Settings
+from corsheaders.defaults import default_headers
+
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:3000,http://127.0.0.1:3000').split(',')
+CORS_ALLOW_HEADERS = (*default_headers, 'x-cart-token', 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['X-Cart-Token', 'Idempotent-Replayed', 'Export-Watermark']
 
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
@@ -199,12 +207,104 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_BEAT_SCHEDULE = {
+    'update-co-purchases': {
+        'task': 'products.tasks.update_co_purchases',
+        'schedule': 60 * 15,
+    },
+    'release-stock-reservations': {
+        'task': 'orders.tasks.release_stock_reservations',
+        'schedule': 60,
+    },
+    'archive-orders': {
+        'task': 'orders.tasks.archive_orders',
+        'schedule': 60 * 60 * 24,
+    },
+    'fold-coupon-usage': {
+        'task': 'orders.tasks.fold_coupon_usage',
+        'schedule': 60,
+    },
+    'rebuild-recent-sales-rollups': {
+        'task': 'analytics.tasks.rebuild_recent_sales_rollups',
+        'schedule': 60 * 60 * 24,
+    },
+    'relay-outbox': {
+        'task': 'outbox.tasks.relay_outbox',
+        'schedule': 5,
+    },
+    'purge-outbox': {
+        'task': 'outbox.tasks.purge_outbox',
+        'schedule': 60 * 60 * 24,
+    },
+}
 
 # Stripe Configuration
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
 
+# Cart storage
+CART_STORE_BACKEND = config('CART_STORE_BACKEND', default='cart.stores.DatabaseCartStore')
+CART_CACHE_ALIAS = config('CART_CACHE_ALIAS', default='default')
+CART_CACHE_TIMEOUT = config('CART_CACHE_TIMEOUT', default=60 * 60 * 24 * 7, cast=int)
+CART_FLUSH_BATCH_SIZE = config('CART_FLUSH_BATCH_SIZE', default=500, cast=int)
+CART_REPRICE_ACTIVE_DAYS = config('CART_REPRICE_ACTIVE_DAYS', default=30, cast=int)
+
+# Checkout
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=60 * 15, cast=int)
+COUPON_USAGE_SHARDS = config('COUPON_USAGE_SHARDS', default=16, cast=int)
+COUPON_CAMPAIGN_CHUNK_SIZE = config('COUPON_CAMPAIGN_CHUNK_SIZE', default=10000, cast=int)
+
+# Promotions
+PROMOTIONS_CACHE_TIMEOUT = config('PROMOTIONS_CACHE_TIMEOUT', default=60 * 5, cast=int)
+PROMOTIONS_EXACT_LIMIT = config('PROMOTIONS_EXACT_LIMIT', default=12, cast=int)
+
+# Order archive
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+ORDER_PARTITION_MONTHS_AHEAD = config('ORDER_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+
+# Bulk order status changes
+ORDER_BULK_STATUS_CHUNK_SIZE = config('ORDER_BULK_STATUS_CHUNK_SIZE', default=500, cast=int)
+ORDER_BULK_STATUS_MAX_ORDERS = config('ORDER_BULK_STATUS_MAX_ORDERS', default=5000, cast=int)
+
+# Order exports: incremental watermarks trail the export by this many seconds
+ORDER_EXPORT_WATERMARK_LAG = config('ORDER_EXPORT_WATERMARK_LAG', default=60 * 5, cast=int)
+
+# Order detail cache
+ORDER_CACHE_TIMEOUT = config('ORDER_CACHE_TIMEOUT', default=60, cast=int)
+
+# Idempotency keys
+IDEMPOTENCY_CACHE_ALIAS = config('IDEMPOTENCY_CACHE_ALIAS', default='default')
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=60 * 60 * 24, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=60, cast=int)
+IDEMPOTENCY_WAIT_TIMEOUT = config('IDEMPOTENCY_WAIT_TIMEOUT', default=10, cast=int)
+
+# Product pages
+PRODUCT_CACHE_TIMEOUT = config('PRODUCT_CACHE_TIMEOUT', default=60 * 5, cast=int)
+
+# Recommendations
+RECOMMENDATIONS_TOP_K = config('RECOMMENDATIONS_TOP_K', default=10, cast=int)
+RECOMMENDATIONS_SCORING = config('RECOMMENDATIONS_SCORING', default='lift')
+RECOMMENDATIONS_WATERMARK_LAG = config('RECOMMENDATIONS_WATERMARK_LAG', default=60 * 5, cast=int)
+
+# Sales analytics
+ANALYTICS_REBUILD_CHUNK_DAYS = config('ANALYTICS_REBUILD_CHUNK_DAYS', default=7, cast=int)
+ANALYTICS_REBUILD_RECENT_DAYS = config('ANALYTICS_REBUILD_RECENT_DAYS', default=2, cast=int)
+ANALYTICS_MAX_RANGE_DAYS = config('ANALYTICS_MAX_RANGE_DAYS', default=366 * 2, cast=int)
+
+# Transactional outbox
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)
+OUTBOX_KICK_INTERVAL = config('OUTBOX_KICK_INTERVAL', default=1, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=10, cast=int)
+OUTBOX_RETRY_DELAY = config('OUTBOX_RETRY_DELAY', default=5, cast=int)
+OUTBOX_MAX_RETRY_DELAY = config('OUTBOX_MAX_RETRY_DELAY', default=60 * 60, cast=int)
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=7, cast=int)
+
+# Admin changelists count at most this many rows exactly
+ADMIN_EXACT_COUNT_LIMIT = config('ADMIN_EXACT_COUNT_LIMIT', default=10000, cast=int)
+
 # Site ID for Django Allauth
 SITE_ID = 1
 
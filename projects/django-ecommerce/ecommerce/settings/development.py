@@ -21,6 +21,9 @@ DATABASES = {
 # Email backend for development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Run Celery tasks in-process so no worker is needed
+CELERY_TASK_ALWAYS_EAGER = True
+
 # CORS settings for development
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
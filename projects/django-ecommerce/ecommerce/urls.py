@@ -38,6 +38,8 @@ urlpatterns = [
     path('api/cart/', include('cart.urls')),
     path('api/orders/', include('orders.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/analytics/', include('analytics.urls')),
+    path('api/outbox/', include('outbox.urls')),
 ]
 
 # Serve media files in development
@@ -1,5 +1,14 @@
-from django.contrib import admin
-from .models import Order, OrderItem, OrderStatusHistory, Coupon
+from django.contrib import admin, messages
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from ecommerce.admin_changelist import LargeTableAdminMixin
+from ecommerce.celery import delay_on_commit
+from . import campaigns
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, CampaignCode, Coupon, CouponCampaign, CustomerStats,
+    Order, OrderItem, OrderStatusHistory, StockReservation
+)
+from .tasks import generate_campaign_codes
 
 
 class OrderItemInline(admin.TabularInline):
@@ -7,6 +16,7 @@ class OrderItemInline(admin.TabularInline):
     extra = 0
     fields = ('product', 'variant', 'quantity', 'unit_price', 'total_price')
     readonly_fields = ('unit_price', 'total_price')
+    raw_id_fields = ('product', 'variant')
 
 
 class OrderStatusHistoryInline(admin.TabularInline):
@@ -14,10 +24,11 @@ class OrderStatusHistoryInline(admin.TabularInline):
     extra = 0
     fields = ('status', 'notes', 'created_at', 'created_by')
     readonly_fields = ('created_at',)
+    raw_id_fields = ('created_by',)
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         'order_number', 'user', 'status', 'payment_status', 'total_amount',
         'billing_full_name', 'created_at'
@@ -25,6 +36,9 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ('status', 'payment_status', 'created_at', 'billing_country')
     search_fields = ('order_number', 'user__email', 'billing_first_name', 'billing_last_name')
     readonly_fields = ('order_number', 'created_at', 'updated_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    keyset_pagination = True
     inlines = [OrderItemInline, OrderStatusHistoryInline]
     
     fieldsets = (
@@ -59,24 +73,72 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user').prefetch_related('items')
-
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('order', 'product', 'variant', 'quantity', 'unit_price', 'total_price')
     list_filter = ('created_at',)
     search_fields = ('order__order_number', 'product__name')
     readonly_fields = ('total_price',)
+    list_select_related = ('order', 'product', 'variant')
+    raw_id_fields = ('order', 'product', 'variant')
+    keyset_pagination = True
 
 
 @admin.register(OrderStatusHistory)
-class OrderStatusHistoryAdmin(admin.ModelAdmin):
+class OrderStatusHistoryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('order', 'status', 'created_at', 'created_by')
     list_filter = ('status', 'created_at')
     search_fields = ('order__order_number', 'notes')
     readonly_fields = ('created_at',)
+    list_select_related = ('order', 'created_by')
+    raw_id_fields = ('order', 'created_by')
+    keyset_pagination = True
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    fields = ('product', 'variant', 'quantity', 'unit_price', 'total_price')
+    readonly_fields = fields
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('order_number', 'user', 'status', 'payment_status', 'total_amount', 'created_at')
+    list_filter = ('status', 'payment_status', 'created_at')
+    search_fields = ('order_number', 'user__email')
+    list_select_related = ('user',)
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CustomerStats)
+class CustomerStatsAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'user', 'total_orders', 'paid_orders', 'total_spent', 'average_order_value',
+        'last_order_at'
+    )
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+    list_select_related = ('user',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('cart', 'product', 'variant', 'quantity', 'expires_at', 'created_at')
+    list_filter = ('expires_at',)
+    search_fields = ('product__name', 'variant__sku')
+    raw_id_fields = ('cart', 'product', 'variant')
+    list_select_related = ('cart__user', 'product', 'variant')
+    readonly_fields = ('created_at',)
 
 
 @admin.register(Coupon)
@@ -100,4 +162,73 @@ class CouponAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(CouponCampaign)
+class CouponCampaignAdmin(admin.ModelAdmin):
+    list_display = (
+        'name', 'prefix', 'coupon_type', 'value', 'usage_limit', 'size', 'generated_count',
+        'is_active', 'valid_from', 'valid_until'
+    )
+    list_filter = ('coupon_type', 'is_active', 'valid_from', 'valid_until')
+    search_fields = ('name', 'prefix')
+    readonly_fields = ('generated_count', 'created_at', 'updated_at')
+    actions = ['generate_codes', 'download_codes']
+
+    fieldsets = (
+        ('Campaign Information', {
+            'fields': ('name', 'description', 'coupon_type', 'value')
+        }),
+        ('Codes', {
+            'fields': ('prefix', 'code_length', 'size', 'generated_count')
+        }),
+        ('Usage Rules', {
+            'fields': ('minimum_amount', 'maximum_discount', 'usage_limit')
+        }),
+        ('Validity', {
+            'fields': ('is_active', 'valid_from', 'valid_until')
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def get_readonly_fields(self, request, obj=None):
+        # Codes already handed out keep matching their campaign.
+        if obj and obj.generated_count:
+            return self.readonly_fields + ('prefix', 'code_length')
+        return self.readonly_fields
+
+    @admin.action(description=_('Generate missing codes'))
+    def generate_codes(self, request, queryset):
+        for campaign in queryset:
+            delay_on_commit(generate_campaign_codes, campaign.pk)
+        self.message_user(
+            request, _('Code generation started for %d campaigns.') % len(queryset)
+        )
+
+    @admin.action(description=_('Download codes as CSV'))
+    def download_codes(self, request, queryset):
+        if len(queryset) != 1:
+            self.message_user(request, _('Select one campaign to download.'), messages.ERROR)
+            return None
+        campaign = queryset[0]
+        response = StreamingHttpResponse(campaigns.csv_lines(campaign), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="coupons-{campaign.prefix}.csv"'
+        return response
+
+
+@admin.register(CampaignCode)
+class CampaignCodeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('code', 'campaign', 'used_count')
+    list_filter = ('campaign',)
+    search_fields = ('=code',)
+    list_select_related = ('campaign',)
+    raw_id_fields = ('campaign',)
+    readonly_fields = ('code',)
+    keyset_pagination = True
+
+    def has_add_permission(self, request):
+        return False
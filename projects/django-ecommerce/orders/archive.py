@@ -0,0 +1,174 @@
+"""
+Archival of closed orders.
+
+Orders in a terminal state are moved in batches from ``orders``,
+``order_items`` and ``order_status_history`` into archive tables with the
+same columns, so the live tables only hold orders that can still change.
+
+On PostgreSQL the archive tables are partitioned by month of ``created_at``.
+Partitions are created ahead of time by ``create_order_partitions``, and
+before every archive batch for the months it covers. A default partition
+catches anything else. Other databases use plain archive tables.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusHistory,
+    Order, OrderItem, OrderStatusHistory
+)
+
+logger = logging.getLogger(__name__)
+
+# Orders in these states never change again.
+TERMINAL_STATUSES = ['delivered', 'cancelled', 'refunded']
+
+# (live model, archive model, column linking the row to its order)
+ARCHIVE_TABLES = [
+    (Order, ArchivedOrder, 'id'),
+    (OrderItem, ArchivedOrderItem, 'order_id'),
+    (OrderStatusHistory, ArchivedOrderStatusHistory, 'order_id'),
+]
+
+
+def uses_partitions():
+    return connection.vendor == 'postgresql'
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value):
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def create_partitions(months):
+    """
+    Create the monthly partitions of every archive table for ``months``
+    (dates on the first of the month). Existing partitions are skipped.
+    Does nothing unless the archive tables are partitioned.
+    """
+    if not uses_partitions():
+        return 0
+    quote = connection.ops.quote_name
+    tz = timezone.get_current_timezone()
+    created = 0
+    with connection.cursor() as cursor:
+        for live_model, archive_model, link in ARCHIVE_TABLES:
+            table = archive_model._meta.db_table
+            for month in sorted(set(months)):
+                cursor.execute(
+                    'SELECT to_regclass(%s)', [partition_name(table, month)]
+                )
+                if cursor.fetchone()[0]:
+                    continue
+                cursor.execute(
+                    f'CREATE TABLE {quote(partition_name(table, month))} '
+                    f'PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)',
+                    [
+                        timezone.make_aware(datetime.combine(month, time.min), tz),
+                        timezone.make_aware(datetime.combine(_next_month(month), time.min), tz),
+                    ]
+                )
+                created += 1
+    return created
+
+
+def create_future_partitions(months_ahead):
+    """
+    Create partitions for the current month and the next ``months_ahead``.
+    """
+    month = _month_start(timezone.localdate())
+    months = [month]
+    for _ in range(months_ahead):
+        month = _next_month(month)
+        months.append(month)
+    return create_partitions(months)
+
+
+def _copy_rows(live_model, archive_model, link, order_ids):
+    """
+    Copy the rows of ``order_ids`` into the archive table and delete them
+    from the live table, one INSERT ... SELECT and one DELETE.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in archive_model._meta.concrete_fields)
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    live_table = quote(live_model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(archive_model._meta.db_table)} ({columns}) '
+            f'SELECT {columns} FROM {live_table} WHERE {quote(link)} IN ({placeholders})',
+            order_ids
+        )
+        cursor.execute(
+            f'DELETE FROM {live_table} WHERE {quote(link)} IN ({placeholders})',
+            order_ids
+        )
+        return cursor.rowcount
+
+
+def archive_orders(older_than_days=None, batch_size=500):
+    """
+    Move orders in a terminal state created more than ``older_than_days``
+    ago into the archive tables, one batch per transaction.
+
+    Returns the number of orders archived.
+    """
+    if older_than_days is None:
+        older_than_days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Order.objects.select_for_update(skip_locked=True).filter(
+                    status__in=TERMINAL_STATUSES,
+                    created_at__lt=cutoff
+                ).order_by('id').values_list('id', 'created_at')[:batch_size]
+            )
+            if not batch:
+                break
+            order_ids = [order_id for order_id, created_at in batch]
+            if uses_partitions():
+                # Items and history can be newer than their order, so cover
+                # every month from the oldest order up to now.
+                month = _month_start(timezone.localtime(min(created for _, created in batch)))
+                months = []
+                while month <= _month_start(timezone.localdate()):
+                    months.append(month)
+                    month = _next_month(month)
+                create_partitions(months)
+            # Children first, so the live foreign keys hold at every step.
+            for live_model, archive_model, link in reversed(ARCHIVE_TABLES):
+                _copy_rows(live_model, archive_model, link, order_ids)
+        archived += len(order_ids)
+        logger.info("Archived %s orders up to order %s", archived, order_ids[-1])
+    return archived
+
+
+def get_order(user, pk, queryset=None):
+    """
+    Return the order ``pk`` of ``user`` from the live or archive tables.
+
+    Raises ``Order.DoesNotExist`` if it is in neither.
+    """
+    queryset = Order.objects.all() if queryset is None else queryset
+    order = queryset.filter(pk=pk, user=user).first()
+    if order is None:
+        order = ArchivedOrder.objects.filter(pk=pk, user=user).prefetch_related(
+            'items', 'status_history__created_by'
+        ).first()
+    if order is None:
+        raise Order.DoesNotExist("Order not found")
+    return order
@@ -0,0 +1,252 @@
+"""
+Bulk coupon codes for campaigns.
+
+A campaign's codes are ``prefix + body + check``. The body of the n-th code
+is n passed through a keyed permutation of all bodies of ``code_length``
+characters: a Feistel network whose rounds are BLAKE2b keyed with the
+campaign's ``code_key``, walked until the result fits. As a permutation it
+never maps two sequence numbers to the same body, so codes are generated
+without checking for collisions, and without the key they cannot be
+guessed from one another. The check character (Luhn mod 32) catches
+mistyped codes before any lookup.
+
+``generate`` fills a campaign up to its ``size``, taking sequence numbers
+from ``generated_count``. Each chunk of codes is written in one statement
+(``COPY`` on PostgreSQL, ``bulk_create`` elsewhere) in the transaction that
+advances the counter, so an interrupted run continues where it stopped.
+
+Campaign codes are found by ``orders.coupons.get_coupon`` when no coupon
+has the code. Campaigns are cached until their ``valid_until``; the codes
+are not, as each is typically used once.
+"""
+
+import csv
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .export import _Echo
+from .models import CampaignCode, CouponCampaign
+
+# Crockford's base 32: digits and capitals without I, L, O and U.
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+BASE = len(ALPHABET)
+_VALUES = {char: value for value, char in enumerate(ALPHABET)}
+
+ROUNDS = 6
+
+
+def check_character(text):
+    """
+    Return the Luhn mod 32 check character of ``text``.
+    """
+    total = 0
+    factor = 2
+    for char in reversed(text):
+        addend = factor * _VALUES[char]
+        total += addend // BASE + addend % BASE
+        factor = 3 - factor
+    return ALPHABET[-total % BASE]
+
+
+def is_well_formed(code):
+    """
+    Return whether ``code`` is made of the alphabet and ends with the right
+    check character.
+    """
+    return (
+        len(code) > 1 and
+        all(char in _VALUES for char in code) and
+        check_character(code[:-1]) == code[-1]
+    )
+
+
+class CodePermutation:
+    """
+    Keyed permutation of ``range(BASE ** length)``.
+    """
+
+    def __init__(self, key, length):
+        self.key = hashlib.blake2b(key.encode()).digest()
+        self.length = length
+        self.size = BASE ** length
+        # Halves covering the bodies; results outside them are walked on.
+        self.half_bits = ((self.size - 1).bit_length() + 1) // 2
+        self.mask = (1 << self.half_bits) - 1
+        self.half_bytes = (self.half_bits + 7) // 8
+
+    def _round(self, number, value):
+        digest = hashlib.blake2b(
+            bytes([number]) + value.to_bytes(self.half_bytes, 'big'),
+            key=self.key,
+            digest_size=self.half_bytes,
+        ).digest()
+        return int.from_bytes(digest, 'big') & self.mask
+
+    def __call__(self, value):
+        while True:
+            left, right = value >> self.half_bits, value & self.mask
+            for number in range(ROUNDS):
+                left, right = right, left ^ self._round(number, right)
+            value = (left << self.half_bits) | right
+            if value < self.size:
+                return value
+
+    def body(self, value):
+        """
+        Return the body of sequence number ``value``.
+        """
+        value = self(value)
+        chars = []
+        for _ in range(self.length):
+            value, digit = divmod(value, BASE)
+            chars.append(ALPHABET[digit])
+        return ''.join(reversed(chars))
+
+
+def codes(campaign, start, count):
+    """
+    Return the codes of ``campaign`` with sequence numbers from ``start``.
+    """
+    permutation = CodePermutation(campaign.code_key, campaign.code_length)
+    result = []
+    for number in range(start, start + count):
+        code = campaign.prefix + permutation.body(number)
+        result.append(code + check_character(code))
+    return result
+
+
+def _write_codes(campaign_id, new_codes):
+    if connection.vendor == 'postgresql':
+        quote = connection.ops.quote_name
+        rows = io.StringIO(''.join(f'{campaign_id}\t{code}\t0\n' for code in new_codes))
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(CampaignCode._meta.db_table)} "
+                f"({quote('campaign_id')}, {quote('code')}, {quote('used_count')}) FROM STDIN",
+                rows
+            )
+    else:
+        CampaignCode.objects.bulk_create(
+            [CampaignCode(campaign_id=campaign_id, code=code) for code in new_codes],
+            batch_size=1000
+        )
+
+
+def generate(campaign, count=None, chunk_size=None):
+    """
+    Add ``count`` codes to ``campaign``, or the codes it is missing to
+    reach its ``size``, in chunks of ``chunk_size``.
+
+    Yields the codes of each chunk once it is committed. Raises
+    ``ValueError`` if the campaign has too few codes left.
+    """
+    chunk_size = chunk_size or settings.COUPON_CAMPAIGN_CHUNK_SIZE
+    wanted = campaign.size - campaign.generated_count if count is None else count
+    left = BASE ** campaign.code_length - campaign.generated_count
+    if wanted > left:
+        raise ValueError(f'Campaign {campaign.prefix} has {left} codes left.')
+
+    while True:
+        with transaction.atomic():
+            # Locked, so concurrent runs take different sequence numbers.
+            campaign = CouponCampaign.objects.select_for_update().get(pk=campaign.pk)
+            if count is None:
+                # Another run may have filled part of the campaign meanwhile.
+                wanted = campaign.size - campaign.generated_count
+            size = min(chunk_size, wanted)
+            if size <= 0:
+                return
+            new_codes = codes(campaign, campaign.generated_count, size)
+            _write_codes(campaign.pk, new_codes)
+            CouponCampaign.objects.filter(pk=campaign.pk).update(
+                generated_count=F('generated_count') + size
+            )
+        wanted -= size
+        yield new_codes
+
+
+def csv_lines(campaign, header=True, chunk_size=None):
+    """
+    Render the codes of ``campaign`` as CSV, reading them in chunks.
+    """
+    writer = csv.writer(_Echo())
+    if header:
+        yield writer.writerow(['code', 'used_count'])
+    rows = CampaignCode.objects.filter(campaign=campaign).order_by('pk').values_list(
+        'code', 'used_count'
+    )
+    for row in rows.iterator(chunk_size=chunk_size or settings.COUPON_CAMPAIGN_CHUNK_SIZE):
+        yield writer.writerow(row)
+
+
+def campaign_cache_key(campaign_id):
+    return f'coupons:campaign:{campaign_id}'
+
+
+def get_campaign(campaign_id):
+    """
+    Return the campaign with ``campaign_id`` or ``None``.
+    """
+    key = campaign_cache_key(campaign_id)
+    campaign = cache.get(key)
+    if campaign is None:
+        campaign = CouponCampaign.objects.filter(pk=campaign_id).first()
+        if campaign is None:
+            return None
+        timeout = int((campaign.valid_until - timezone.now()).total_seconds())
+        if timeout > 0:
+            cache.set(key, campaign, timeout)
+    return campaign
+
+
+def invalidate(campaign_id):
+    cache.delete(campaign_cache_key(campaign_id))
+
+
+def invalidate_on_commit(campaign_id):
+    """
+    Drop the campaign from the cache once the current transaction commits.
+    """
+    transaction.on_commit(lambda: invalidate(campaign_id))
+
+
+def get_campaign_coupon(code):
+    """
+    Return an unsaved ``Coupon`` for the campaign code ``code``, or ``None``.
+    """
+    if not is_well_formed(code):
+        return None
+    row = CampaignCode.objects.filter(code=code).values_list(
+        'pk', 'campaign_id', 'used_count'
+    ).first()
+    if row is None:
+        return None
+    pk, campaign_id, used_count = row
+    campaign = get_campaign(campaign_id)
+    if campaign is None:
+        return None
+    return campaign.coupon(code, used_count=used_count, campaign_code_id=pk)
+
+
+def redeem(coupon):
+    """
+    Count one use of the campaign code of ``coupon`` (from
+    ``get_campaign_coupon``).
+
+    Returns ``False`` if the code was used up, or the campaign disabled or
+    expired, since it was loaded.
+    """
+    now = timezone.now()
+    return bool(CampaignCode.objects.filter(
+        pk=coupon.campaign_code_id,
+        used_count__lt=coupon.usage_limit,
+        campaign__is_active=True,
+        campaign__valid_from__lte=now,
+        campaign__valid_until__gte=now,
+    ).update(used_count=F('used_count') + 1))
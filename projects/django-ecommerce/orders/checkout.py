@@ -0,0 +1,305 @@
+"""
+Order placement for the e-commerce platform.
+
+An order is placed with a fixed number of queries regardless of the number of
+cart lines: the lines are read with their products and variants in one query,
+order items are bulk inserted, and stock is decremented with one conditional
+UPDATE per table.
+
+Starting checkout holds the cart's stock with ``StockReservation`` rows, kept
+in ``reserved_quantity`` counters on products and variants. Placing the order
+turns the cart's holds into decrements; stock held by other carts is never
+taken. Expired holds are released in batches by the sweeper.
+"""
+
+import itertools
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from outbox.events import publish
+from promotions.engine import evaluate_items
+
+from .coupons import get_coupon, redeem
+from .models import Order, OrderItem, OrderStatusHistory, StockReservation
+from .snapshots import product_snapshot
+
+# Address and note fields copied from the checkout form onto the order.
+ORDER_DETAIL_FIELDS = [
+    'billing_first_name', 'billing_last_name', 'billing_company',
+    'billing_address_line_1', 'billing_address_line_2', 'billing_city',
+    'billing_state', 'billing_postal_code', 'billing_country', 'billing_phone',
+    'shipping_first_name', 'shipping_last_name', 'shipping_company',
+    'shipping_address_line_1', 'shipping_address_line_2', 'shipping_city',
+    'shipping_state', 'shipping_postal_code', 'shipping_country', 'shipping_phone',
+    'notes',
+]
+
+
+class EmptyCartError(Exception):
+    """
+    Raised when placing an order from a cart without lines.
+    """
+
+
+class InsufficientStockError(Exception):
+    """
+    Raised when stock for one or more cart lines ran out before the order
+    could be placed. ``items`` holds the affected cart items.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        names = ', '.join(
+            f'{item.product.name} - {item.variant.name}' if item.variant else item.product.name
+            for item in items
+        )
+        super().__init__(f'Insufficient stock for {names}')
+
+
+class CouponUnavailableError(Exception):
+    """
+    Raised when a coupon ran out of uses, or was disabled or expired, before
+    the order could be placed.
+    """
+
+
+def _stock_rows(lines):
+    """
+    Group ``lines`` (cart items, order items or reservations) by the row that
+    holds their stock: ``{model: {pk: [lines]}}``.
+    """
+    from products.models import Product, ProductVariant
+
+    rows = {Product: {}, ProductVariant: {}}
+    for line in lines:
+        if line.variant_id:
+            rows[ProductVariant].setdefault(line.variant_id, []).append(line)
+        else:
+            rows[Product].setdefault(line.product_id, []).append(line)
+    return rows
+
+
+def _move_stock(model, changes):
+    """
+    Apply ``{pk: (taken, reserved)}`` to stock rows in one UPDATE.
+
+    ``taken`` (negative for stock put back) is subtracted from
+    ``stock_quantity`` and ``reserved`` (negative for releases) added to
+    ``reserved_quantity``. Rows taking or reserving stock are only updated
+    if they keep ``stock_quantity >= reserved_quantity``, so holds of other
+    carts are never taken. Rows only giving stock back are always updated,
+    even if stock was lowered below what is held meanwhile. Returns the
+    number of rows updated.
+    """
+    rows = Q()
+    for pk, (taken, reserved) in changes.items():
+        if taken > 0 or reserved > 0:
+            rows |= Q(pk=pk, stock_quantity__gte=F('reserved_quantity') + (taken + reserved))
+        else:
+            rows |= Q(pk=pk)
+    return model.objects.filter(rows).update(
+        stock_quantity=F('stock_quantity') - Case(
+            *[When(pk=pk, then=Value(taken)) for pk, (taken, reserved) in changes.items()],
+            default=Value(0)
+        ),
+        reserved_quantity=F('reserved_quantity') + Case(
+            *[When(pk=pk, then=Value(reserved)) for pk, (taken, reserved) in changes.items()],
+            default=Value(0)
+        )
+    )
+
+
+def move_stock(items, taken=(), reserved=(), released=(), restored=()):
+    """
+    Take, reserve, release and restore stock with one UPDATE per table.
+
+    ``taken`` and ``reserved`` are lines whose quantity is decremented from
+    stock or held for checkout; ``released`` are reservations given back
+    and ``restored`` lines whose quantity goes back into stock.
+    Raises ``InsufficientStockError`` naming the affected ``items`` if any
+    row would be short, in which case nothing is changed.
+    """
+    changes = {}
+    for sign, lines, index in (
+        (1, taken, 0), (1, reserved, 1), (-1, released, 1), (-1, restored, 0)
+    ):
+        for model, rows in _stock_rows(lines).items():
+            for pk, row_lines in rows.items():
+                change = changes.setdefault(model, {}).setdefault(pk, [0, 0])
+                change[index] += sign * sum(line.quantity for line in row_lines)
+    changes = {model: rows for model, rows in changes.items() if rows}
+
+    with transaction.atomic():
+        short = [
+            model for model, rows in changes.items() if _move_stock(model, rows) != len(rows)
+        ]
+        if short:
+            transaction.set_rollback(True)
+    if not short:
+        publish('stock.changed', 'product', '', {
+            'product_ids': sorted({
+                line.product_id
+                for line in itertools.chain(taken, reserved, released, restored)
+            }),
+        })
+        return
+
+    short_rows = set()
+    for model in short:
+        rows = changes[model]
+        for pk, stock, held in model.objects.filter(pk__in=rows).values_list(
+            'pk', 'stock_quantity', 'reserved_quantity'
+        ):
+            row_taken, row_reserved = rows[pk]
+            if (row_taken > 0 or row_reserved > 0) and stock < held + row_taken + row_reserved:
+                short_rows.add((model, pk))
+    raise InsufficientStockError([
+        line
+        for model, rows in _stock_rows(items).items()
+        for pk, row_lines in rows.items() if (model, pk) in short_rows
+        for line in row_lines
+    ] or list(items))
+
+
+def reserve_stock(cart, ttl=None):
+    """
+    Hold stock for every line of ``cart`` until checkout completes.
+
+    Replaces any holds the cart already has. Returns the new reservations.
+    Raises ``EmptyCartError`` or ``InsufficientStockError``.
+    """
+    ttl = settings.STOCK_RESERVATION_TTL if ttl is None else ttl
+    items = list(cart.items.select_related('product', 'variant'))
+    if not items:
+        raise EmptyCartError('Cart is empty.')
+
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    with transaction.atomic():
+        held = list(StockReservation.objects.select_for_update().filter(cart=cart))
+        move_stock(items, reserved=items, released=held)
+        StockReservation.objects.filter(pk__in=[hold.pk for hold in held]).delete()
+        return StockReservation.objects.bulk_create([
+            StockReservation(
+                cart=cart,
+                product=item.product,
+                variant=item.variant,
+                quantity=item.quantity,
+                expires_at=expires_at
+            )
+            for item in items
+        ])
+
+
+def release_expired_reservations(now=None, batch_size=1000):
+    """
+    Release holds that expired before ``now``, one batch per transaction.
+
+    Holds locked by an order being placed are skipped. Returns the number of
+    holds released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            holds = list(
+                StockReservation.objects.select_for_update(skip_locked=True).filter(
+                    expires_at__lte=now
+                ).order_by('expires_at')[:batch_size]
+            )
+            if not holds:
+                return released
+            StockReservation.objects.filter(pk__in=[hold.pk for hold in holds]).delete()
+            move_stock(holds, released=holds)
+        released += len(holds)
+
+
+def place_order(user, cart, details):
+    """
+    Create an order from ``cart``, take the stock and empty the cart, all in
+    one transaction. Emails, statistics and cache updates are queued to run
+    after it commits.
+
+    ``details`` are the validated fields of ``CreateOrderSerializer``,
+    including the validated ``coupon`` if a code was given. Holds placed by
+    ``reserve_stock`` are converted, so a cart that started checkout can
+    always be ordered while its holds last.
+    Raises ``EmptyCartError``, ``InsufficientStockError`` or
+    ``CouponUnavailableError``.
+    """
+    items = list(
+        cart.items.with_product_snapshot().select_related('product__brand', 'product__category')
+    )
+    if not items:
+        raise EmptyCartError('Cart is empty.')
+
+    with transaction.atomic():
+        order_items = []
+        subtotal = Decimal('0')
+        for item in items:
+            unit_price = item.current_price
+            total_price = unit_price * item.quantity
+            subtotal += total_price
+            order_items.append(OrderItem(
+                product=item.product,
+                variant=item.variant,
+                quantity=item.quantity,
+                unit_price=unit_price,
+                total_price=total_price,
+                product_snapshot=product_snapshot(item.product, item.variant)
+            ))
+
+        # Promotions apply first, then the coupon to what is left.
+        promotions = evaluate_items(items, price='current_price')
+        discount_amount = promotions.discount
+        coupon_code = ''
+        coupon = details.get('coupon')
+        if coupon is None and details.get('coupon_code'):
+            coupon = get_coupon(details['coupon_code'])
+        if coupon and coupon.is_valid and (not coupon.minimum_amount or subtotal >= coupon.minimum_amount):
+            discount_amount += coupon.calculate_discount(subtotal - promotions.discount)
+            coupon_code = coupon.code
+        else:
+            coupon = None
+
+        # Simplified - no tax/shipping for now
+        tax_amount = Decimal('0')
+        shipping_amount = Decimal('0')
+        order = Order.objects.create(
+            user=user,
+            subtotal=subtotal,
+            tax_amount=tax_amount,
+            shipping_amount=shipping_amount,
+            discount_amount=discount_amount,
+            coupon_code=coupon_code,
+            total_amount=subtotal + tax_amount + shipping_amount - discount_amount,
+            **{field: details.get(field, '') for field in ORDER_DETAIL_FIELDS}
+        )
+        for order_item in order_items:
+            order_item.order = order
+        OrderItem.objects.bulk_create(order_items)
+
+        held = list(StockReservation.objects.select_for_update().filter(cart=cart))
+        move_stock(items, taken=items, released=held)
+        StockReservation.objects.filter(pk__in=[hold.pk for hold in held]).delete()
+        cart.clear()
+
+        OrderStatusHistory.objects.create(
+            order=order,
+            status='pending',
+            notes='Order created',
+            created_by=user
+        )
+
+        # Redeemed last, as a limited coupon's row stays locked until commit.
+        if coupon and not redeem(coupon):
+            raise CouponUnavailableError(f'Coupon {coupon.code} is no longer available.')
+
+        from .tasks import enqueue_order_placed
+
+        enqueue_order_placed(order, sorted({item.product_id for item in items}))
+    return order
@@ -0,0 +1,135 @@
+"""
+Coupon lookups and redemption.
+
+Coupons are looked up through the cache, where each stays until its
+``valid_until`` unless it is saved or deleted first, so checking a code
+does not query the database. Cached coupons may lag behind on
+``used_count``: the usage limit is enforced when the coupon is redeemed.
+
+A coupon with a ``usage_limit`` is redeemed with one conditional UPDATE
+that only succeeds while ``used_count < usage_limit``. Unlimited coupons
+count their uses in ``CouponUsageShard`` rows instead, one of
+``COUPON_USAGE_SHARDS`` per coupon picked at random, and ``fold_usage``
+adds them into ``used_count`` periodically.
+
+Codes no coupon has are looked up as campaign codes; see
+``orders.campaigns``.
+"""
+
+import logging
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import campaigns
+from .models import Coupon, CouponUsageShard
+
+logger = logging.getLogger(__name__)
+
+
+def coupon_cache_key(code):
+    return f'coupons:{code}'
+
+
+def get_coupon(code):
+    """
+    Return the coupon with ``code`` or ``None``.
+
+    Campaign codes are returned as unsaved coupons with the terms of their
+    campaign.
+    """
+    key = coupon_cache_key(code)
+    coupon = cache.get(key)
+    if coupon is None:
+        coupon = Coupon.objects.filter(code=code).first()
+        if coupon is None:
+            return campaigns.get_campaign_coupon(code)
+        timeout = int((coupon.valid_until - timezone.now()).total_seconds())
+        if timeout > 0:
+            cache.set(key, coupon, timeout)
+    return coupon
+
+
+def invalidate(codes):
+    """
+    Drop the coupons with ``codes`` from the cache.
+    """
+    cache.delete_many([coupon_cache_key(code) for code in codes])
+
+
+def invalidate_on_commit(codes):
+    """
+    Drop the coupons with ``codes`` from the cache once the current
+    transaction commits.
+    """
+    codes = list(codes)
+    transaction.on_commit(lambda: invalidate(codes))
+
+
+def _count_use(coupon_id):
+    quote = connection.ops.quote_name
+    table = quote(CouponUsageShard._meta.db_table)
+    count = quote('count')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({quote('coupon_id')}, {quote('shard')}, {count}) "
+            f"VALUES (%s, %s, 1) "
+            f"ON CONFLICT ({quote('coupon_id')}, {quote('shard')}) "
+            f"DO UPDATE SET {count} = {table}.{count} + 1",
+            [coupon_id, random.randrange(settings.COUPON_USAGE_SHARDS)]
+        )
+
+
+def redeem(coupon):
+    """
+    Count one use of ``coupon``.
+
+    Returns ``False`` if the coupon reached its usage limit, was disabled
+    or expired since it was loaded.
+    """
+    if getattr(coupon, 'campaign_code_id', None):
+        return campaigns.redeem(coupon)
+    if coupon.usage_limit is None:
+        _count_use(coupon.pk)
+        return True
+
+    now = timezone.now()
+    redeemed = Coupon.objects.filter(
+        pk=coupon.pk,
+        is_active=True,
+        valid_from__lte=now,
+        valid_until__gte=now,
+        used_count__lt=F('usage_limit'),
+    ).update(used_count=F('used_count') + 1)
+    if not redeemed:
+        # Drop the cached copy, which still looks valid.
+        invalidate([coupon.code])
+    return bool(redeemed)
+
+
+def fold_usage():
+    """
+    Add the uses counted in ``CouponUsageShard`` rows to ``used_count``.
+
+    Returns the number of uses added.
+    """
+    with transaction.atomic():
+        shards = list(
+            CouponUsageShard.objects.select_for_update().values_list('pk', 'coupon_id', 'count')
+        )
+        totals = defaultdict(int)
+        for pk, coupon_id, count in shards:
+            totals[coupon_id] += count
+        for coupon_id, count in totals.items():
+            Coupon.objects.filter(pk=coupon_id).update(used_count=F('used_count') + count)
+        CouponUsageShard.objects.filter(pk__in=[pk for pk, coupon_id, count in shards]).delete()
+
+    folded = sum(totals.values())
+    if folded:
+        logger.info("Added %s coupon uses of %s coupons", folded, len(totals))
+    return folded
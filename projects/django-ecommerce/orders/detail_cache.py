@@ -0,0 +1,82 @@
+"""
+Cache of serialized order details.
+
+Each order has a version key holding a token and a data key per token
+holding the serialized order and its owner. A cache hit serves the order
+with two cache reads and no database queries.
+
+Orders in ``TERMINAL_STATUSES`` are cached without expiry; other orders
+for ``ORDER_CACHE_TIMEOUT`` seconds. Order saves, status history writes and
+bulk status changes call ``invalidate`` once their transaction commits,
+which drops the version key. A request that loaded the order before the
+change then stores it under the old token, which is never read again.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import get_random_string
+
+TERMINAL_STATUSES = ['delivered', 'cancelled', 'refunded']
+
+
+def _version_key(order_id):
+    return f'orders:detail:{order_id}:version'
+
+
+def _data_key(order_id, version):
+    return f'orders:detail:{order_id}:{version}'
+
+
+def _timeout(status):
+    return None if status in TERMINAL_STATUSES else settings.ORDER_CACHE_TIMEOUT
+
+
+def get_or_build(order_id, build):
+    """
+    Return the cached entry of ``order_id``, calling ``build()`` on a miss.
+
+    ``build`` returns ``None`` if the order cannot be found, or a dict with
+    ``user_id``, ``status`` and ``data`` (the serialized order), which is
+    cached.
+    """
+    version_key = _version_key(order_id)
+    version = cache.get(version_key)
+    if version is not None:
+        entry = cache.get(_data_key(order_id, version))
+        if entry is not None:
+            return entry
+    else:
+        version = get_random_string(12)
+        if not cache.add(version_key, version, settings.ORDER_CACHE_TIMEOUT):
+            version = cache.get(version_key, version)
+
+    entry = build()
+    if entry is None:
+        return None
+    timeout = _timeout(entry['status'])
+    # Skip the write if the order changed while it was being built.
+    if cache.get(version_key) == version:
+        cache.set(_data_key(order_id, version), entry, timeout)
+        cache.touch(version_key, timeout)
+    return entry
+
+
+def invalidate(order_ids):
+    """
+    Drop the cached details of ``order_ids``.
+    """
+    version_keys = {_version_key(order_id): order_id for order_id in order_ids}
+    versions = cache.get_many(version_keys)
+    cache.delete_many(list(version_keys) + [
+        _data_key(version_keys[key], version) for key, version in versions.items()
+    ])
+
+
+def invalidate_on_commit(order_ids):
+    """
+    Drop the cached details of ``order_ids`` once the current transaction
+    commits, so no request can cache them as they were before it.
+    """
+    order_ids = list(order_ids)
+    transaction.on_commit(lambda: invalidate(order_ids))
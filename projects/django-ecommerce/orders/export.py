@@ -0,0 +1,159 @@
+"""
+Streaming export of orders and their items for fulfilment partners.
+
+Orders are read with ``iterator()`` (a server-side cursor on PostgreSQL)
+and their items prefetched one chunk at a time, then rendered line by line
+as CSV (one row per item) or NDJSON (one order per line), optionally
+gzipped. Memory use does not grow with the size of the export.
+
+Exports of orders changed since a watermark are incremental: the export
+includes everything updated before it started, and the next export passes
+the returned watermark as ``updated_since``. ``updated_at`` is set before
+a transaction commits, so an order can become visible after an export
+that ran past its ``updated_at``. The watermark therefore trails the
+export's start by ``ORDER_EXPORT_WATERMARK_LAG`` seconds, longer than any
+write transaction, and consecutive exports overlap by that much: orders
+changed in the overlap are exported again, and consumers should upsert
+by order id.
+"""
+
+import csv
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import OrderItem
+from .snapshots import product_snapshot
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+ORDER_COLUMNS = [
+    'id', 'order_number', 'status', 'payment_status', 'created_at', 'updated_at',
+    'shipping_first_name', 'shipping_last_name', 'shipping_company',
+    'shipping_address_line_1', 'shipping_address_line_2', 'shipping_city',
+    'shipping_state', 'shipping_postal_code', 'shipping_country', 'shipping_phone',
+    'tracking_number', 'notes', 'subtotal', 'tax_amount', 'shipping_amount',
+    'discount_amount', 'total_amount',
+]
+
+ITEM_COLUMNS = [
+    'item_id', 'product_id', 'sku', 'product_name', 'variant_id', 'variant_sku',
+    'variant_name', 'quantity', 'unit_price', 'total_price',
+]
+
+
+def next_watermark(until):
+    """
+    Return the ``updated_since`` of the export after one of orders updated
+    before ``until``.
+    """
+    return until - timedelta(seconds=settings.ORDER_EXPORT_WATERMARK_LAG)
+
+
+def export_orders(queryset, until, chunk_size=500):
+    """
+    Stream the orders of ``queryset`` updated before ``until``, oldest
+    change first, with their items prefetched per chunk of orders.
+    """
+    return queryset.filter(updated_at__lt=until).only(*ORDER_COLUMNS).prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.order_by('id'))
+    ).order_by('updated_at', 'id').iterator(chunk_size=chunk_size)
+
+
+def _order_row(order):
+    return {column: getattr(order, column) for column in ORDER_COLUMNS}
+
+
+def _item_row(item):
+    snapshot = item.product_snapshot or product_snapshot(item.product, item.variant)
+    return {
+        'item_id': item.pk,
+        'product_id': item.product_id,
+        'sku': snapshot['sku'],
+        'product_name': snapshot['name'],
+        'variant_id': item.variant_id,
+        'variant_sku': snapshot['variant_sku'],
+        'variant_name': snapshot['variant_name'],
+        'quantity': item.quantity,
+        'unit_price': item.unit_price,
+        'total_price': item.total_price,
+    }
+
+
+class _Echo:
+    """
+    File-like object whose ``write`` returns the value, for streaming
+    ``csv.writer`` output.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(orders, header=True):
+    """
+    Render orders as CSV, one row per item with the order columns repeated.
+    """
+    writer = csv.writer(_Echo())
+    if header:
+        yield writer.writerow(ORDER_COLUMNS + ITEM_COLUMNS)
+    for order in orders:
+        order_values = [_csv_value(value) for value in _order_row(order).values()]
+        for item in order.items.all():
+            yield writer.writerow(
+                order_values + [_csv_value(value) for value in _item_row(item).values()]
+            )
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def ndjson_lines(orders):
+    """
+    Render orders as newline-delimited JSON, one order with its items per line.
+    """
+    for order in orders:
+        row = _order_row(order)
+        row['items'] = [_item_row(item) for item in order.items.all()]
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def render(orders, output, header=True):
+    """
+    Render orders as lines of ``output`` (``csv`` or ``ndjson``).
+    """
+    if output == 'csv':
+        return csv_lines(orders, header=header)
+    return ndjson_lines(orders)
+
+
+def gzip_chunks(lines, flush_every=64 * 1024):
+    """
+    Gzip a stream of text lines, yielding compressed chunks of roughly
+    ``flush_every`` bytes of input.
+    """
+    compressor = zlib.compressobj(wbits=31)
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        pending.append(data)
+        size += len(data)
+        if size >= flush_every:
+            chunk = compressor.compress(b''.join(pending))
+            pending, size = [], 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(b''.join(pending)) + compressor.flush()
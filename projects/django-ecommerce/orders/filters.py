@@ -0,0 +1,30 @@
+"""
+Filters for the orders app.
+"""
+
+import django_filters
+from .models import Order
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Filter for a user's order history.
+    """
+    status = django_filters.MultipleChoiceFilter(choices=Order.ORDER_STATUS_CHOICES)
+    payment_status = django_filters.MultipleChoiceFilter(choices=Order.PAYMENT_STATUS_CHOICES)
+    created_after = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lt')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'payment_status', 'created_after', 'created_before']
+
+
+class OrderExportFilter(OrderFilter):
+    """
+    Filter for fulfilment exports, adding the incremental watermark.
+    """
+    updated_since = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='gte')
+
+    class Meta(OrderFilter.Meta):
+        fields = OrderFilter.Meta.fields + ['updated_since']
@@ -0,0 +1,137 @@
+"""
+Bulk order status changes for fulfilment.
+
+Orders are loaded, checked against ``Order.STATUS_TRANSITIONS`` and
+updated a chunk at a time: one locking SELECT, one ``bulk_update`` and one
+``bulk_create`` of status history per chunk, each chunk in its own
+transaction.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from outbox.events import publish_many
+
+from .detail_cache import invalidate_on_commit
+from .models import CustomerStats, Order, OrderStatusHistory
+
+logger = logging.getLogger(__name__)
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+INVALID_TRANSITION = 'invalid_transition'
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _apply_chunk(refs, new_status, user, notes, tracking_numbers):
+    """
+    Move the orders of one chunk of references to ``new_status``.
+
+    Returns ``{reference: (order, outcome)}``.
+    """
+    # Stamped per chunk, close to its commit, so incremental exports
+    # reading ``updated_at`` do not see it in the past.
+    now = timezone.now()
+    ids = [value for field, value in refs if field == 'id']
+    numbers = [value for field, value in refs if field == 'order_number']
+    orders = list(
+        Order.objects.select_for_update().filter(
+            Q(pk__in=ids) | Q(order_number__in=numbers)
+        ).only(
+            'id', 'order_number', 'user_id', 'status', 'tracking_number',
+            'shipped_at', 'delivered_at'
+        ).order_by('id')
+    )
+    by_id = {order.pk: order for order in orders}
+    by_number = {order.order_number: order for order in orders}
+
+    outcomes = {}
+    changed = {}
+    previous = {}
+    for field, value in refs:
+        order = by_id.get(value) if field == 'id' else by_number.get(value)
+        if order is None:
+            outcomes[(field, value)] = (None, NOT_FOUND)
+            continue
+        tracking_number = tracking_numbers.get(str(value))
+        if order.pk in changed:
+            outcome = UPDATED
+        elif order.status == new_status:
+            outcome = UNCHANGED
+        elif new_status not in Order.STATUS_TRANSITIONS[order.status]:
+            outcome = INVALID_TRANSITION
+        else:
+            outcome = UPDATED
+            previous[order.pk] = order.status
+            order.status = new_status
+            order.updated_at = now
+            if new_status == 'shipped' and not order.shipped_at:
+                order.shipped_at = now
+            elif new_status == 'delivered' and not order.delivered_at:
+                order.delivered_at = now
+            changed[order.pk] = order
+        if outcome == UPDATED and tracking_number:
+            order.tracking_number = tracking_number
+        outcomes[(field, value)] = (order, outcome)
+
+    if changed:
+        Order.objects.bulk_update(
+            changed.values(),
+            ['status', 'tracking_number', 'shipped_at', 'delivered_at', 'updated_at']
+        )
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(order=order, status=new_status, notes=notes, created_by=user)
+            for order in changed.values()
+        ])
+        # bulk_update bypasses Order.save(), so refresh what it maintains.
+        CustomerStats.objects.rebuild(sorted({order.user_id for order in changed.values()}))
+        invalidate_on_commit(changed)
+        publish_many('order.status_changed', 'order', [
+            (order.pk, {
+                'order_number': order.order_number,
+                'from': previous[order.pk],
+                'to': new_status,
+            })
+            for order in changed.values()
+        ])
+    return outcomes
+
+
+def bulk_update_status(new_status, order_ids=(), order_numbers=(), user=None, notes='',
+                       tracking_numbers=None, chunk_size=None):
+    """
+    Move the orders given by id or order number to ``new_status``.
+
+    ``tracking_numbers`` maps an order id or number (as given) to the
+    tracking number stored with the change. Returns one
+    ``(reference, order, outcome)`` per distinct reference, in the order
+    given, where outcome is ``updated``, ``unchanged``, ``not_found`` or
+    ``invalid_transition``.
+    """
+    chunk_size = chunk_size or settings.ORDER_BULK_STATUS_CHUNK_SIZE
+    tracking_numbers = tracking_numbers or {}
+    refs = list(dict.fromkeys(
+        [('id', pk) for pk in order_ids] +
+        [('order_number', number) for number in order_numbers]
+    ))
+
+    results = []
+    for chunk in _chunks(refs, chunk_size):
+        with transaction.atomic():
+            outcomes = _apply_chunk(chunk, new_status, user, notes, tracking_numbers)
+        results.extend((ref, *outcomes[ref]) for ref in chunk)
+
+    logger.info(
+        "Bulk status change to %s: %s of %s orders updated", new_status,
+        sum(1 for _, _, outcome in results if outcome == UPDATED), len(results)
+    )
+    return results
@@ -0,0 +1,32 @@
+"""
+Management command to archive closed orders.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from orders.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move delivered, cancelled and refunded orders into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help='Only archive orders created more than this many days ago',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of orders moved per transaction',
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_orders(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} orders'))
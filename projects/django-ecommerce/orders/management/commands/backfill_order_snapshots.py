@@ -0,0 +1,28 @@
+"""
+Management command to store product snapshots on existing order items.
+"""
+
+from django.core.management.base import BaseCommand
+from orders.models import ArchivedOrderItem, OrderItem
+from orders.snapshots import backfill_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Store product snapshots on order items placed before snapshots existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of order items updated per query',
+        )
+
+    def handle(self, *args, **options):
+        for item_model in (OrderItem, ArchivedOrderItem):
+            updated = backfill_snapshots(item_model, batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Stored snapshots on {updated} {item_model._meta.verbose_name_plural}'
+                )
+            )
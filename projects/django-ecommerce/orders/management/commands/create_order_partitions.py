@@ -0,0 +1,26 @@
+"""
+Management command to create upcoming order archive partitions.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from orders.archive import create_future_partitions, uses_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create monthly partitions of the order archive tables ahead of time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.ORDER_PARTITION_MONTHS_AHEAD,
+            help='Number of months after the current one to create partitions for',
+        )
+
+    def handle(self, *args, **options):
+        if not uses_partitions():
+            self.stdout.write('Order archive tables are not partitioned on this database.')
+            return
+        created = create_future_partitions(options['months_ahead'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} partitions'))
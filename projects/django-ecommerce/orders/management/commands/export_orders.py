@@ -0,0 +1,118 @@
+"""
+Management command to export orders to files for fulfilment partners.
+"""
+
+import os
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from orders import export
+from orders.filters import OrderExportFilter
+from orders.models import Order
+
+WATERMARK_FILE = '_watermark'
+
+
+class Command(BaseCommand):
+    help = 'Write orders changed in a window to one file per day of change'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory the export is written under')
+        parser.add_argument(
+            '--output',
+            choices=sorted(export.FORMATS),
+            default='csv',
+            help='File format',
+        )
+        parser.add_argument('--gzip', action='store_true', help='Gzip the files')
+        parser.add_argument(
+            '--status',
+            action='append',
+            help='Only export orders in this status (repeatable)',
+        )
+        parser.add_argument(
+            '--updated-since',
+            help='Only export orders changed since this ISO datetime',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=f'Continue from the watermark saved in {WATERMARK_FILE} by the last run',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Orders fetched per round trip',
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options['output_dir']
+        watermark_path = os.path.join(output_dir, WATERMARK_FILE)
+        params = {'status': options['status'] or []}
+        updated_since = options['updated_since']
+        if options['incremental'] and updated_since is None and os.path.exists(watermark_path):
+            with open(watermark_path) as f:
+                updated_since = f.read().strip()
+        if updated_since:
+            params['updated_since'] = updated_since
+
+        filterset = OrderExportFilter(params, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        until = timezone.now()
+        run_dir = os.path.join(output_dir, f'{until:%Y%m%dT%H%M%S}')
+        os.makedirs(run_dir, exist_ok=True)
+
+        orders = export.export_orders(filterset.qs, until, chunk_size=options['chunk_size'])
+        files = 0
+        exported = 0
+        for day, day_orders in groupby(
+            orders, key=lambda order: timezone.localtime(order.updated_at).date()
+        ):
+            counted = _Counted(day_orders)
+            path = self._write(run_dir, day, counted, options)
+            exported += counted.total
+            files += 1
+            self.stdout.write(f'Wrote {counted.total} orders to {path}')
+
+        # Saved last, so a failed run is repeated from the previous watermark.
+        with open(watermark_path + '.tmp', 'w') as f:
+            f.write(export.next_watermark(until).isoformat())
+        os.replace(watermark_path + '.tmp', watermark_path)
+        self.stdout.write(
+            self.style.SUCCESS(f'Exported {exported} orders in {files} files to {run_dir}')
+        )
+
+    def _write(self, run_dir, day, orders, options):
+        filename = f'orders_{day:%Y%m%d}.{options["output"]}'
+        lines = export.render(orders, options['output'])
+        if options['gzip']:
+            filename += '.gz'
+            chunks, mode = export.gzip_chunks(lines), 'wb'
+        else:
+            chunks, mode = lines, 'w'
+        path = os.path.join(run_dir, filename)
+        # Written under a temporary name, so pickup never sees partial files.
+        with open(path + '.tmp', mode, **({} if 'b' in mode else {'newline': ''})) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(path + '.tmp', path)
+        return path
+
+
+class _Counted:
+    """
+    Iterator that counts the orders passing through it.
+    """
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.total = 0
+
+    def __iter__(self):
+        for order in self.orders:
+            self.total += 1
+            yield order
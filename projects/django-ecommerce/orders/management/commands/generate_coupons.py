@@ -0,0 +1,145 @@
+"""
+Management command to generate bulk coupon codes for a campaign.
+"""
+
+import csv
+import os
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from orders import campaigns
+from orders.export import _Echo
+from orders.models import Coupon, CouponCampaign
+
+
+class Command(BaseCommand):
+    help = 'Generate unique coupon codes for a new or existing campaign'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Number of codes to generate')
+        parser.add_argument(
+            '--campaign',
+            help='Prefix of an existing campaign to add codes to',
+        )
+        parser.add_argument('--name', help='Name of the new campaign')
+        parser.add_argument('--prefix', help='Code prefix of the new campaign')
+        parser.add_argument('--description', default='', help='Shown with each code')
+        parser.add_argument(
+            '--type',
+            choices=[choice for choice, label in Coupon.COUPON_TYPES],
+            default='percentage',
+            help='Discount type',
+        )
+        parser.add_argument('--value', help='Discount percentage or amount')
+        parser.add_argument('--minimum-amount', help='Minimum order amount')
+        parser.add_argument('--maximum-discount', help='Cap on percentage discounts')
+        parser.add_argument('--usage-limit', type=int, default=1, help='Uses per code')
+        parser.add_argument('--code-length', type=int, default=10, help='Characters per code body')
+        parser.add_argument('--valid-from', help='ISO datetime the codes start (default now)')
+        parser.add_argument('--valid-until', help='ISO datetime the codes end')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Days the codes are valid for, without --valid-until',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Codes written per statement (default COUPON_CAMPAIGN_CHUNK_SIZE)',
+        )
+        parser.add_argument('--output', help='CSV file the new codes are written to')
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError('count must be at least 1.')
+        if options['campaign']:
+            campaign = CouponCampaign.objects.filter(prefix=options['campaign']).first()
+            if campaign is None:
+                raise CommandError(f'No campaign with prefix {options["campaign"]}.')
+            CouponCampaign.objects.filter(pk=campaign.pk).update(size=F('size') + options['count'])
+        else:
+            campaign = self._create_campaign(options)
+
+        chunks = campaigns.generate(campaign, options['count'], options['chunk_size'])
+        output = options['output']
+        try:
+            if output:
+                # Written under a temporary name, so a failed run leaves no partial file.
+                with open(output + '.tmp', 'w', newline='') as f:
+                    generated = self._write(chunks, f)
+                os.replace(output + '.tmp', output)
+            else:
+                generated = self._write(chunks, None)
+        except ValueError as e:
+            raise CommandError(e)
+
+        target = f' to {output}' if output else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {generated} codes for campaign {campaign.prefix}{target}'
+        ))
+
+    def _write(self, chunks, f):
+        writer = csv.writer(_Echo())
+        if f:
+            f.write(writer.writerow(['code']))
+        generated = 0
+        for chunk in chunks:
+            if f:
+                f.writelines(writer.writerow([code]) for code in chunk)
+            generated += len(chunk)
+            self.stdout.write(f'{generated} codes generated')
+        return generated
+
+    def _create_campaign(self, options):
+        for option in ('name', 'prefix', 'value'):
+            if not options[option]:
+                raise CommandError(f'--{option} is required for a new campaign.')
+        try:
+            amounts = {
+                field: Decimal(options[field]) if options[field] else None
+                for field in ('value', 'minimum_amount', 'maximum_discount')
+            }
+        except InvalidOperation as e:
+            raise CommandError(f'Invalid amount: {e}')
+
+        valid_from = timezone.now()
+        if options['valid_from']:
+            valid_from = parse_datetime(options['valid_from'])
+        if options['valid_until']:
+            valid_until = parse_datetime(options['valid_until'])
+        else:
+            valid_until = valid_from and valid_from + timedelta(days=options['days'])
+        if valid_from is None or valid_until is None:
+            raise CommandError('--valid-from and --valid-until must be ISO datetimes.')
+        if timezone.is_naive(valid_from):
+            valid_from = timezone.make_aware(valid_from)
+        if timezone.is_naive(valid_until):
+            valid_until = timezone.make_aware(valid_until)
+
+        campaign = CouponCampaign(
+            name=options['name'],
+            description=options['description'] or options['name'],
+            prefix=options['prefix'],
+            code_length=options['code_length'],
+            coupon_type=options['type'],
+            usage_limit=options['usage_limit'],
+            size=options['count'],
+            valid_from=valid_from,
+            valid_until=valid_until,
+            **amounts
+        )
+        try:
+            campaign.full_clean()
+        except ValidationError as e:
+            raise CommandError('; '.join(
+                f'{field}: {" ".join(messages)}' for field, messages in e.message_dict.items()
+            ))
+        campaign.save()
+        self.stdout.write(f'Created campaign {campaign}')
+        return campaign
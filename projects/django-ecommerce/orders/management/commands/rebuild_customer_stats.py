@@ -0,0 +1,38 @@
+"""
+Management command to rebuild per-customer order statistics.
+"""
+
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from orders.models import CustomerStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute customer order statistics from live and archived orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users recomputed per query',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only rebuild the stats of this user ID (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if user_ids is None:
+            user_ids = User.objects.order_by('id').values_list('id', flat=True)
+
+        batch_size = options['batch_size']
+        user_ids = list(user_ids)
+        rebuilt = 0
+        for start in range(0, len(user_ids), batch_size):
+            rebuilt += CustomerStats.objects.rebuild(user_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {rebuilt} customers'))
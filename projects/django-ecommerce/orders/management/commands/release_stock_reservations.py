@@ -0,0 +1,22 @@
+"""
+Management command to release expired stock reservations.
+"""
+
+from django.core.management.base import BaseCommand
+from orders.checkout import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Release stock held by checkouts whose reservations have expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of reservations released per transaction',
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired stock reservations'))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0002_stock_reservation"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-created_at"], name="order_user_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,388 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:33
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+ARCHIVE_MODELS = ["ArchivedOrder", "ArchivedOrderItem", "ArchivedOrderStatusHistory"]
+
+
+def partition_archive_tables(apps, schema_editor):
+    """
+    Recreate the archive tables as range-partitioned by created_at on
+    PostgreSQL, with a default partition. Other databases keep plain tables.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    for name in ARCHIVE_MODELS:
+        model = apps.get_model("orders", name)
+        table = model._meta.db_table
+        schema_editor.delete_model(model)
+
+        # Unique constraints on a partitioned table must include the
+        # partition key, so the primary key becomes (id, created_at).
+        sql, params = schema_editor.table_sql(model)
+        sql = sql.replace(
+            f'{quote("id")} bigint NOT NULL PRIMARY KEY',
+            f'{quote("id")} bigint NOT NULL',
+            1,
+        )
+        sql = (
+            sql[: sql.rindex(")")]
+            + f', PRIMARY KEY ({quote("id")}, {quote("created_at")}))'
+            + f' PARTITION BY RANGE ({quote("created_at")})'
+        )
+        schema_editor.execute(sql, params or None)
+        schema_editor.deferred_sql.extend(schema_editor._model_indexes_sql(model))
+        schema_editor.execute(
+            f"CREATE TABLE {quote(table + '_default')} PARTITION OF {quote(table)} DEFAULT"
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0003_order_user_created_idx"),
+        ("products", "0003_product_reserved_quantity"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedOrder",
+            fields=[
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("confirmed", "Confirmed"),
+                            ("processing", "Processing"),
+                            ("shipped", "Shipped"),
+                            ("delivered", "Delivered"),
+                            ("cancelled", "Cancelled"),
+                            ("refunded", "Refunded"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "payment_status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("paid", "Paid"),
+                            ("failed", "Failed"),
+                            ("refunded", "Refunded"),
+                            ("partially_refunded", "Partially Refunded"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="payment status",
+                    ),
+                ),
+                (
+                    "subtotal",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="subtotal"
+                    ),
+                ),
+                (
+                    "tax_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=10,
+                        verbose_name="tax amount",
+                    ),
+                ),
+                (
+                    "shipping_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=10,
+                        verbose_name="shipping amount",
+                    ),
+                ),
+                (
+                    "discount_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=10,
+                        verbose_name="discount amount",
+                    ),
+                ),
+                (
+                    "total_amount",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="total amount"
+                    ),
+                ),
+                (
+                    "billing_first_name",
+                    models.CharField(max_length=150, verbose_name="billing first name"),
+                ),
+                (
+                    "billing_last_name",
+                    models.CharField(max_length=150, verbose_name="billing last name"),
+                ),
+                (
+                    "billing_company",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="billing company"
+                    ),
+                ),
+                (
+                    "billing_address_line_1",
+                    models.CharField(
+                        max_length=255, verbose_name="billing address line 1"
+                    ),
+                ),
+                (
+                    "billing_address_line_2",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        verbose_name="billing address line 2",
+                    ),
+                ),
+                (
+                    "billing_city",
+                    models.CharField(max_length=100, verbose_name="billing city"),
+                ),
+                (
+                    "billing_state",
+                    models.CharField(max_length=100, verbose_name="billing state"),
+                ),
+                (
+                    "billing_postal_code",
+                    models.CharField(max_length=20, verbose_name="billing postal code"),
+                ),
+                (
+                    "billing_country",
+                    models.CharField(max_length=100, verbose_name="billing country"),
+                ),
+                (
+                    "billing_phone",
+                    models.CharField(
+                        blank=True, max_length=20, verbose_name="billing phone"
+                    ),
+                ),
+                (
+                    "shipping_first_name",
+                    models.CharField(
+                        max_length=150, verbose_name="shipping first name"
+                    ),
+                ),
+                (
+                    "shipping_last_name",
+                    models.CharField(max_length=150, verbose_name="shipping last name"),
+                ),
+                (
+                    "shipping_company",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="shipping company"
+                    ),
+                ),
+                (
+                    "shipping_address_line_1",
+                    models.CharField(
+                        max_length=255, verbose_name="shipping address line 1"
+                    ),
+                ),
+                (
+                    "shipping_address_line_2",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        verbose_name="shipping address line 2",
+                    ),
+                ),
+                (
+                    "shipping_city",
+                    models.CharField(max_length=100, verbose_name="shipping city"),
+                ),
+                (
+                    "shipping_state",
+                    models.CharField(max_length=100, verbose_name="shipping state"),
+                ),
+                (
+                    "shipping_postal_code",
+                    models.CharField(
+                        max_length=20, verbose_name="shipping postal code"
+                    ),
+                ),
+                (
+                    "shipping_country",
+                    models.CharField(max_length=100, verbose_name="shipping country"),
+                ),
+                (
+                    "shipping_phone",
+                    models.CharField(
+                        blank=True, max_length=20, verbose_name="shipping phone"
+                    ),
+                ),
+                ("notes", models.TextField(blank=True, verbose_name="notes")),
+                (
+                    "tracking_number",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="tracking number"
+                    ),
+                ),
+                (
+                    "shipped_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="shipped at"
+                    ),
+                ),
+                (
+                    "delivered_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="delivered at"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "order_number",
+                    models.CharField(
+                        db_index=True, max_length=20, verbose_name="order number"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_orders",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Order",
+                "verbose_name_plural": "Archived Orders",
+                "db_table": "orders_archive",
+                "ordering": ["-created_at"],
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedOrderItem",
+            fields=[
+                (
+                    "quantity",
+                    models.PositiveIntegerField(
+                        validators=[django.core.validators.MinValueValidator(1)],
+                        verbose_name="quantity",
+                    ),
+                ),
+                (
+                    "unit_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="unit price"
+                    ),
+                ),
+                (
+                    "total_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="total price"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="items",
+                        to="orders.archivedorder",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="products.product",
+                    ),
+                ),
+                (
+                    "variant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="products.productvariant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Order Item",
+                "verbose_name_plural": "Archived Order Items",
+                "db_table": "order_items_archive",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedOrderStatusHistory",
+            fields=[
+                ("status", models.CharField(max_length=20, verbose_name="status")),
+                ("notes", models.TextField(blank=True, verbose_name="notes")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="status_history",
+                        to="orders.archivedorder",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Order Status History",
+                "verbose_name_plural": "Archived Order Status Histories",
+                "db_table": "order_status_history_archive",
+                "ordering": ["-created_at"],
+                "abstract": False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name="archivedorder",
+            index=models.Index(
+                fields=["user", "-created_at"], name="archived_order_user_idx"
+            ),
+        ),
+        migrations.RunPython(partition_archive_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0002_user_reset_token_user_reset_token_expires"),
+        ("orders", "0004_order_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="order_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "total_orders",
+                    models.PositiveIntegerField(default=0, verbose_name="total orders"),
+                ),
+                (
+                    "pending_orders",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="pending orders"
+                    ),
+                ),
+                (
+                    "confirmed_orders",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="confirmed orders"
+                    ),
+                ),
+                (
+                    "processing_orders",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="processing orders"
+                    ),
+                ),
+                (
+                    "shipped_orders",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="shipped orders"
+                    ),
+                ),
+                (
+                    "delivered_orders",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="delivered orders"
+                    ),
+                ),
+                (
+                    "cancelled_orders",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="cancelled orders"
+                    ),
+                ),
+                (
+                    "refunded_orders",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="refunded orders"
+                    ),
+                ),
+                (
+                    "paid_orders",
+                    models.PositiveIntegerField(default=0, verbose_name="paid orders"),
+                ),
+                (
+                    "total_spent",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="total spent",
+                    ),
+                ),
+                (
+                    "last_order_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="last order at"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Customer Stats",
+                "verbose_name_plural": "Customer Stats",
+                "db_table": "customer_stats",
+            },
+        ),
+    ]
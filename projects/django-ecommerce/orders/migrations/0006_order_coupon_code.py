@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0005_customer_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedorder",
+            name="coupon_code",
+            field=models.CharField(
+                blank=True, max_length=50, verbose_name="coupon code"
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="coupon_code",
+            field=models.CharField(
+                blank=True, max_length=50, verbose_name="coupon code"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0006_order_coupon_code"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedorderitem",
+            name="product_snapshot",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="product snapshot"
+            ),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="product_snapshot",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="product snapshot"
+            ),
+        ),
+    ]
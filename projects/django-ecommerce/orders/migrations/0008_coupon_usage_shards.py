@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0007_order_item_product_snapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CouponUsageShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField(verbose_name="shard")),
+                ("count", models.PositiveIntegerField(default=0, verbose_name="count")),
+                (
+                    "coupon",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="usage_shards",
+                        to="orders.coupon",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Coupon Usage Shard",
+                "verbose_name_plural": "Coupon Usage Shards",
+                "db_table": "coupon_usage_shards",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("coupon", "shard"), name="coupon_usage_shard_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,181 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:12
+
+import django.core.validators
+import django.db.models.deletion
+import orders.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0008_coupon_usage_shards"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CouponCampaign",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200, verbose_name="name")),
+                (
+                    "description",
+                    models.CharField(max_length=200, verbose_name="description"),
+                ),
+                (
+                    "prefix",
+                    models.CharField(
+                        max_length=10,
+                        unique=True,
+                        validators=[
+                            django.core.validators.RegexValidator(
+                                "^[0-9A-HJKMNP-TV-Z]+$",
+                                "Use digits and capital letters other than I, L, O and U.",
+                            )
+                        ],
+                        verbose_name="prefix",
+                    ),
+                ),
+                (
+                    "code_length",
+                    models.PositiveSmallIntegerField(
+                        default=10,
+                        help_text="Characters between the prefix and the check character.",
+                        validators=[
+                            django.core.validators.MinValueValidator(6),
+                            django.core.validators.MaxValueValidator(20),
+                        ],
+                        verbose_name="code length",
+                    ),
+                ),
+                (
+                    "code_key",
+                    models.CharField(
+                        default=orders.models._campaign_code_key,
+                        editable=False,
+                        max_length=64,
+                        verbose_name="code key",
+                    ),
+                ),
+                (
+                    "coupon_type",
+                    models.CharField(
+                        choices=[
+                            ("percentage", "Percentage"),
+                            ("fixed", "Fixed Amount"),
+                        ],
+                        default="percentage",
+                        max_length=20,
+                        verbose_name="coupon type",
+                    ),
+                ),
+                (
+                    "value",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="value"
+                    ),
+                ),
+                (
+                    "minimum_amount",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=10,
+                        null=True,
+                        verbose_name="minimum amount",
+                    ),
+                ),
+                (
+                    "maximum_discount",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=10,
+                        null=True,
+                        verbose_name="maximum discount",
+                    ),
+                ),
+                (
+                    "usage_limit",
+                    models.PositiveIntegerField(
+                        default=1,
+                        validators=[django.core.validators.MinValueValidator(1)],
+                        verbose_name="usage limit per code",
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="active")),
+                ("valid_from", models.DateTimeField(verbose_name="valid from")),
+                ("valid_until", models.DateTimeField(verbose_name="valid until")),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of codes the campaign should have.",
+                        verbose_name="codes",
+                    ),
+                ),
+                (
+                    "generated_count",
+                    models.PositiveIntegerField(
+                        default=0, editable=False, verbose_name="generated codes"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Coupon Campaign",
+                "verbose_name_plural": "Coupon Campaigns",
+                "db_table": "coupon_campaigns",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="CampaignCode",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(max_length=32, unique=True, verbose_name="code"),
+                ),
+                (
+                    "used_count",
+                    models.PositiveIntegerField(default=0, verbose_name="used count"),
+                ),
+                (
+                    "campaign",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="codes",
+                        to="orders.couponcampaign",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Campaign Code",
+                "verbose_name_plural": "Campaign Codes",
+                "db_table": "campaign_codes",
+            },
+        ),
+    ]
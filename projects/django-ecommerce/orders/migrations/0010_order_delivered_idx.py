@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0009_coupon_campaigns"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["delivered_at"], name="order_delivered_idx"),
+        ),
+    ]
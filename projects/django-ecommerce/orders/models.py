@@ -2,15 +2,24 @@
 Order models for the e-commerce platform.
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django.core.validators import MinValueValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
+from django.utils.crypto import get_random_string
 from decimal import Decimal
 
+from outbox.events import publish
 
-class Order(models.Model):
+from .detail_cache import invalidate_on_commit
+
+
+class AbstractOrder(models.Model):
     """
-    Order model.
+    Columns and behaviour shared by live and archived orders.
     """
     ORDER_STATUS_CHOICES = [
         ('pending', _('Pending')),
@@ -22,6 +31,17 @@ class Order(models.Model):
         ('refunded', _('Refunded')),
     ]
 
+    # Statuses an order may move to from each status.
+    STATUS_TRANSITIONS = {
+        'pending': ['confirmed', 'processing', 'cancelled'],
+        'confirmed': ['processing', 'shipped', 'cancelled'],
+        'processing': ['shipped', 'cancelled'],
+        'shipped': ['delivered'],
+        'delivered': ['refunded'],
+        'cancelled': [],
+        'refunded': [],
+    }
+
     PAYMENT_STATUS_CHOICES = [
         ('pending', _('Pending')),
         ('paid', _('Paid')),
@@ -30,11 +50,6 @@ class Order(models.Model):
         ('partially_refunded', _('Partially Refunded')),
     ]
 
-    user = models.ForeignKey(
-        'accounts.User',
-        on_delete=models.CASCADE,
-        related_name='orders'
-    )
     order_number = models.CharField(_('order number'), max_length=20, unique=True)
     status = models.CharField(
         _('status'),
@@ -55,6 +70,7 @@ class Order(models.Model):
     shipping_amount = models.DecimalField(_('shipping amount'), max_digits=10, decimal_places=2, default=0)
     discount_amount = models.DecimalField(_('discount amount'), max_digits=10, decimal_places=2, default=0)
     total_amount = models.DecimalField(_('total amount'), max_digits=10, decimal_places=2)
+    coupon_code = models.CharField(_('coupon code'), max_length=50, blank=True)
     
     # Customer information
     billing_first_name = models.CharField(_('billing first name'), max_length=150)
@@ -89,26 +105,12 @@ class Order(models.Model):
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
     class Meta:
-        verbose_name = _('Order')
-        verbose_name_plural = _('Orders')
-        db_table = 'orders'
+        abstract = True
         ordering = ['-created_at']
 
     def __str__(self):
         return f"Order {self.order_number}"
 
-    def save(self, *args, **kwargs):
-        if not self.order_number:
-            self.order_number = self.generate_order_number()
-        super().save(*args, **kwargs)
-
-    def generate_order_number(self):
-        """
-        Generate a unique order number.
-        """
-        import uuid
-        return f"ORD-{uuid.uuid4().hex[:8].upper()}"
-
     @property
     def billing_full_name(self):
         return f"{self.billing_first_name} {self.billing_last_name}".strip()
@@ -134,7 +136,108 @@ class Order(models.Model):
         return self.status == 'cancelled'
 
 
-class OrderItem(models.Model):
+class Order(AbstractOrder):
+    """
+    Order model.
+    """
+    user = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        related_name='orders'
+    )
+
+    class Meta(AbstractOrder.Meta):
+        verbose_name = _('Order')
+        verbose_name_plural = _('Orders')
+        db_table = 'orders'
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['delivered_at'], name='order_delivered_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        order._loaded_statuses = (
+            order.__dict__.get('status'), order.__dict__.get('payment_status')
+        )
+        return order
+
+    def save(self, *args, **kwargs):
+        """
+        Save the order, roll its status changes into ``CustomerStats``,
+        publish ``order.created`` or ``order.status_changed`` and drop its
+        cached details.
+        """
+        if not self.order_number:
+            self.order_number = self.generate_order_number()
+        created = self._state.adding
+        previous_status, previous_payment_status = getattr(
+            self, '_loaded_statuses', (None, None)
+        )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if created or previous_status is not None:
+                CustomerStats.objects.record_change(
+                    self, previous_status, previous_payment_status, created=created
+                )
+            if created:
+                publish('order.created', 'order', self.pk, {
+                    'order_number': self.order_number,
+                    'user_id': self.user_id,
+                    'total_amount': str(self.total_amount),
+                })
+            elif previous_status is not None and previous_status != self.status:
+                publish('order.status_changed', 'order', self.pk, {
+                    'order_number': self.order_number,
+                    'from': previous_status,
+                    'to': self.status,
+                })
+            if not created:
+                invalidate_on_commit([self.pk])
+        self._loaded_statuses = (self.status, self.payment_status)
+
+    def delete(self, *args, **kwargs):
+        invalidate_on_commit([self.pk])
+        return super().delete(*args, **kwargs)
+
+    def generate_order_number(self):
+        """
+        Generate a unique order number.
+        """
+        import uuid
+        return f"ORD-{uuid.uuid4().hex[:8].upper()}"
+
+
+class AbstractOrderItem(models.Model):
+    """
+    Columns and behaviour shared by live and archived order items.
+    """
+    quantity = models.PositiveIntegerField(
+        _('quantity'),
+        validators=[MinValueValidator(1)]
+    )
+    unit_price = models.DecimalField(_('unit price'), max_digits=10, decimal_places=2)
+    total_price = models.DecimalField(_('total price'), max_digits=10, decimal_places=2)
+    # Product data as it was when the order was placed, see orders.snapshots.
+    product_snapshot = models.JSONField(_('product snapshot'), default=dict, blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        if self.product_snapshot:
+            name = self.product_snapshot['name']
+            variant_name = self.product_snapshot['variant_name']
+        else:
+            name = self.product.name
+            variant_name = self.variant.name if self.variant else None
+        variant_text = f" - {variant_name}" if variant_name else ""
+        return f"{name}{variant_text} x {self.quantity}"
+
+
+class OrderItem(AbstractOrderItem):
     """
     Order item model.
     """
@@ -153,29 +256,34 @@ class OrderItem(models.Model):
         null=True,
         blank=True
     )
-    quantity = models.PositiveIntegerField(
-        _('quantity'),
-        validators=[MinValueValidator(1)]
-    )
-    unit_price = models.DecimalField(_('unit price'), max_digits=10, decimal_places=2)
-    total_price = models.DecimalField(_('total price'), max_digits=10, decimal_places=2)
-    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
 
     class Meta:
         verbose_name = _('Order Item')
         verbose_name_plural = _('Order Items')
         db_table = 'order_items'
 
-    def __str__(self):
-        variant_text = f" - {self.variant.name}" if self.variant else ""
-        return f"{self.product.name}{variant_text} x {self.quantity}"
-
     def save(self, *args, **kwargs):
         self.total_price = self.unit_price * self.quantity
         super().save(*args, **kwargs)
 
 
-class OrderStatusHistory(models.Model):
+class AbstractOrderStatusHistory(models.Model):
+    """
+    Columns and behaviour shared by live and archived status history.
+    """
+    status = models.CharField(_('status'), max_length=20)
+    notes = models.TextField(_('notes'), blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.order.order_number} - {self.status}"
+
+
+class OrderStatusHistory(AbstractOrderStatusHistory):
     """
     Order status history model for tracking status changes.
     """
@@ -184,9 +292,6 @@ class OrderStatusHistory(models.Model):
         on_delete=models.CASCADE,
         related_name='status_history'
     )
-    status = models.CharField(_('status'), max_length=20)
-    notes = models.TextField(_('notes'), blank=True)
-    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     created_by = models.ForeignKey(
         'accounts.User',
         on_delete=models.SET_NULL,
@@ -194,14 +299,234 @@ class OrderStatusHistory(models.Model):
         blank=True
     )
 
-    class Meta:
+    class Meta(AbstractOrderStatusHistory.Meta):
         verbose_name = _('Order Status History')
         verbose_name_plural = _('Order Status Histories')
         db_table = 'order_status_history'
-        ordering = ['-created_at']
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_on_commit([self.order_id])
+
+
+class ArchivedOrder(AbstractOrder):
+    """
+    Closed order moved out of ``orders`` by ``archive_orders``.
+
+    Archived rows keep the id of the live row. On PostgreSQL the archive
+    tables are range partitioned by ``created_at`` (see ``orders.archive``),
+    so ids and order numbers are indexed rather than unique there.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        related_name='archived_orders'
+    )
+    order_number = models.CharField(_('order number'), max_length=20, db_index=True)
+
+    class Meta(AbstractOrder.Meta):
+        verbose_name = _('Archived Order')
+        verbose_name_plural = _('Archived Orders')
+        db_table = 'orders_archive'
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_order_user_idx'),
+        ]
+
+
+class ArchivedOrderItem(AbstractOrderItem):
+    """
+    Item of an archived order.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='items'
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    variant = models.ForeignKey(
+        'products.ProductVariant',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        verbose_name = _('Archived Order Item')
+        verbose_name_plural = _('Archived Order Items')
+        db_table = 'order_items_archive'
+
+
+class ArchivedOrderStatusHistory(AbstractOrderStatusHistory):
+    """
+    Status history of an archived order.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='status_history'
+    )
+    created_by = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta(AbstractOrderStatusHistory.Meta):
+        verbose_name = _('Archived Order Status History')
+        verbose_name_plural = _('Archived Order Status Histories')
+        db_table = 'order_status_history_archive'
+
+
+class CustomerStatsManager(models.Manager):
+    """
+    Keeps ``CustomerStats`` in step with order changes.
+    """
+
+    def for_user(self, user):
+        """
+        Return the stats row of ``user``, building it on first use.
+        """
+        stats = self.filter(user=user).first()
+        if stats is None:
+            self.rebuild([user.pk])
+            stats = self.filter(user=user).first() or CustomerStats(user=user)
+        return stats
+
+    def record_change(self, order, previous_status=None, previous_payment_status=None,
+                      created=False):
+        """
+        Apply the effect of creating ``order`` or moving it from the previous
+        status and payment status with one conditional UPDATE.
+        """
+        deltas = {}
+        if created:
+            deltas['total_orders'] = 1
+            deltas[f'{order.status}_orders'] = 1
+        elif previous_status != order.status:
+            deltas[f'{previous_status}_orders'] = -1
+            deltas[f'{order.status}_orders'] = 1
+        was_paid = not created and previous_payment_status == 'paid'
+        if was_paid != order.is_paid:
+            sign = 1 if order.is_paid else -1
+            deltas['paid_orders'] = sign
+            deltas['total_spent'] = sign * order.total_amount
+        if not deltas:
+            return
+
+        values = {field: F(field) + delta for field, delta in deltas.items()}
+        if created:
+            created_at = Value(order.created_at)
+            values['last_order_at'] = Greatest(Coalesce('last_order_at', created_at), created_at)
+        if not self.filter(user_id=order.user_id).update(updated_at=timezone.now(), **values):
+            self.rebuild([order.user_id])
+
+    def rebuild(self, user_ids=None):
+        """
+        Recompute stats from live and archived orders, for ``user_ids`` or
+        every user with orders. Returns the number of rows written.
+        """
+        aggregates = {
+            'total_orders': Count('id'),
+            'paid_orders': Count('id', filter=Q(payment_status='paid')),
+            'total_spent': Sum('total_amount', filter=Q(payment_status='paid')),
+            'last_order_at': Max('created_at'),
+            **{
+                f'{status}_orders': Count('id', filter=Q(status=status))
+                for status, label in AbstractOrder.ORDER_STATUS_CHOICES
+            },
+        }
+        rows = {}
+        for model in (Order, ArchivedOrder):
+            queryset = model.objects.order_by()
+            if user_ids is not None:
+                queryset = queryset.filter(user_id__in=user_ids)
+            for row in queryset.values('user_id').annotate(**aggregates):
+                user_id = row.pop('user_id')
+                if user_id not in rows:
+                    rows[user_id] = row
+                    continue
+                merged = rows[user_id]
+                for field, value in row.items():
+                    if field == 'last_order_at':
+                        merged[field] = max(merged[field], value)
+                    else:
+                        merged[field] = (merged[field] or 0) + (value or 0)
+
+        stats = [
+            CustomerStats(
+                user_id=user_id,
+                updated_at=timezone.now(),
+                **dict(row, total_spent=row['total_spent'] or Decimal('0'))
+            )
+            for user_id, row in rows.items()
+        ]
+        self.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=[*aggregates, 'updated_at'],
+        )
+        return len(stats)
+
+
+class CustomerStats(models.Model):
+    """
+    Per-customer order statistics, covering live and archived orders.
+
+    Kept current by ``Order.save()`` on every status and payment status
+    change; ``rebuild_customer_stats`` recomputes it from the orders.
+    """
+    user = models.OneToOneField(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='order_stats'
+    )
+    total_orders = models.PositiveIntegerField(_('total orders'), default=0)
+    pending_orders = models.PositiveIntegerField(_('pending orders'), default=0)
+    confirmed_orders = models.PositiveIntegerField(_('confirmed orders'), default=0)
+    processing_orders = models.PositiveIntegerField(_('processing orders'), default=0)
+    shipped_orders = models.PositiveIntegerField(_('shipped orders'), default=0)
+    delivered_orders = models.PositiveIntegerField(_('delivered orders'), default=0)
+    cancelled_orders = models.PositiveIntegerField(_('cancelled orders'), default=0)
+    refunded_orders = models.PositiveIntegerField(_('refunded orders'), default=0)
+    paid_orders = models.PositiveIntegerField(_('paid orders'), default=0)
+    total_spent = models.DecimalField(
+        _('total spent'),
+        max_digits=12,
+        decimal_places=2,
+        default=0
+    )
+    last_order_at = models.DateTimeField(_('last order at'), null=True, blank=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    objects = CustomerStatsManager()
+
+    class Meta:
+        verbose_name = _('Customer Stats')
+        verbose_name_plural = _('Customer Stats')
+        db_table = 'customer_stats'
 
     def __str__(self):
-        return f"{self.order.order_number} - {self.status}"
+        return f"{self.user_id}: {self.total_orders} orders"
+
+    @property
+    def average_order_value(self):
+        if not self.paid_orders:
+            return Decimal('0')
+        return (self.total_spent / self.paid_orders).quantize(Decimal('0.01'))
 
 
 class Coupon(models.Model):
@@ -253,6 +578,40 @@ class Coupon(models.Model):
     def __str__(self):
         return self.code
 
+    def clean(self):
+        # A coupon shaped like a campaign's code would hide that code from
+        # get_coupon, which looks up coupons first.
+        if self.code:
+            prefixes = [self.code[:end] for end in range(1, len(self.code))]
+            for campaign in CouponCampaign.objects.filter(prefix__in=prefixes):
+                if campaign.could_issue(self.code):
+                    raise ValidationError({'code': ValidationError(
+                        _('Has the form of a code of campaign %(prefix)s.'),
+                        params={'prefix': campaign.prefix}
+                    )})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        coupon = super().from_db(db, field_names, values)
+        coupon._loaded_code = coupon.__dict__.get('code')
+        return coupon
+
+    def save(self, *args, **kwargs):
+        """
+        Save the coupon and drop it from the lookup cache.
+        """
+        from .coupons import invalidate_on_commit
+
+        super().save(*args, **kwargs)
+        invalidate_on_commit({self.code, getattr(self, '_loaded_code', None) or self.code})
+        self._loaded_code = self.code
+
+    def delete(self, *args, **kwargs):
+        from .coupons import invalidate_on_commit
+
+        invalidate_on_commit({self.code, getattr(self, '_loaded_code', None) or self.code})
+        return super().delete(*args, **kwargs)
+
     @property
     def is_valid(self):
         from django.utils import timezone
@@ -277,4 +636,260 @@ class Coupon(models.Model):
         else:  # fixed
             discount = self.value
 
-        return min(discount, amount)
\ No newline at end of file
+        return min(discount, amount)
+
+
+class StockReservation(models.Model):
+    """
+    Short-lived hold on stock for a cart that has started checkout.
+
+    Every hold is counted in ``reserved_quantity`` of its product or variant,
+    so the stock left for other buyers is ``stock_quantity - reserved_quantity``
+    without summing holds. Holds become stock decrements when the order is
+    placed, or are released by ``release_stock_reservations`` once expired.
+    The cart is nulled rather than cascaded on delete so the counter is still
+    released by the sweeper.
+    """
+    cart = models.ForeignKey(
+        'cart.Cart',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservations'
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='reservations'
+    )
+    variant = models.ForeignKey(
+        'products.ProductVariant',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='reservations'
+    )
+    quantity = models.PositiveIntegerField(
+        _('quantity'),
+        validators=[MinValueValidator(1)]
+    )
+    expires_at = models.DateTimeField(_('expires at'), db_index=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Stock Reservation')
+        verbose_name_plural = _('Stock Reservations')
+        db_table = 'stock_reservations'
+
+    def __str__(self):
+        variant_text = f" - {self.variant_id}" if self.variant_id else ""
+        return f"Cart {self.cart_id}: {self.product_id}{variant_text} x {self.quantity}"
+
+
+class CouponUsageShard(models.Model):
+    """
+    Uses of an unlimited coupon not yet added to ``Coupon.used_count``.
+
+    Each redemption increments one of ``COUPON_USAGE_SHARDS`` rows per
+    coupon, picked at random, so concurrent checkouts with a popular code
+    do not all update the same row. See ``orders.coupons``.
+    """
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='usage_shards')
+    shard = models.PositiveSmallIntegerField(_('shard'))
+    count = models.PositiveIntegerField(_('count'), default=0)
+
+    class Meta:
+        verbose_name = _('Coupon Usage Shard')
+        verbose_name_plural = _('Coupon Usage Shards')
+        db_table = 'coupon_usage_shards'
+        constraints = [
+            models.UniqueConstraint(fields=['coupon', 'shard'], name='coupon_usage_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.coupon_id} #{self.shard}: {self.count}"
+
+
+def _campaign_code_key():
+    return get_random_string(32)
+
+
+class CouponCampaign(models.Model):
+    """
+    Batch of single-use (or few-use) coupon codes sharing their terms.
+
+    The discount, limits and validity live here once; each code is a
+    ``CampaignCode`` row holding only the code and its use count. Codes are
+    ``prefix``, the body and a check character, all from
+    ``orders.campaigns.ALPHABET``. Bodies are a keyed permutation of
+    sequence numbers, so they never repeat within a campaign. Prefixes are
+    prefix-free (no prefix starts another campaign's) and may not start a
+    coupon code of the campaign's shape, which keeps the codes apart from
+    other campaigns and coupons. See ``orders.campaigns``.
+    """
+    name = models.CharField(_('name'), max_length=200)
+    description = models.CharField(_('description'), max_length=200)
+    prefix = models.CharField(
+        _('prefix'),
+        max_length=10,
+        unique=True,
+        validators=[RegexValidator(
+            r'^[0-9A-HJKMNP-TV-Z]+$',
+            _('Use digits and capital letters other than I, L, O and U.')
+        )]
+    )
+    code_length = models.PositiveSmallIntegerField(
+        _('code length'),
+        default=10,
+        validators=[MinValueValidator(6), MaxValueValidator(20)],
+        help_text=_('Characters between the prefix and the check character.')
+    )
+    code_key = models.CharField(
+        _('code key'), max_length=64, default=_campaign_code_key, editable=False
+    )
+    coupon_type = models.CharField(
+        _('coupon type'),
+        max_length=20,
+        choices=Coupon.COUPON_TYPES,
+        default='percentage'
+    )
+    value = models.DecimalField(_('value'), max_digits=10, decimal_places=2)
+    minimum_amount = models.DecimalField(
+        _('minimum amount'),
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    maximum_discount = models.DecimalField(
+        _('maximum discount'),
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    usage_limit = models.PositiveIntegerField(
+        _('usage limit per code'), default=1, validators=[MinValueValidator(1)]
+    )
+    is_active = models.BooleanField(_('active'), default=True)
+    valid_from = models.DateTimeField(_('valid from'))
+    valid_until = models.DateTimeField(_('valid until'))
+    size = models.PositiveIntegerField(
+        _('codes'), default=0, help_text=_('Number of codes the campaign should have.')
+    )
+    generated_count = models.PositiveIntegerField(_('generated codes'), default=0, editable=False)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Coupon Campaign')
+        verbose_name_plural = _('Coupon Campaigns')
+        db_table = 'coupon_campaigns'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix})"
+
+    def clean(self):
+        errors = {}
+        if self.valid_until and self.valid_from and self.valid_until <= self.valid_from:
+            errors['valid_until'] = _('Must be after valid from.')
+        if self.prefix:
+            # 'A' and 'AB' would issue the same codes for different bodies.
+            overlapping = CouponCampaign.objects.exclude(pk=self.pk).filter(
+                Q(prefix__startswith=self.prefix) |
+                Q(prefix__in=[self.prefix[:end] for end in range(1, len(self.prefix))])
+            ).exclude(prefix=self.prefix).values_list('prefix', flat=True).first()
+            if overlapping:
+                errors['prefix'] = ValidationError(
+                    _('Overlaps the prefix %(prefix)s of another campaign.'),
+                    params={'prefix': overlapping}
+                )
+            elif self.code_length:
+                coupon_codes = Coupon.objects.filter(
+                    code__startswith=self.prefix
+                ).values_list('code', flat=True)
+                clash = next(
+                    (code for code in coupon_codes.iterator() if self.could_issue(code)), None
+                )
+                if clash:
+                    errors['prefix'] = ValidationError(
+                        _('The coupon %(code)s has the form of a code of this campaign.'),
+                        params={'code': clash}
+                    )
+        if errors:
+            raise ValidationError(errors)
+
+    def could_issue(self, code):
+        """
+        Return whether ``code`` has the form of a code of this campaign.
+        """
+        from .campaigns import is_well_formed
+
+        return (
+            code.startswith(self.prefix) and
+            len(code) == len(self.prefix) + self.code_length + 1 and
+            is_well_formed(code)
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Save the campaign and drop it from the lookup cache.
+
+        ``generated_count`` is only written on creation: ``generate``
+        advances it while the campaign may be open elsewhere.
+        """
+        from .campaigns import invalidate_on_commit
+
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'generated_count'
+            ]
+        super().save(*args, **kwargs)
+        invalidate_on_commit(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from .campaigns import invalidate_on_commit
+
+        invalidate_on_commit(self.pk)
+        return super().delete(*args, **kwargs)
+
+    def coupon(self, code, used_count=0, campaign_code_id=None):
+        """
+        Return an unsaved ``Coupon`` for ``code`` with the campaign's terms,
+        so validation and discounts work as for any other coupon.
+        """
+        coupon = Coupon(
+            code=code,
+            description=self.description,
+            coupon_type=self.coupon_type,
+            value=self.value,
+            minimum_amount=self.minimum_amount,
+            maximum_discount=self.maximum_discount,
+            usage_limit=self.usage_limit,
+            used_count=used_count,
+            is_active=self.is_active,
+            valid_from=self.valid_from,
+            valid_until=self.valid_until,
+        )
+        coupon.campaign_code_id = campaign_code_id
+        return coupon
+
+
+class CampaignCode(models.Model):
+    """
+    One code of a ``CouponCampaign``; everything else comes from the
+    campaign.
+    """
+    campaign = models.ForeignKey(CouponCampaign, on_delete=models.CASCADE, related_name='codes')
+    code = models.CharField(_('code'), max_length=32, unique=True)
+    used_count = models.PositiveIntegerField(_('used count'), default=0)
+
+    class Meta:
+        verbose_name = _('Campaign Code')
+        verbose_name_plural = _('Campaign Codes')
+        db_table = 'campaign_codes'
+
+    def __str__(self):
+        return self.code
@@ -2,15 +2,20 @@
 Order serializers for the e-commerce platform.
 """
 
+from django.conf import settings
 from rest_framework import serializers
-from .models import Order, OrderItem, OrderStatusHistory, Coupon
-from products.serializers import ProductListSerializer, ProductVariantSerializer
+from .coupons import get_coupon
+from .models import Order, OrderItem, OrderStatusHistory, Coupon, StockReservation
+from .snapshots import product_snapshot
 from accounts.serializers import AddressSerializer
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductListSerializer(read_only=True)
-    variant = ProductVariantSerializer(read_only=True)
+    """
+    Order line rendered from its product snapshot, without catalog queries.
+    """
+    product = serializers.SerializerMethodField()
+    variant = serializers.SerializerMethodField()
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
@@ -19,6 +24,43 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'id', 'product', 'variant', 'quantity', 'unit_price', 'total_price', 'created_at'
         ]
 
+    def _snapshot(self, obj):
+        # Items placed before snapshots existed fall back to the catalog
+        # until backfill_order_snapshots has run.
+        return obj.product_snapshot or product_snapshot(obj.product, obj.variant)
+
+    def get_product(self, obj):
+        snapshot = self._snapshot(obj)
+        image = snapshot['image']
+        request = self.context.get('request')
+        if image and request:
+            image = request.build_absolute_uri(image)
+        return {
+            'id': obj.product_id,
+            'name': snapshot['name'],
+            'slug': snapshot['slug'],
+            'sku': snapshot['sku'],
+            'image': image,
+            'brand': snapshot['brand'],
+            'category': snapshot['category'],
+        }
+
+    def get_variant(self, obj):
+        if not obj.variant_id:
+            return None
+        snapshot = self._snapshot(obj)
+        return {
+            'id': obj.variant_id,
+            'name': snapshot['variant_name'],
+            'sku': snapshot['variant_sku'],
+        }
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'product', 'variant', 'quantity', 'expires_at']
+
 
 class OrderStatusHistorySerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
@@ -42,8 +84,8 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = [
             'id', 'order_number', 'status', 'payment_status', 'subtotal', 'tax_amount',
-            'shipping_amount', 'discount_amount', 'total_amount', 'billing_first_name',
-            'billing_last_name', 'billing_company', 'billing_address_line_1',
+            'shipping_amount', 'discount_amount', 'coupon_code', 'total_amount',
+            'billing_first_name', 'billing_last_name', 'billing_company', 'billing_address_line_1',
             'billing_address_line_2', 'billing_city', 'billing_state', 'billing_postal_code',
             'billing_country', 'billing_phone', 'shipping_first_name', 'shipping_last_name',
             'shipping_company', 'shipping_address_line_1', 'shipping_address_line_2',
@@ -52,11 +94,11 @@ class OrderSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'items', 'status_history', 'billing_full_name',
             'shipping_full_name', 'is_paid', 'is_shipped', 'is_delivered', 'is_cancelled'
         ]
-        read_only_fields = ['order_number', 'created_at', 'updated_at']
+        read_only_fields = ['order_number', 'coupon_code', 'created_at', 'updated_at']
 
 
 class OrderListSerializer(serializers.ModelSerializer):
-    items_count = serializers.SerializerMethodField()
+    items_count = serializers.IntegerField(read_only=True)
     billing_full_name = serializers.CharField(read_only=True)
     shipping_full_name = serializers.CharField(read_only=True)
 
@@ -67,8 +109,17 @@ class OrderListSerializer(serializers.ModelSerializer):
             'billing_full_name', 'shipping_full_name', 'items_count', 'created_at'
         ]
 
-    def get_items_count(self, obj):
-        return obj.items.count()
+
+def valid_coupon(code):
+    """
+    Return the coupon with ``code`` if it can be used, for ``validate``.
+    """
+    coupon = get_coupon(code)
+    if coupon is None:
+        raise serializers.ValidationError({'coupon_code': "Coupon not found."})
+    if not coupon.is_valid:
+        raise serializers.ValidationError({'coupon_code': "Invalid or expired coupon."})
+    return coupon
 
 
 class CreateOrderSerializer(serializers.Serializer):
@@ -103,15 +154,10 @@ class CreateOrderSerializer(serializers.Serializer):
     notes = serializers.CharField(required=False, allow_blank=True)
     coupon_code = serializers.CharField(max_length=50, required=False, allow_blank=True)
 
-    def validate_coupon_code(self, value):
-        if value:
-            try:
-                coupon = Coupon.objects.get(code=value)
-                if not coupon.is_valid:
-                    raise serializers.ValidationError("Invalid or expired coupon.")
-            except Coupon.DoesNotExist:
-                raise serializers.ValidationError("Coupon not found.")
-        return value
+    def validate(self, data):
+        if data.get('coupon_code'):
+            data['coupon'] = valid_coupon(data['coupon_code'])
+        return data
 
 
 class UpdateOrderStatusSerializer(serializers.Serializer):
@@ -123,6 +169,40 @@ class UpdateOrderStatusSerializer(serializers.Serializer):
     tracking_number = serializers.CharField(max_length=100, required=False, allow_blank=True)
 
 
+class BulkOrderStatusSerializer(serializers.Serializer):
+    """
+    Serializer for moving many orders to one status.
+    """
+    status = serializers.ChoiceField(choices=Order.ORDER_STATUS_CHOICES)
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list
+    )
+    order_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        required=False,
+        default=list
+    )
+    tracking_numbers = serializers.DictField(
+        child=serializers.CharField(max_length=100),
+        required=False,
+        default=dict,
+        help_text='Tracking number per order id or order number'
+    )
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        count = len(attrs['order_ids']) + len(attrs['order_numbers'])
+        if not count:
+            raise serializers.ValidationError('Provide order_ids or order_numbers.')
+        if count > settings.ORDER_BULK_STATUS_MAX_ORDERS:
+            raise serializers.ValidationError(
+                f'At most {settings.ORDER_BULK_STATUS_MAX_ORDERS} orders per request.'
+            )
+        return attrs
+
+
 class CouponSerializer(serializers.ModelSerializer):
     is_valid = serializers.BooleanField(read_only=True)
 
@@ -143,27 +223,14 @@ class ValidateCouponSerializer(serializers.Serializer):
     coupon_code = serializers.CharField(max_length=50)
     order_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
 
-    def validate_coupon_code(self, value):
-        try:
-            coupon = Coupon.objects.get(code=value)
-            if not coupon.is_valid:
-                raise serializers.ValidationError("Invalid or expired coupon.")
-        except Coupon.DoesNotExist:
-            raise serializers.ValidationError("Coupon not found.")
-        return value
-
     def validate(self, data):
-        coupon_code = data.get('coupon_code')
+        coupon = valid_coupon(data['coupon_code'])
         order_amount = data.get('order_amount')
 
-        if coupon_code and order_amount:
-            try:
-                coupon = Coupon.objects.get(code=coupon_code)
-                if coupon.minimum_amount and order_amount < coupon.minimum_amount:
-                    raise serializers.ValidationError(
-                        f"Minimum order amount of ${coupon.minimum_amount} required for this coupon."
-                    )
-            except Coupon.DoesNotExist:
-                pass
+        if order_amount and coupon.minimum_amount and order_amount < coupon.minimum_amount:
+            raise serializers.ValidationError(
+                f"Minimum order amount of ${coupon.minimum_amount} required for this coupon."
+            )
 
+        data['coupon'] = coupon
         return data
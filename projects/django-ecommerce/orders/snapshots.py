@@ -0,0 +1,77 @@
+"""
+Product snapshots of order items.
+
+Each order item stores the product data shown for it (name, SKU, image,
+brand, category and variant) as it was when the order was placed, so
+order pages render without touching the catalog and keep showing what was
+bought after products change.
+"""
+
+import logging
+
+from django.db.models import Prefetch
+
+logger = logging.getLogger(__name__)
+
+
+def _primary_image_url(product):
+    if hasattr(product, 'primary_images'):
+        images = product.primary_images
+    else:
+        images = [image for image in product.images.all() if image.is_primary]
+    return images[0].image.url if images else None
+
+
+def product_snapshot(product, variant=None):
+    """
+    Build the snapshot stored on an order item for ``product`` and
+    ``variant``.
+
+    Load ``brand`` and ``category`` with the product and its primary images
+    as ``primary_images`` (see ``CartItemQuerySet.with_product_snapshot``)
+    to avoid extra queries.
+    """
+    return {
+        'name': product.name,
+        'slug': product.slug,
+        'sku': product.sku,
+        'image': _primary_image_url(product),
+        'brand': product.brand.name if product.brand_id else None,
+        'category': product.category.name if product.category_id else None,
+        'variant_name': variant.name if variant else None,
+        'variant_sku': variant.sku if variant else None,
+    }
+
+
+def backfill_snapshots(item_model, batch_size=500):
+    """
+    Store snapshots on the items of ``item_model`` that have none yet,
+    taken from the current catalog. Returns the number of items updated.
+    """
+    from products.models import ProductImage
+
+    updated = 0
+    last_id = 0
+    while True:
+        batch = list(
+            item_model.objects.filter(
+                product_snapshot={}, id__gt=last_id
+            ).select_related(
+                'product__brand', 'product__category', 'variant'
+            ).prefetch_related(
+                Prefetch(
+                    'product__images',
+                    queryset=ProductImage.objects.filter(is_primary=True),
+                    to_attr='primary_images'
+                )
+            ).order_by('id')[:batch_size]
+        )
+        if not batch:
+            break
+        for item in batch:
+            item.product_snapshot = product_snapshot(item.product, item.variant)
+        item_model.objects.bulk_update(batch, ['product_snapshot'])
+        updated += len(batch)
+        last_id = batch[-1].id
+        logger.info("Backfilled %s %s snapshots up to %s", updated, item_model.__name__, last_id)
+    return updated
@@ -0,0 +1,102 @@
+"""
+Background tasks for orders.
+
+These run after an order has been committed and are enqueued with
+``ecommerce.celery.delay_on_commit``, so checkout only waits on its own
+writes.
+"""
+
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import send_mail
+
+from ecommerce.celery import delay_on_commit
+
+from . import archive, campaigns, coupons
+from .checkout import release_expired_reservations
+from .models import CouponCampaign, Order
+
+logger = logging.getLogger(__name__)
+
+def enqueue_order_placed(order, product_ids):
+    """
+    Schedule the side effects of placing ``order`` for after commit.
+    """
+    from products.tasks import check_low_stock
+
+    # Product caches are dropped by the stock.changed outbox handler.
+    delay_on_commit(send_order_confirmation, order.id)
+    delay_on_commit(check_low_stock, product_ids)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_order_confirmation(self, order_id):
+    """
+    Email the customer a summary of their order.
+    """
+    order = Order.objects.select_related('user').get(pk=order_id)
+    lines = [
+        f"{item.product.name}{f' - {item.variant.name}' if item.variant else ''}"
+        f" x {item.quantity}: {item.total_price}"
+        for item in order.items.select_related('product', 'variant')
+    ]
+    message = '\n'.join([
+        f"Thank you for your order {order.order_number}.",
+        '',
+        *lines,
+        '',
+        f"Total: {order.total_amount}",
+    ])
+    try:
+        send_mail(
+            f'Order confirmation {order.order_number}',
+            message,
+            settings.DEFAULT_FROM_EMAIL,
+            [order.user.email],
+            fail_silently=False,
+        )
+    except Exception as e:
+        raise self.retry(exc=e)
+
+
+@shared_task
+def release_stock_reservations():
+    """
+    Release stock held by expired checkout reservations.
+    """
+    released = release_expired_reservations()
+    if released:
+        logger.info("Released %s expired stock reservations", released)
+    return released
+
+
+@shared_task
+def archive_orders():
+    """
+    Create upcoming archive partitions and archive closed orders.
+    """
+    archive.create_future_partitions(settings.ORDER_PARTITION_MONTHS_AHEAD)
+    return archive.archive_orders()
+
+
+@shared_task
+def fold_coupon_usage():
+    """
+    Add the uses of unlimited coupons counted in shards to ``used_count``.
+    """
+    return coupons.fold_usage()
+
+
+@shared_task
+def generate_campaign_codes(campaign_id):
+    """
+    Generate the codes a coupon campaign is missing to reach its size.
+    """
+    campaign = CouponCampaign.objects.filter(pk=campaign_id).first()
+    if campaign is None:
+        return 0
+    generated = sum(len(chunk) for chunk in campaigns.generate(campaign))
+    logger.info("Generated %s codes for campaign %s", generated, campaign.prefix)
+    return generated
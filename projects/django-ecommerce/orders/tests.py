@@ -1,3 +1,126 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .campaigns import (
+    ALPHABET, BASE, CodePermutation, check_character, codes, generate, is_well_formed
+)
+from .models import CampaignCode, Coupon, CouponCampaign
+
+
+def campaign(prefix, **kwargs):
+    now = timezone.now()
+    return CouponCampaign.objects.create(
+        name=f'Campaign {prefix}', description='Ten percent off', prefix=prefix,
+        value=Decimal('10'), valid_from=now, valid_until=now + timedelta(days=30), **kwargs
+    )
+
+
+class CodePermutationTests(SimpleTestCase):
+
+    def test_permutation_is_a_bijection(self):
+        for length in (1, 2):
+            with self.subTest(length=length):
+                permutation = CodePermutation('key', length)
+                values = [permutation(value) for value in range(BASE ** length)]
+                self.assertEqual(sorted(values), list(range(BASE ** length)))
+
+    def test_key_changes_the_permutation(self):
+        first, second = CodePermutation('key', 2), CodePermutation('other key', 2)
+        self.assertNotEqual(
+            [first(value) for value in range(10)], [second(value) for value in range(10)]
+        )
+
+    def test_body_has_the_code_length(self):
+        permutation = CodePermutation('key', 6)
+        body = permutation.body(0)
+        self.assertEqual(len(body), 6)
+        self.assertTrue(set(body) <= set(ALPHABET))
+
+
+class CheckCharacterTests(SimpleTestCase):
+
+    def test_well_formed(self):
+        code = 'XMAS7K2M9Q'
+        self.assertTrue(is_well_formed(code + check_character(code)))
+        self.assertFalse(is_well_formed(code + 'I'))
+        self.assertFalse(is_well_formed('A'))
+
+    def test_every_single_character_typo_is_rejected(self):
+        for code in ('XMAS7K2M9Q', '000000', 'ZZZZZZ'):
+            code += check_character(code)
+            for position, original in enumerate(code):
+                for char in ALPHABET.replace(original, ''):
+                    typo = code[:position] + char + code[position + 1:]
+                    self.assertFalse(is_well_formed(typo), typo)
+
+
+class GenerateTests(TestCase):
+
+    def test_generate_resumes_from_generated_count(self):
+        xmas = campaign('XMAS', size=10)
+        expected = codes(xmas, 0, 10)
+
+        run = generate(xmas, chunk_size=4)
+        self.assertEqual(next(run), expected[:4])
+        run.close()
+        xmas.refresh_from_db()
+        self.assertEqual(xmas.generated_count, 4)
+
+        self.assertEqual(list(generate(xmas, chunk_size=4)), [expected[4:8], expected[8:]])
+        xmas.refresh_from_db()
+        self.assertEqual(xmas.generated_count, 10)
+        self.assertEqual(
+            sorted(CampaignCode.objects.values_list('code', flat=True)), sorted(expected)
+        )
+        self.assertEqual(len(set(expected)), 10)
+        self.assertTrue(all(xmas.could_issue(code) for code in expected))
+
+        self.assertEqual(list(generate(xmas)), [])
+
+    def test_generate_refuses_more_codes_than_left(self):
+        xmas = campaign('XMAS', code_length=6)
+        with self.assertRaises(ValueError):
+            next(generate(xmas, count=BASE ** 6 + 1))
+
+
+class CouponCampaignCleanTests(TestCase):
+
+    def assertPrefixInvalid(self, campaign):
+        with self.assertRaises(ValidationError) as context:
+            campaign.clean()
+        self.assertIn('prefix', context.exception.error_dict)
+
+    def test_prefixes_are_prefix_free(self):
+        existing = campaign('XMA')
+        now = timezone.now()
+        for prefix in ('X', 'XM', 'XMAS'):
+            with self.subTest(prefix=prefix):
+                self.assertPrefixInvalid(CouponCampaign(
+                    name='New', description='New', prefix=prefix, value=Decimal('5'),
+                    valid_from=now, valid_until=now + timedelta(days=1)
+                ))
+        CouponCampaign(
+            name='New', description='New', prefix='WNTR', value=Decimal('5'),
+            valid_from=now, valid_until=now + timedelta(days=1)
+        ).clean()
+        existing.clean()
+
+    def test_prefix_may_not_issue_an_existing_coupon(self):
+        now = timezone.now()
+        code = 'XMAS7K2M9Q'
+        Coupon.objects.create(
+            code=code + check_character(code), description='Hand made',
+            coupon_type='percentage', value=Decimal('10'),
+            valid_from=now, valid_until=now + timedelta(days=1)
+        )
+        new = CouponCampaign(
+            name='New', description='New', prefix='XMAS', code_length=6, value=Decimal('5'),
+            valid_from=now, valid_until=now + timedelta(days=1)
+        )
+        self.assertPrefixInvalid(new)
+        new.code_length = 7
+        new.clean()
@@ -9,6 +9,9 @@ urlpatterns = [
     path('<int:pk>/', views.OrderDetailView.as_view(), name='order_detail'),
     path('<int:pk>/status/', views.OrderStatusUpdateView.as_view(), name='order_status_update'),
     path('<int:pk>/cancel/', views.cancel_order, name='cancel_order'),
+    path('bulk-status/', views.bulk_update_order_status, name='bulk_order_status'),
+    path('export/', views.export_orders_view, name='export_orders'),
+    path('checkout/', views.start_checkout, name='start_checkout'),
     
     # Order utilities
     path('stats/', views.order_stats, name='order_stats'),
@@ -4,19 +4,40 @@ API views for order management.
 
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Count
 from django.utils import timezone
-from decimal import Decimal
+from django.utils.decorators import method_decorator
 
-from .models import Order, OrderItem, OrderStatusHistory, Coupon
+from . import detail_cache, export
+from .archive import get_order
+from .checkout import (
+    CouponUnavailableError, EmptyCartError, InsufficientStockError, move_stock, place_order,
+    reserve_stock
+)
+from .filters import OrderExportFilter, OrderFilter
+from .fulfilment import UPDATED, bulk_update_status
+from .models import Order, OrderStatusHistory, Coupon, CustomerStats
 from .serializers import (
     OrderSerializer, OrderListSerializer, CreateOrderSerializer,
-    UpdateOrderStatusSerializer, CouponSerializer, ValidateCouponSerializer
+    UpdateOrderStatusSerializer, BulkOrderStatusSerializer, CouponSerializer,
+    ValidateCouponSerializer, StockReservationSerializer
 )
-from cart.models import Cart, CartItem
-from products.models import Product, ProductVariant
+from cart.stores import CartOwner, get_cart_store
+from ecommerce.idempotency import idempotent
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pagination, served by the (user, created_at) index.
+    """
+    ordering = '-created_at'
+    page_size = 20
 
 
 class OrderListView(generics.ListCreateAPIView):
@@ -30,155 +51,51 @@ class OrderListView(generics.ListCreateAPIView):
             return CreateOrderSerializer
         return OrderListSerializer
 
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilter
+    pagination_class = OrderCursorPagination
+
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).prefetch_related('items')
+        return Order.objects.filter(user=self.request.user).only(
+            'id', 'order_number', 'status', 'payment_status', 'total_amount',
+            'billing_first_name', 'billing_last_name',
+            'shipping_first_name', 'shipping_last_name', 'created_at'
+        ).annotate(items_count=Count('items'))
 
+    @method_decorator(idempotent)
     def create(self, request, *args, **kwargs):
         """
         Create a new order from the user's cart.
+
+        Retries sending the same ``Idempotency-Key`` get the first response.
         """
         serializer = CreateOrderSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         # Get user's cart
-        try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            return Response(
-                {'detail': 'Cart is empty.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        cart_owner = CartOwner.from_request(request)
+        cart_store = get_cart_store()
+        cart = cart_store.sync(cart_owner)
 
-        if not cart.items.exists():
+        try:
+            order = place_order(request.user, cart, serializer.validated_data)
+        except (EmptyCartError, InsufficientStockError, CouponUnavailableError) as e:
             return Response(
-                {'detail': 'Cart is empty.'},
+                {'detail': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        # Validate cart items and stock
-        cart_items = cart.items.all()
-        for item in cart_items:
-            if item.variant:
-                if item.quantity > item.variant.stock_quantity:
-                    return Response(
-                        {'detail': f'Insufficient stock for {item.product.name} - {item.variant.name}'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            else:
-                if item.quantity > item.product.stock_quantity:
-                    return Response(
-                        {'detail': f'Insufficient stock for {item.product.name}'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-        try:
-            with transaction.atomic():
-                # Create order with default values first
-                order_data = serializer.validated_data
-                order = Order.objects.create(
-                    user=request.user,
-                    billing_first_name=order_data['billing_first_name'],
-                    billing_last_name=order_data['billing_last_name'],
-                    billing_company=order_data.get('billing_company', ''),
-                    billing_address_line_1=order_data['billing_address_line_1'],
-                    billing_address_line_2=order_data.get('billing_address_line_2', ''),
-                    billing_city=order_data['billing_city'],
-                    billing_state=order_data['billing_state'],
-                    billing_postal_code=order_data['billing_postal_code'],
-                    billing_country=order_data['billing_country'],
-                    billing_phone=order_data.get('billing_phone', ''),
-                    shipping_first_name=order_data['shipping_first_name'],
-                    shipping_last_name=order_data['shipping_last_name'],
-                    shipping_company=order_data.get('shipping_company', ''),
-                    shipping_address_line_1=order_data['shipping_address_line_1'],
-                    shipping_address_line_2=order_data.get('shipping_address_line_2', ''),
-                    shipping_city=order_data['shipping_city'],
-                    shipping_state=order_data['shipping_state'],
-                    shipping_postal_code=order_data['shipping_postal_code'],
-                    shipping_country=order_data['shipping_country'],
-                    shipping_phone=order_data.get('shipping_phone', ''),
-                    notes=order_data.get('notes', ''),
-                    # Set default values for required fields
-                    subtotal=Decimal('0'),
-                    tax_amount=Decimal('0'),
-                    shipping_amount=Decimal('0'),
-                    discount_amount=Decimal('0'),
-                    total_amount=Decimal('0'),
-                )
-
-                # Calculate pricing
-                subtotal = Decimal('0')
-                for item in cart_items:
-                    unit_price = item.variant.price if item.variant else item.product.price
-                    total_price = unit_price * item.quantity
-                    subtotal += total_price
-
-                    # Create order item
-                    OrderItem.objects.create(
-                        order=order,
-                        product=item.product,
-                        variant=item.variant,
-                        quantity=item.quantity,
-                        unit_price=unit_price,
-                        total_price=total_price
-                    )
-
-                # Apply coupon if provided
-                discount_amount = Decimal('0')
-                if order_data.get('coupon_code'):
-                    try:
-                        coupon = Coupon.objects.get(code=order_data['coupon_code'])
-                        if coupon.is_valid and (not coupon.minimum_amount or subtotal >= coupon.minimum_amount):
-                            discount_amount = coupon.calculate_discount(subtotal)
-                            coupon.used_count += 1
-                            coupon.save()
-                    except Coupon.DoesNotExist:
-                        pass
-
-                # Calculate final amounts (simplified - no tax/shipping for now)
-                tax_amount = Decimal('0')
-                shipping_amount = Decimal('0')
-                total_amount = subtotal + tax_amount + shipping_amount - discount_amount
-
-                # Update order with calculated amounts
-                order.subtotal = subtotal
-                order.tax_amount = tax_amount
-                order.shipping_amount = shipping_amount
-                order.discount_amount = discount_amount
-                order.total_amount = total_amount
-                order.save()
-
-                # Update stock quantities
-                for item in cart_items:
-                    if item.variant:
-                        item.variant.stock_quantity -= item.quantity
-                        item.variant.save()
-                    else:
-                        item.product.stock_quantity -= item.quantity
-                        item.product.save()
-
-                # Clear cart
-                cart.clear()
-
-                # Create initial status history
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    status='pending',
-                    notes='Order created',
-                    created_by=request.user
-                )
-
-                return Response(
-                    OrderSerializer(order).data,
-                    status=status.HTTP_201_CREATED
-                )
-
         except Exception as e:
             return Response(
                 {'detail': f'Error creating order: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        cart_store.invalidate(cart_owner)
+        return Response(
+            OrderSerializer(order).data,
+            status=status.HTTP_201_CREATED
+        )
+
 
 class OrderDetailView(generics.RetrieveAPIView):
     """
@@ -189,9 +106,38 @@ class OrderDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user).prefetch_related(
-            'items__product', 'items__variant', 'status_history'
+            'items', 'status_history__created_by'
         )
 
+    def get_object(self):
+        """
+        Look the order up in the live tables, then in the archive.
+        """
+        try:
+            return get_order(self.request.user, self.kwargs['pk'], self.get_queryset())
+        except Order.DoesNotExist:
+            raise Http404
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve the order from ``orders.detail_cache``, serializing it on a miss.
+        """
+        entry = detail_cache.get_or_build(self.kwargs['pk'], self._build_cache_entry)
+        if entry is None or entry['user_id'] != request.user.pk:
+            raise Http404
+        return Response(entry['data'])
+
+    def _build_cache_entry(self):
+        try:
+            order = self.get_object()
+        except Http404:
+            return None
+        return {
+            'user_id': order.user_id,
+            'status': order.status,
+            'data': self.get_serializer(order).data,
+        }
+
 
 class OrderStatusUpdateView(generics.UpdateAPIView):
     """
@@ -228,6 +174,100 @@ class OrderStatusUpdateView(generics.UpdateAPIView):
         )
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_update_order_status(request):
+    """
+    Move many orders to one status (admin only), reporting the outcome for
+    every order.
+    """
+    serializer = BulkOrderStatusSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+
+    results = bulk_update_status(
+        data['status'],
+        order_ids=data['order_ids'],
+        order_numbers=data['order_numbers'],
+        user=request.user,
+        notes=data['notes'],
+        tracking_numbers=data['tracking_numbers'],
+    )
+
+    outcomes = []
+    for (field, value), order, outcome in results:
+        entry = {field: value, 'outcome': outcome}
+        if order is not None:
+            entry.update(id=order.pk, order_number=order.order_number, status=order.status)
+        outcomes.append(entry)
+    return Response({
+        'updated': sum(1 for entry in outcomes if entry['outcome'] == UPDATED),
+        'results': outcomes,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_orders_view(request):
+    """
+    Stream orders with their items as CSV or NDJSON (admin only).
+
+    Filters: ``status``, ``payment_status``, ``created_after``,
+    ``created_before`` and ``updated_since``; ``output=csv|ndjson`` and
+    ``gzip=1``. The ``Export-Watermark`` header is the ``updated_since`` of
+    the next incremental export, which overlaps this one by
+    ``ORDER_EXPORT_WATERMARK_LAG`` seconds.
+    """
+    output = request.query_params.get('output', 'csv')
+    if output not in export.FORMATS:
+        return Response(
+            {'detail': f"output must be one of: {', '.join(export.FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    filterset = OrderExportFilter(request.query_params, queryset=Order.objects.all())
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    until = timezone.now()
+    lines = export.render(export.export_orders(filterset.qs, until), output)
+    filename = f'orders-{until:%Y%m%dT%H%M%S}.{output}'
+    if request.query_params.get('gzip') in ('1', 'true'):
+        response = StreamingHttpResponse(
+            export.gzip_chunks(lines), content_type='application/gzip'
+        )
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(lines, content_type=export.FORMATS[output])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Export-Watermark'] = export.next_watermark(until).isoformat()
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def start_checkout(request):
+    """
+    Hold stock for the user's cart while they complete checkout.
+
+    Calling it again renews the holds for the cart's current lines.
+    """
+    cart_owner = CartOwner.from_request(request)
+    cart = get_cart_store().sync(cart_owner)
+
+    try:
+        reservations = reserve_stock(cart)
+    except (EmptyCartError, InsufficientStockError) as e:
+        return Response(
+            {'detail': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({
+        'expires_at': reservations[0].expires_at,
+        'reservations': StockReservationSerializer(reservations, many=True).data
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def validate_coupon(request):
@@ -237,24 +277,16 @@ def validate_coupon(request):
     serializer = ValidateCouponSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
-    coupon_code = serializer.validated_data['coupon_code']
+    coupon = serializer.validated_data['coupon']
     order_amount = serializer.validated_data['order_amount']
+    discount_amount = coupon.calculate_discount(order_amount)
 
-    try:
-        coupon = Coupon.objects.get(code=coupon_code)
-        discount_amount = coupon.calculate_discount(order_amount)
-        
-        return Response({
-            'valid': True,
-            'coupon': CouponSerializer(coupon).data,
-            'discount_amount': discount_amount,
-            'final_amount': order_amount - discount_amount
-        })
-    except Coupon.DoesNotExist:
-        return Response({
-            'valid': False,
-            'error': 'Coupon not found'
-        })
+    return Response({
+        'valid': True,
+        'coupon': CouponSerializer(coupon).data,
+        'discount_amount': discount_amount,
+        'final_amount': order_amount - discount_amount
+    })
 
 
 class CouponListView(generics.ListAPIView):
@@ -277,17 +309,17 @@ def order_stats(request):
     """
     Get order statistics for the user.
     """
-    user_orders = Order.objects.filter(user=request.user)
-    
-    stats = {
-        'total_orders': user_orders.count(),
-        'pending_orders': user_orders.filter(status='pending').count(),
-        'completed_orders': user_orders.filter(status='delivered').count(),
-        'cancelled_orders': user_orders.filter(status='cancelled').count(),
-        'total_spent': sum(order.total_amount for order in user_orders if order.is_paid),
-    }
-    
-    return Response(stats)
+    stats = CustomerStats.objects.for_user(request.user)
+
+    return Response({
+        'total_orders': stats.total_orders,
+        'pending_orders': stats.pending_orders,
+        'completed_orders': stats.delivered_orders,
+        'cancelled_orders': stats.cancelled_orders,
+        'total_spent': stats.total_spent,
+        'average_order_value': stats.average_order_value,
+        'last_order_at': stats.last_order_at,
+    })
 
 
 @api_view(['POST'])
@@ -297,27 +329,24 @@ def cancel_order(request, pk):
     Cancel an order (if it's still pending).
     """
     order = get_object_or_404(Order, pk=pk, user=request.user)
-    
-    if order.status != 'pending':
-        return Response(
-            {'detail': 'Only pending orders can be cancelled.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
+
     try:
         with transaction.atomic():
+            # Locked, so concurrent cancellations restore the stock once.
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            if order.status != 'pending':
+                return Response(
+                    {'detail': 'Only pending orders can be cancelled.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             # Update order status
             order.status = 'cancelled'
             order.save()
             
             # Restore stock quantities
-            for item in order.items.all():
-                if item.variant:
-                    item.variant.stock_quantity += item.quantity
-                    item.variant.save()
-                else:
-                    item.product.stock_quantity += item.quantity
-                    item.product.save()
+            items = list(order.items.all())
+            move_stock(items, restored=items)
             
             # Create status history entry
             OrderStatusHistory.objects.create(
@@ -0,0 +1,15 @@
+from django.contrib import admin
+from ecommerce.admin_changelist import LargeTableAdminMixin
+from .models import OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'id', 'topic', 'aggregate_type', 'aggregate_id', 'attempts', 'created_at',
+        'processed_at'
+    )
+    list_filter = ('topic', 'aggregate_type', 'processed_at')
+    search_fields = ('aggregate_id',)
+    readonly_fields = ('created_at', 'processed_at', 'last_error')
+    keyset_pagination = True
@@ -0,0 +1,97 @@
+"""
+Publishing domain events and registering their handlers.
+
+``publish`` writes an ``OutboxEvent`` on the current database connection,
+so it commits or rolls back with the change it describes. The relay (see
+``outbox.relay``) later hands every event to the handlers registered for
+its topic. Delivery is at-least-once: a handler may see an event again
+after a failure elsewhere in its batch, so handlers must be idempotent.
+
+Topics:
+
+- ``order.created``, ``order.status_changed``
+- ``payment.completed``
+- ``product.updated``
+- ``stock.changed``
+"""
+
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+KICK_KEY = 'outbox:kick'
+
+_handlers = defaultdict(list)
+
+
+def handler(topic):
+    """
+    Register the decorated function to be called with every event of
+    ``topic``. Put handlers in a ``handlers`` module of the app; they are
+    imported when the outbox app is ready.
+    """
+    def register(func):
+        if func not in _handlers[topic]:
+            _handlers[topic].append(func)
+        return func
+    return register
+
+
+def handlers_for(topic):
+    return list(_handlers.get(topic, ()))
+
+
+def _event(topic, aggregate_type, aggregate_id, payload):
+    return OutboxEvent(
+        topic=topic,
+        aggregate_type=aggregate_type,
+        aggregate_id=str(aggregate_id),
+        payload=payload or {},
+    )
+
+
+def _kick_relay():
+    """
+    Ask a worker to relay soon after commit, at most once per
+    ``OUTBOX_KICK_INTERVAL`` seconds; the periodic relay covers the rest.
+    """
+    def kick():
+        if not cache.add(KICK_KEY, 1, timeout=settings.OUTBOX_KICK_INTERVAL):
+            return
+        from .tasks import relay_outbox
+        try:
+            relay_outbox.delay()
+        except Exception:
+            logger.exception("Could not enqueue the outbox relay")
+
+    transaction.on_commit(kick)
+
+
+def publish(topic, aggregate_type, aggregate_id, payload=None):
+    """
+    Record an event in the current transaction.
+    """
+    event = _event(topic, aggregate_type, aggregate_id, payload)
+    event.save()
+    _kick_relay()
+    return event
+
+
+def publish_many(topic, aggregate_type, events):
+    """
+    Record one event per ``(aggregate_id, payload)`` pair with one INSERT.
+    """
+    events = OutboxEvent.objects.bulk_create([
+        _event(topic, aggregate_type, aggregate_id, payload)
+        for aggregate_id, payload in events
+    ])
+    if events:
+        _kick_relay()
+    return events
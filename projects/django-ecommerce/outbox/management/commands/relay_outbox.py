@@ -0,0 +1,43 @@
+"""
+Management command to run an outbox relay worker.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from outbox import relay
+
+
+class Command(BaseCommand):
+    help = 'Dispatch outbox events to their handlers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help='Number of events claimed per transaction',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new events instead of exiting when none are due',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when no events are due',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            claimed = relay.relay(batch_size=options['batch_size'])
+            if claimed:
+                self.stdout.write(f'Relayed {claimed} events')
+            if not options['loop']:
+                break
+            if not claimed:
+                time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('Outbox relay finished'))
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("topic", models.CharField(max_length=100, verbose_name="topic")),
+                (
+                    "aggregate_type",
+                    models.CharField(max_length=50, verbose_name="aggregate type"),
+                ),
+                (
+                    "aggregate_id",
+                    models.CharField(max_length=50, verbose_name="aggregate id"),
+                ),
+                ("payload", models.JSONField(default=dict, verbose_name="payload")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="created at"
+                    ),
+                ),
+                (
+                    "available_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="available at"
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="attempts"),
+                ),
+                ("last_error", models.TextField(blank=True, verbose_name="last error")),
+                (
+                    "processed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="processed at"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Outbox Event",
+                "verbose_name_plural": "Outbox Events",
+                "db_table": "outbox",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("processed_at__isnull", True)),
+                        fields=["available_at", "id"],
+                        name="outbox_pending_idx",
+                    ),
+                    models.Index(fields=["processed_at"], name="outbox_processed_idx"),
+                    models.Index(
+                        fields=["aggregate_type", "aggregate_id"],
+                        name="outbox_aggregate_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
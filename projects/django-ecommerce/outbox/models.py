@@ -0,0 +1,45 @@
+"""
+Transactional outbox models.
+"""
+
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxEvent(models.Model):
+    """
+    A domain event, written in the same transaction as the change it
+    describes and dispatched to its handlers by the relay.
+    """
+    topic = models.CharField(_('topic'), max_length=100)
+    aggregate_type = models.CharField(_('aggregate type'), max_length=50)
+    aggregate_id = models.CharField(_('aggregate id'), max_length=50)
+    payload = models.JSONField(_('payload'), default=dict)
+    created_at = models.DateTimeField(_('created at'), default=timezone.now)
+    available_at = models.DateTimeField(_('available at'), default=timezone.now)
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    last_error = models.TextField(_('last error'), blank=True)
+    processed_at = models.DateTimeField(_('processed at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Outbox Event')
+        verbose_name_plural = _('Outbox Events')
+        db_table = 'outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['available_at', 'id'],
+                name='outbox_pending_idx',
+                condition=models.Q(processed_at__isnull=True)
+            ),
+            models.Index(fields=['processed_at'], name='outbox_processed_idx'),
+            models.Index(fields=['aggregate_type', 'aggregate_id'], name='outbox_aggregate_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} {self.aggregate_type}:{self.aggregate_id}"
+
+    @property
+    def is_processed(self):
+        return self.processed_at is not None
@@ -0,0 +1,147 @@
+"""
+Relay of outbox events to their handlers.
+
+Each batch is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+number of relays can run side by side without handing out an event
+twice, and handled inside the claiming transaction. An event is marked
+processed once all its handlers succeed. Otherwise it is retried with
+exponential backoff until ``OUTBOX_MAX_ATTEMPTS``, after which it stays
+in the table for inspection.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .events import handlers_for
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'outbox:metrics:last-batch'
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), settings.OUTBOX_MAX_RETRY_DELAY
+    ))
+
+
+def dispatch(event):
+    """
+    Call every handler registered for the event's topic.
+    """
+    for func in handlers_for(event.topic):
+        func(event)
+
+
+def relay_batch(batch_size=None):
+    """
+    Claim and dispatch up to ``batch_size`` due events.
+
+    Returns the number of events claimed.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True).filter(
+                processed_at__isnull=True,
+                available_at__lte=timezone.now(),
+                attempts__lt=settings.OUTBOX_MAX_ATTEMPTS
+            ).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        failed = 0
+        for event in events:
+            event.attempts += 1
+            try:
+                # A savepoint per event, so a failing handler's writes are
+                # undone without losing the rest of the batch.
+                with transaction.atomic():
+                    dispatch(event)
+            except Exception:
+                failed += 1
+                event.last_error = traceback.format_exc()
+                event.available_at = timezone.now() + _retry_delay(event.attempts)
+                logger.exception(
+                    "Outbox event %s (%s) failed, attempt %s", event.pk, event.topic, event.attempts
+                )
+            else:
+                event.processed_at = timezone.now()
+                event.last_error = ''
+        OutboxEvent.objects.bulk_update(
+            events, ['attempts', 'last_error', 'available_at', 'processed_at']
+        )
+
+    processed = [event for event in events if event.processed_at]
+    lag = max(
+        ((event.processed_at - event.created_at).total_seconds() for event in processed),
+        default=None
+    )
+    cache.set(METRICS_KEY, {
+        'at': timezone.now().isoformat(),
+        'claimed': len(events),
+        'failed': failed,
+        'max_lag_seconds': lag,
+    }, timeout=None)
+    logger.info(
+        "Relayed %s outbox events (%s failed), max lag %ss", len(processed), failed, lag
+    )
+    return len(events)
+
+
+def relay(batch_size=None, max_batches=None):
+    """
+    Relay batches until no due events are left or ``max_batches`` ran.
+
+    Returns the number of events claimed.
+    """
+    claimed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        count = relay_batch(batch_size)
+        claimed += count
+        batches += 1
+        if count < (batch_size or settings.OUTBOX_BATCH_SIZE):
+            break
+    return claimed
+
+
+def purge_processed(older_than_days=None):
+    """
+    Delete events processed more than ``older_than_days`` ago.
+    """
+    if older_than_days is None:
+        older_than_days = settings.OUTBOX_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
+
+
+def metrics():
+    """
+    Relay health: backlog size, age of the oldest pending event (the relay
+    lag), events that exhausted their attempts and the last batch.
+    """
+    now = timezone.now()
+    pending = OutboxEvent.objects.filter(
+        processed_at__isnull=True, attempts__lt=settings.OUTBOX_MAX_ATTEMPTS
+    )
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'pending': pending.count(),
+        'due': pending.filter(available_at__lte=now).count(),
+        'dead': OutboxEvent.objects.filter(
+            processed_at__isnull=True, attempts__gte=settings.OUTBOX_MAX_ATTEMPTS
+        ).count(),
+        'lag_seconds': (now - oldest).total_seconds() if oldest else 0,
+        'last_batch': cache.get(METRICS_KEY),
+    }
@@ -0,0 +1,29 @@
+"""
+Background tasks for the transactional outbox.
+"""
+
+from celery import shared_task
+from django.core.cache import cache
+
+from . import relay
+from .events import KICK_KEY
+
+
+@shared_task
+def relay_outbox():
+    """
+    Dispatch due outbox events. Runs periodically and after commits that
+    published events; batches are claimed with SKIP LOCKED, so overlapping
+    runs are safe.
+    """
+    # Let the next commit kick a fresh run once this one has started.
+    cache.delete(KICK_KEY)
+    return relay.relay()
+
+
+@shared_task
+def purge_outbox():
+    """
+    Delete processed events past their retention.
+    """
+    return relay.purge_processed()
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'outbox'
+
+urlpatterns = [
+    path('metrics/', views.outbox_metrics, name='outbox_metrics'),
+]
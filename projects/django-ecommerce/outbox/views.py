@@ -0,0 +1,18 @@
+"""
+API views for the transactional outbox (admin only).
+"""
+
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from . import relay
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def outbox_metrics(request):
+    """
+    Backlog, relay lag and dead events of the outbox.
+    """
+    return Response(relay.metrics())
@@ -1,20 +1,23 @@
 from django.contrib import admin
+from ecommerce.admin_changelist import LargeTableAdminMixin
 from .models import Payment, Refund, PaymentMethod, WebhookEvent
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
-        'id', 'order', 'payment_method', 'status', 'amount', 'currency',
+        'id', 'order_number', 'payment_method', 'status', 'amount', 'currency',
         'transaction_id', 'last_four_digits', 'brand', 'processed_at', 'created_at'
     )
     list_filter = ('status', 'payment_method', 'currency', 'created_at')
     search_fields = ('order__order_number', 'transaction_id', 'payment_intent_id', 'charge_id')
     readonly_fields = ('created_at', 'updated_at', 'processed_at')
+    raw_id_fields = ('order', 'user')
+    keyset_pagination = True
     
     fieldsets = (
         ('Payment Information', {
-            'fields': ('order', 'payment_method', 'status', 'amount', 'currency')
+            'fields': ('order', 'user', 'payment_method', 'status', 'amount', 'currency')
         }),
         ('Stripe Information', {
             'fields': ('transaction_id', 'payment_intent_id', 'charge_id')
@@ -33,11 +36,16 @@ class PaymentAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('order')
+        # Prefetched rather than joined, so payments of archived orders stay listed.
+        return super().get_queryset(request).prefetch_related('order')
+
+    @admin.display(description='order')
+    def order_number(self, obj):
+        return obj.get_order().order_number
 
 
 @admin.register(Refund)
-class RefundAdmin(admin.ModelAdmin):
+class RefundAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         'id', 'payment', 'refund_id', 'amount', 'reason', 'status',
         'processed_at', 'created_at'
@@ -45,6 +53,7 @@ class RefundAdmin(admin.ModelAdmin):
     list_filter = ('status', 'reason', 'created_at')
     search_fields = ('refund_id', 'payment__order__order_number')
     readonly_fields = ('refund_id', 'created_at', 'updated_at', 'processed_at')
+    raw_id_fields = ('payment',)
     
     fieldsets = (
         ('Refund Information', {
@@ -60,7 +69,9 @@ class RefundAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('payment__order')
+        return super().get_queryset(request).select_related('payment').prefetch_related(
+            'payment__order'
+        )
 
 
 @admin.register(PaymentMethod)
@@ -94,13 +105,14 @@ class PaymentMethodAdmin(admin.ModelAdmin):
 
 
 @admin.register(WebhookEvent)
-class WebhookEventAdmin(admin.ModelAdmin):
+class WebhookEventAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         'id', 'event_id', 'event_type', 'processed', 'created_at'
     )
     list_filter = ('event_type', 'processed', 'created_at')
     search_fields = ('event_id', 'event_type')
     readonly_fields = ('event_id', 'data', 'created_at')
+    keyset_pagination = True
     
     fieldsets = (
         ('Event Information', {
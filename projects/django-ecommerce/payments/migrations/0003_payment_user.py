@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_users(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    Order = apps.get_model("orders", "Order")
+    ArchivedOrder = apps.get_model("orders", "ArchivedOrder")
+    Payment.objects.filter(user__isnull=True).update(
+        user=Coalesce(
+            Subquery(Order.objects.filter(pk=OuterRef("order_id")).values("user_id")[:1]),
+            Subquery(ArchivedOrder.objects.filter(pk=OuterRef("order_id")).values("user_id")[:1]),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0004_order_archive"),
+        ("payments", "0002_payment_order_no_constraint"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="user",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payments",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(backfill_users, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="payment",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payments",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
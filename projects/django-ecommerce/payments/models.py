@@ -2,10 +2,13 @@
 Payment models for the e-commerce platform.
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
+from outbox.events import publish
+
 
 class Payment(models.Model):
     """
@@ -28,11 +31,21 @@ class Payment(models.Model):
         ('partially_refunded', _('Partially Refunded')),
     ]
 
+    # Not enforced in the database: archiving moves the order to
+    # ``orders_archive`` under the same id and keeps its payment here.
     order = models.OneToOneField(
         'orders.Order',
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='payment'
     )
+    # Copied from the order, so payments are listed by owner without
+    # joining ``orders``, which no longer holds archived orders.
+    user = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        related_name='payments'
+    )
     payment_method = models.CharField(
         _('payment method'),
         max_length=20,
@@ -74,7 +87,23 @@ class Payment(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"Payment for Order {self.order.order_number}"
+        return f"Payment for Order {self.get_order().order_number}"
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.order_id is not None:
+            self.user_id = self.get_order().user_id
+        super().save(*args, **kwargs)
+
+    def get_order(self):
+        """
+        Return the order of the payment, from the live or archive tables.
+        """
+        from orders.models import ArchivedOrder, Order
+
+        try:
+            return self.order
+        except Order.DoesNotExist:
+            return ArchivedOrder.objects.get(pk=self.order_id)
 
     @property
     def is_successful(self):
@@ -88,6 +117,30 @@ class Payment(models.Model):
     def is_pending(self):
         return self.status in ['pending', 'processing']
 
+    def mark_completed(self):
+        """
+        Record a successful charge: complete the payment, mark its order
+        paid and publish ``payment.completed``, in one transaction.
+        """
+        from orders.models import Order
+
+        with transaction.atomic():
+            self.status = 'completed'
+            self.processed_at = timezone.now()
+            self.save()
+
+            # Archived orders are closed and keep their payment status.
+            order = Order.objects.filter(pk=self.order_id).first()
+            if order is not None:
+                order.payment_status = 'paid'
+                order.save()
+
+            publish('payment.completed', 'payment', self.pk, {
+                'order_id': self.order_id,
+                'amount': str(self.amount),
+                'currency': self.currency,
+            })
+
 
 class Refund(models.Model):
     """
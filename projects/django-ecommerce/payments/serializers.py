@@ -8,7 +8,7 @@ from orders.serializers import OrderSerializer
 
 
 class PaymentSerializer(serializers.ModelSerializer):
-    order = OrderSerializer(read_only=True)
+    order = serializers.SerializerMethodField()
     is_successful = serializers.BooleanField(read_only=True)
     is_failed = serializers.BooleanField(read_only=True)
     is_pending = serializers.BooleanField(read_only=True)
@@ -23,6 +23,10 @@ class PaymentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
 
+    def get_order(self, obj):
+        # The order may have been archived since the payment.
+        return OrderSerializer(obj.get_order()).data
+
 
 class CreatePaymentSerializer(serializers.Serializer):
     """
@@ -9,7 +9,6 @@ from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
-from django.utils import timezone
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -22,6 +21,7 @@ from .serializers import (
     RefundSerializer, CreateRefundSerializer, PaymentIntentSerializer
 )
 from orders.models import Order
+from ecommerce.idempotency import idempotency_key_for, idempotent
 
 # Configure Stripe
 stripe.api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
@@ -35,7 +35,8 @@ class PaymentListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Payment.objects.filter(order__user=self.request.user).select_related('order')
+        # Archived orders are not in ``orders``: prefetched, not joined.
+        return Payment.objects.filter(user=self.request.user).prefetch_related('order')
 
 
 class PaymentDetailView(generics.RetrieveAPIView):
@@ -46,11 +47,13 @@ class PaymentDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Payment.objects.filter(order__user=self.request.user).select_related('order')
+        # Archived orders are not in ``orders``: prefetched, not joined.
+        return Payment.objects.filter(user=self.request.user).prefetch_related('order')
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def create_payment_intent(request, order_id):
     """
     Create a Stripe Payment Intent for an order.
@@ -90,11 +93,15 @@ def create_payment_intent(request, order_id):
         if serializer.validated_data.get('return_url'):
             intent_data['return_url'] = serializer.validated_data['return_url']
 
-        payment_intent = stripe.PaymentIntent.create(**intent_data)
+        payment_intent = stripe.PaymentIntent.create(
+            idempotency_key=idempotency_key_for(request, 'payment_intent'),
+            **intent_data
+        )
 
         # Create payment record
         payment = Payment.objects.create(
             order=order,
+            user=request.user,
             payment_method='stripe',
             amount=order.total_amount,
             currency=serializer.validated_data['currency'],
@@ -127,7 +134,7 @@ def confirm_payment(request, payment_id):
     Confirm a payment intent.
     """
     try:
-        payment = get_object_or_404(Payment, id=payment_id, order__user=request.user)
+        payment = get_object_or_404(Payment, id=payment_id, user=request.user)
         
         if payment.status != 'pending':
             return Response(
@@ -139,13 +146,7 @@ def confirm_payment(request, payment_id):
         payment_intent = stripe.PaymentIntent.retrieve(payment.payment_intent_id)
         
         if payment_intent.status == 'succeeded':
-            payment.status = 'completed'
-            payment.processed_at = timezone.now()
-            payment.save()
-            
-            # Update order payment status
-            payment.order.payment_status = 'paid'
-            payment.order.save()
+            payment.mark_completed()
             
             return Response({
                 'status': 'success',
@@ -190,11 +191,14 @@ class RefundListView(generics.ListCreateAPIView):
         return RefundSerializer
 
     def get_queryset(self):
-        return Refund.objects.filter(payment__order__user=self.request.user).select_related('payment__order')
+        return Refund.objects.filter(payment__user=self.request.user).select_related(
+            'payment'
+        ).prefetch_related('payment__order')
 
+    @method_decorator(idempotent)
     def create(self, request, *args, **kwargs):
         payment_id = request.data.get('payment_id')
-        payment = get_object_or_404(Payment, id=payment_id, order__user=request.user)
+        payment = get_object_or_404(Payment, id=payment_id, user=request.user)
         
         serializer = CreateRefundSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -205,7 +209,8 @@ class RefundListView(generics.ListCreateAPIView):
                 refund = stripe.Refund.create(
                     payment_intent=payment.payment_intent_id,
                     amount=int(serializer.validated_data['amount'] * 100),
-                    reason=serializer.validated_data['reason']
+                    reason=serializer.validated_data['reason'],
+                    idempotency_key=idempotency_key_for(request, 'refund')
                 )
 
                 # Create refund record
@@ -259,6 +264,7 @@ def payment_methods(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def create_payment_method(request):
     """
     Create a new payment method.
@@ -272,18 +278,21 @@ def create_payment_method(request):
                 'exp_month': request.data.get('exp_month'),
                 'exp_year': request.data.get('exp_year'),
                 'cvc': request.data.get('cvc'),
-            }
+            },
+            idempotency_key=idempotency_key_for(request, 'payment_method')
         )
 
         # Attach to customer
         customer = stripe.Customer.create(
             email=request.user.email,
-            name=f"{request.user.first_name} {request.user.last_name}".strip()
+            name=f"{request.user.first_name} {request.user.last_name}".strip(),
+            idempotency_key=idempotency_key_for(request, 'customer')
         )
 
         stripe.PaymentMethod.attach(
             payment_method.id,
-            customer=customer.id
+            customer=customer.id,
+            idempotency_key=idempotency_key_for(request, 'attach')
         )
 
         # Create payment method record
@@ -348,13 +357,7 @@ def stripe_webhook(request):
         if event['type'] == 'payment_intent.succeeded':
             payment_intent = event['data']['object']
             payment = Payment.objects.get(payment_intent_id=payment_intent['id'])
-            payment.status = 'completed'
-            payment.processed_at = timezone.now()
-            payment.save()
-            
-            # Update order status
-            payment.order.payment_status = 'paid'
-            payment.order.save()
+            payment.mark_completed()
 
         elif event['type'] == 'payment_intent.payment_failed':
             payment_intent = event['data']['object']
@@ -5,8 +5,10 @@ Admin configuration for products app.
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
+from ecommerce.admin_changelist import LargeTableAdminMixin
 from .models import (
-    Category, Brand, Product, ProductImage, ProductVariant, ProductReview
+    Category, Brand, Product, ProductImage, ProductVariant, ProductReview,
+    ProductCoPurchase
 )
 
 
@@ -53,7 +55,7 @@ class BrandAdmin(admin.ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Product admin.
     """
@@ -67,7 +69,8 @@ class ProductAdmin(admin.ModelAdmin):
     )
     search_fields = ('name', 'sku', 'description')
     prepopulated_fields = {'slug': ('name',)}
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('reserved_quantity', 'created_at', 'updated_at')
+    list_select_related = ('category', 'brand')
     inlines = [ProductImageInline, ProductVariantInline]
     
     fieldsets = (
@@ -84,7 +87,10 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('weight', 'dimensions')
         }),
         (_('Inventory'), {
-            'fields': ('stock_quantity', 'low_stock_threshold', 'track_inventory')
+            'fields': (
+                'stock_quantity', 'reserved_quantity', 'low_stock_threshold',
+                'track_inventory'
+            )
         }),
         (_('Settings'), {
             'fields': ('is_active', 'is_featured', 'is_digital', 'requires_shipping')
@@ -96,7 +102,7 @@ class ProductAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProductImage)
-class ProductImageAdmin(admin.ModelAdmin):
+class ProductImageAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Product Image admin.
     """
@@ -104,21 +110,28 @@ class ProductImageAdmin(admin.ModelAdmin):
     list_filter = ('is_primary', 'created_at')
     search_fields = ('product__name', 'alt_text')
     readonly_fields = ('created_at',)
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
 
 
 @admin.register(ProductVariant)
-class ProductVariantAdmin(admin.ModelAdmin):
+class ProductVariantAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Product Variant admin.
     """
-    list_display = ('product', 'name', 'sku', 'price', 'stock_quantity', 'is_active')
+    list_display = (
+        'product', 'name', 'sku', 'price', 'stock_quantity', 'reserved_quantity',
+        'is_active'
+    )
     list_filter = ('is_active', 'product__category', 'created_at')
     search_fields = ('product__name', 'name', 'sku')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('reserved_quantity', 'created_at', 'updated_at')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
 
 
 @admin.register(ProductReview)
-class ProductReviewAdmin(admin.ModelAdmin):
+class ProductReviewAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Product Review admin.
     """
@@ -126,6 +139,8 @@ class ProductReviewAdmin(admin.ModelAdmin):
     list_filter = ('rating', 'is_approved', 'is_verified_purchase', 'created_at')
     search_fields = ('product__name', 'user__email', 'title', 'comment')
     readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('product', 'user')
+    raw_id_fields = ('product', 'user')
     
     fieldsets = (
         (_('Review'), {
@@ -137,4 +152,16 @@ class ProductReviewAdmin(admin.ModelAdmin):
         (_('Timestamps'), {
             'fields': ('created_at', 'updated_at')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ProductCoPurchase)
+class ProductCoPurchaseAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """
+    Product Co-Purchase admin.
+    """
+    list_display = ('product', 'related_product', 'order_count', 'score', 'rank', 'updated_at')
+    list_filter = ('updated_at',)
+    search_fields = ('product__name', 'related_product__name')
+    readonly_fields = ('product', 'related_product', 'order_count', 'score', 'rank', 'updated_at')
+    list_select_related = ('product', 'related_product')
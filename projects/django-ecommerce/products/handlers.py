@@ -0,0 +1,17 @@
+"""
+Outbox handlers for products.
+"""
+
+from outbox.events import handler
+
+from .tasks import invalidate_product_caches
+
+
+@handler('product.updated')
+def drop_updated_product_cache(event):
+    invalidate_product_caches([int(event.aggregate_id)])
+
+
+@handler('stock.changed')
+def drop_restocked_product_caches(event):
+    invalidate_product_caches(event.payload['product_ids'])
@@ -0,0 +1,55 @@
+"""
+Management command to update "customers also bought" recommendations.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from products.models import CoPurchaseRun, ProductCoPurchase
+from products.recommendations import SCORING_METHODS, update_co_purchases
+
+
+class Command(BaseCommand):
+    help = 'Fold orders delivered since the last run into co-purchase recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            help='Number of related products to keep per product',
+        )
+        parser.add_argument(
+            '--scoring',
+            choices=SCORING_METHODS,
+            help='Normalization used to rank related products',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows fetched and written per database round trip',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Discard existing co-purchase data and process all orders',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write('Clearing existing co-purchase data...')
+            ProductCoPurchase.objects.all().delete()
+            CoPurchaseRun.objects.all().delete()
+
+        try:
+            run = update_co_purchases(
+                top_k=options['top_k'],
+                scoring=options['scoring'],
+                batch_size=options['batch_size'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Processed {run.orders_processed} orders delivered before {run.delivered_until}'
+            )
+        )
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CoPurchaseRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_order_id",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="last order ID"
+                    ),
+                ),
+                (
+                    "orders_processed",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="orders processed"
+                    ),
+                ),
+                (
+                    "total_orders",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="total orders"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Co-Purchase Run",
+                "verbose_name_plural": "Co-Purchase Runs",
+                "db_table": "co_purchase_runs",
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductCoPurchase",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "order_count",
+                    models.PositiveIntegerField(default=0, verbose_name="order count"),
+                ),
+                ("score", models.FloatField(default=0, verbose_name="score")),
+                (
+                    "rank",
+                    models.PositiveSmallIntegerField(
+                        blank=True, null=True, verbose_name="rank"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="co_purchases",
+                        to="products.product",
+                    ),
+                ),
+                (
+                    "related_product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Product Co-Purchase",
+                "verbose_name_plural": "Product Co-Purchases",
+                "db_table": "product_co_purchases",
+                "indexes": [
+                    models.Index(
+                        fields=["product", "rank"], name="co_purchase_product_rank_idx"
+                    )
+                ],
+                "unique_together": {("product", "related_product")},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0002_copurchaserun_productcopurchase"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="reserved_quantity",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Stock held by checkouts in progress",
+                verbose_name="reserved quantity",
+            ),
+        ),
+        migrations.AddField(
+            model_name="productvariant",
+            name="reserved_quantity",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Stock held by checkouts in progress",
+                verbose_name="reserved quantity",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:41
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_delivered_until(apps, schema_editor):
+    # Earlier runs read orders by id, so they are taken to have read every
+    # order delivered before they ran.
+    CoPurchaseRun = apps.get_model("products", "CoPurchaseRun")
+    CoPurchaseRun.objects.update(delivered_until=F("created_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0003_product_reserved_quantity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="copurchaserun",
+            name="delivered_until",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="delivered until"
+            ),
+        ),
+        migrations.RunPython(backfill_delivered_until, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="copurchaserun",
+            name="last_order_id",
+        ),
+    ]
@@ -2,12 +2,31 @@
 Product models for the e-commerce platform.
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
 from django.urls import reverse
 
+from outbox.events import publish
+
+# Counters kept by conditional UPDATEs in ``orders.checkout``. Saving an
+# instance never writes back the value it was loaded with.
+STOCK_COUNTER_FIELDS = ['reserved_quantity']
+
+
+def _save_kwargs(instance, kwargs):
+    """
+    Return ``kwargs`` for ``save()`` of an existing ``instance`` that skip
+    ``STOCK_COUNTER_FIELDS`` unless ``update_fields`` is given.
+    """
+    if instance._state.adding or kwargs.get('update_fields') is not None:
+        return kwargs
+    return {**kwargs, 'update_fields': [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in STOCK_COUNTER_FIELDS
+    ]}
+
 
 class Category(models.Model):
     """
@@ -126,6 +145,11 @@ class Product(models.Model):
         help_text=_('L x W x H in cm')
     )
     stock_quantity = models.PositiveIntegerField(_('stock quantity'), default=0)
+    reserved_quantity = models.PositiveIntegerField(
+        _('reserved quantity'),
+        default=0,
+        help_text=_('Stock held by checkouts in progress')
+    )
     low_stock_threshold = models.PositiveIntegerField(_('low stock threshold'), default=10)
     track_inventory = models.BooleanField(_('track inventory'), default=True)
     is_active = models.BooleanField(_('active'), default=True)
@@ -145,9 +169,14 @@ class Product(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
+        """
+        Save the product and publish ``product.updated``.
+        """
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **_save_kwargs(self, kwargs))
+            publish('product.updated', 'product', self.pk, {'slug': self.slug})
 
     def get_absolute_url(self):
         return reverse('products:product_detail', kwargs={'slug': self.slug})
@@ -156,6 +185,10 @@ class Product(models.Model):
     def is_in_stock(self):
         return self.stock_quantity > 0
 
+    @property
+    def available_quantity(self):
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+
     @property
     def is_low_stock(self):
         return self.track_inventory and self.stock_quantity <= self.low_stock_threshold
@@ -214,6 +247,11 @@ class ProductVariant(models.Model):
     sku = models.CharField(_('SKU'), max_length=100, unique=True)
     price = models.DecimalField(_('price'), max_digits=10, decimal_places=2)
     stock_quantity = models.PositiveIntegerField(_('stock quantity'), default=0)
+    reserved_quantity = models.PositiveIntegerField(
+        _('reserved quantity'),
+        default=0,
+        help_text=_('Stock held by checkouts in progress')
+    )
     is_active = models.BooleanField(_('active'), default=True)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
@@ -227,10 +265,17 @@ class ProductVariant(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **_save_kwargs(self, kwargs))
+
     @property
     def is_in_stock(self):
         return self.stock_quantity > 0
 
+    @property
+    def available_quantity(self):
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+
 
 class ProductReview(models.Model):
     """
@@ -274,4 +319,59 @@ class ProductReview(models.Model):
         unique_together = ['product', 'user']
 
     def __str__(self):
-        return f"{self.product.name} - {self.user.email} - {self.rating} stars"
\ No newline at end of file
+        return f"{self.product.name} - {self.user.email} - {self.rating} stars"
+
+
+class ProductCoPurchase(models.Model):
+    """
+    Co-purchase counts between two products ("customers also bought").
+
+    Rows where ``product`` and ``related_product`` are the same hold the number
+    of orders containing that product, i.e. the diagonal of the co-occurrence
+    matrix. ``rank`` is only set for the top-K related products of ``product``.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='co_purchases'
+    )
+    related_product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    order_count = models.PositiveIntegerField(_('order count'), default=0)
+    score = models.FloatField(_('score'), default=0)
+    rank = models.PositiveSmallIntegerField(_('rank'), null=True, blank=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Product Co-Purchase')
+        verbose_name_plural = _('Product Co-Purchases')
+        db_table = 'product_co_purchases'
+        unique_together = ['product', 'related_product']
+        indexes = [
+            models.Index(fields=['product', 'rank'], name='co_purchase_product_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_product_id} ({self.order_count})"
+
+
+class CoPurchaseRun(models.Model):
+    """
+    Watermark of the co-purchase job, one row per run.
+    """
+    delivered_until = models.DateTimeField(_('delivered until'), null=True, blank=True)
+    orders_processed = models.PositiveIntegerField(_('orders processed'), default=0)
+    total_orders = models.PositiveBigIntegerField(_('total orders'), default=0)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Co-Purchase Run')
+        verbose_name_plural = _('Co-Purchase Runs')
+        db_table = 'co_purchase_runs'
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"Co-purchase run up to {self.delivered_until}"
@@ -0,0 +1,279 @@
+"""
+Co-purchase recommendations for the e-commerce platform.
+
+Orders are folded into a sparse product co-occurrence matrix stored in
+``ProductCoPurchase``. Each run only reads orders delivered since the
+previous run and re-ranks the products whose counts changed.
+
+Only delivered orders count: a pending order may still be cancelled, and
+a folded order is never subtracted again. The run's cursor is the
+``delivered_at`` it read up to, not an order id, since orders are
+delivered out of id order. It lags ``RECOMMENDATIONS_WATERMARK_LAG``
+behind the run, so a delivery committed after it started is still read by
+the next run. An order refunded after it was folded stays counted.
+"""
+
+import itertools
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CoPurchaseRun, Product, ProductCoPurchase
+
+logger = logging.getLogger(__name__)
+
+# Only orders in these states count as a purchase.
+FOLDED_ORDER_STATUSES = ['delivered']
+
+SCORING_METHODS = ('lift', 'cosine')
+
+
+def _order_product_ids(since, until, batch_size):
+    """
+    Stream the distinct product ids of each order delivered in [since, until).
+    """
+    from orders.models import OrderItem
+
+    rows = OrderItem.objects.filter(
+        order__status__in=FOLDED_ORDER_STATUSES,
+        order__delivered_at__lt=until
+    )
+    if since is not None:
+        rows = rows.filter(order__delivered_at__gte=since)
+    rows = rows.order_by('order_id').values_list('order_id', 'product_id').iterator(chunk_size=batch_size)
+
+    for order_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        yield np.unique(np.fromiter((product_id for _, product_id in group), dtype=np.int64))
+
+
+def _compact(rows, cols, counts):
+    """
+    Sum duplicate (row, col) entries of a COO matrix.
+    """
+    pairs, inverse = np.unique(np.stack([rows, cols], axis=1), axis=0, return_inverse=True)
+    return pairs[:, 0], pairs[:, 1], np.bincount(inverse.ravel(), weights=counts).astype(np.int64)
+
+
+def build_co_occurrence(baskets, compact_every=1000):
+    """
+    Build a sparse co-occurrence matrix from an iterable of product id arrays.
+
+    Returns ``(rows, cols, counts, orders)`` where each (rows[i], cols[i]) pair
+    of product ids was bought together in counts[i] orders. The diagonal holds
+    the number of orders containing each product. Pending pairs are compacted
+    every ``compact_every`` baskets so memory tracks the number of distinct
+    pairs rather than the number of orders.
+    """
+    rows = cols = counts = np.empty(0, dtype=np.int64)
+    row_chunks, col_chunks = [], []
+    orders = 0
+    for basket in baskets:
+        orders += 1
+        basket_rows, basket_cols = np.meshgrid(basket, basket, indexing='ij')
+        row_chunks.append(basket_rows.ravel())
+        col_chunks.append(basket_cols.ravel())
+        if len(row_chunks) >= compact_every:
+            rows, cols, counts = _flush_chunks(rows, cols, counts, row_chunks, col_chunks)
+
+    if row_chunks:
+        rows, cols, counts = _flush_chunks(rows, cols, counts, row_chunks, col_chunks)
+    return rows, cols, counts, orders
+
+
+def _flush_chunks(rows, cols, counts, row_chunks, col_chunks):
+    """
+    Fold pending basket pairs into the compacted matrix.
+    """
+    new_rows = np.concatenate(row_chunks)
+    new_cols = np.concatenate(col_chunks)
+    row_chunks.clear()
+    col_chunks.clear()
+    return _compact(
+        np.concatenate([rows, new_rows]),
+        np.concatenate([cols, new_cols]),
+        np.concatenate([counts, np.ones(len(new_rows), dtype=np.int64)]),
+    )
+
+
+def score_pairs(pair_counts, row_totals, col_totals, total_orders, scoring='lift'):
+    """
+    Normalize co-occurrence counts by lift or cosine similarity.
+    """
+    pair_counts = pair_counts.astype(np.float64)
+    expected = row_totals.astype(np.float64) * col_totals.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if scoring == 'cosine':
+            scores = pair_counts / np.sqrt(expected)
+        else:
+            scores = pair_counts * total_orders / expected
+    return np.nan_to_num(scores, nan=0.0, posinf=0.0)
+
+
+def rank_pairs(rows, scores, counts, top_k):
+    """
+    Rank related products within each row, best first.
+
+    Returns an array of 1-based ranks with 0 for pairs outside the top-K.
+    """
+    order = np.lexsort((-counts, -scores, rows))
+    sorted_rows = rows[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_rows)) + 1]
+    group_sizes = np.diff(np.r_[starts, len(sorted_rows)])
+    positions = np.arange(len(sorted_rows)) - np.repeat(starts, group_sizes)
+
+    ranks = np.zeros(len(rows), dtype=np.int64)
+    ranks[order] = np.where(positions < top_k, positions + 1, 0)
+    return ranks
+
+
+def _merge_counts(rows, cols, counts, batch_size):
+    """
+    Add new co-occurrence counts to the stored matrix.
+    """
+    touched = np.unique(rows).tolist()
+    delta = {
+        (int(row), int(col)): int(count)
+        for row, col, count in zip(rows, cols, counts)
+    }
+    existing = ProductCoPurchase.objects.filter(
+        product_id__in=touched
+    ).values_list('product_id', 'related_product_id', 'order_count')
+    for product_id, related_id, order_count in existing.iterator(chunk_size=batch_size):
+        key = (product_id, related_id)
+        if key in delta:
+            delta[key] += order_count
+
+    ProductCoPurchase.objects.bulk_create(
+        [
+            ProductCoPurchase(product_id=row, related_product_id=col, order_count=count)
+            for (row, col), count in delta.items()
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['product', 'related_product'],
+        update_fields=['order_count'],
+    )
+    return touched
+
+
+def _rerank(product_ids, total_orders, top_k, scoring, batch_size):
+    """
+    Recompute scores and top-K ranks for every row of the given products.
+    """
+    pairs = list(
+        ProductCoPurchase.objects.filter(product_id__in=product_ids).values_list(
+            'id', 'product_id', 'related_product_id', 'order_count'
+        ).iterator(chunk_size=batch_size)
+    )
+    if not pairs:
+        return 0
+
+    ids, rows, cols, counts = (np.array(column, dtype=np.int64) for column in zip(*pairs))
+    diagonal = dict(
+        ProductCoPurchase.objects.filter(
+            product_id__in=np.unique(cols).tolist(),
+            related_product_id=F('product_id')
+        ).values_list('product_id', 'order_count')
+    )
+    totals = np.vectorize(lambda product_id: diagonal.get(product_id, 0), otypes=[np.int64])
+    off_diagonal = rows != cols
+
+    scores = np.zeros(len(rows), dtype=np.float64)
+    ranks = np.zeros(len(rows), dtype=np.int64)
+    if off_diagonal.any():
+        scores[off_diagonal] = score_pairs(
+            counts[off_diagonal], totals(rows[off_diagonal]), totals(cols[off_diagonal]),
+            total_orders, scoring
+        )
+        ranks[off_diagonal] = rank_pairs(
+            rows[off_diagonal], scores[off_diagonal], counts[off_diagonal], top_k
+        )
+
+    ProductCoPurchase.objects.bulk_update(
+        [
+            ProductCoPurchase(id=pk, score=float(score), rank=int(rank) or None)
+            for pk, score, rank in zip(ids, scores, ranks)
+        ],
+        ['score', 'rank'],
+        batch_size=batch_size,
+    )
+    return len(pairs)
+
+
+def update_co_purchases(top_k=None, scoring=None, batch_size=2000):
+    """
+    Fold orders delivered since the last run into the co-purchase matrix.
+
+    Returns the ``CoPurchaseRun`` recorded for this run.
+    """
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    scoring = scoring or settings.RECOMMENDATIONS_SCORING
+    if scoring not in SCORING_METHODS:
+        raise ValueError(f"Unknown scoring method: {scoring}")
+
+    last_run = CoPurchaseRun.objects.first()
+    since = last_run.delivered_until if last_run else None
+    total_orders = last_run.total_orders if last_run else 0
+    until = timezone.now() - timedelta(seconds=settings.RECOMMENDATIONS_WATERMARK_LAG)
+    if since is not None and until < since:
+        until = since
+
+    rows, cols, counts, orders = build_co_occurrence(
+        _order_product_ids(since, until, batch_size)
+    )
+    total_orders += orders
+
+    with transaction.atomic():
+        if orders:
+            touched = _merge_counts(rows, cols, counts, batch_size)
+            # A changed order count for a product shifts the ranking of every
+            # product it was bought with, so re-rank its neighbours as well.
+            dirty = set(touched)
+            dirty.update(
+                ProductCoPurchase.objects.filter(
+                    product_id__in=touched
+                ).values_list('related_product_id', flat=True)
+            )
+            _rerank(sorted(dirty), total_orders, top_k, scoring, batch_size)
+
+        run = CoPurchaseRun.objects.create(
+            delivered_until=until,
+            orders_processed=orders,
+            total_orders=total_orders,
+        )
+
+    logger.info(
+        "Co-purchase run processed %s orders delivered before %s", orders, run.delivered_until
+    )
+    return run
+
+
+def also_bought(product_ids, limit=None, exclude_ids=()):
+    """
+    Return active products most often bought together with ``product_ids``.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return []
+
+    limit = limit or settings.RECOMMENDATIONS_TOP_K
+    scores = {}
+    related = ProductCoPurchase.objects.filter(
+        product_id__in=product_ids,
+        rank__isnull=False
+    ).exclude(
+        related_product_id__in=product_ids | set(exclude_ids)
+    ).values_list('related_product_id', 'score')
+    for related_id, score in related:
+        scores[related_id] = scores.get(related_id, 0) + score
+
+    ranked_ids = sorted(scores, key=scores.get, reverse=True)
+    products = Product.objects.filter(
+        id__in=ranked_ids, is_active=True
+    ).select_related('brand', 'category').prefetch_related('images').in_bulk()
+    return [products[pk] for pk in ranked_ids if pk in products][:limit]
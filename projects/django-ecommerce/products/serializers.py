@@ -7,6 +7,7 @@ from django.db.models import Avg, Count
 from .models import (
     Brand, Category, Product, ProductImage, ProductVariant, ProductReview
 )
+from .recommendations import also_bought
 
 
 class BrandSerializer(serializers.ModelSerializer):
@@ -71,13 +72,48 @@ class ProductVariantSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductVariant
         fields = (
-            'id', 'product', 'sku', 'name', 'price', 'compare_price',
-            'cost_price', 'stock_quantity', 'is_active', 'attributes',
-            'created_at', 'updated_at'
+            'id', 'product', 'sku', 'name', 'price', 'stock_quantity',
+            'is_active', 'created_at', 'updated_at'
         )
         read_only_fields = ('id', 'created_at', 'updated_at')
 
 
+class ProductSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact product snapshot for carts and recommendations.
+
+    Only reads columns of the product row itself plus its primary image, so
+    nesting it does not add queries when images are prefetched.
+    """
+    primary_image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ('id', 'name', 'slug', 'sku', 'price', 'primary_image')
+        read_only_fields = fields
+
+    def get_primary_image(self, obj):
+        if hasattr(obj, 'primary_images'):
+            images = obj.primary_images
+        else:
+            images = [image for image in obj.images.all() if image.is_primary]
+        if not images:
+            return None
+        url = images[0].image.url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class VariantSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact variant snapshot for carts.
+    """
+    class Meta:
+        model = ProductVariant
+        fields = ('id', 'name', 'sku', 'price')
+        read_only_fields = fields
+
+
 class ProductReviewSerializer(serializers.ModelSerializer):
     """
     Serializer for ProductReview model.
@@ -166,16 +202,17 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
     related_products = serializers.SerializerMethodField()
+    also_bought = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = (
             'id', 'name', 'slug', 'description', 'short_description',
             'brand', 'category', 'images', 'variants', 'reviews',
-            'price', 'compare_price', 'cost_price', 'sku', 'barcode',
+            'price', 'compare_price', 'cost_price', 'sku',
             'weight', 'dimensions', 'average_rating', 'review_count',
-            'related_products', 'is_featured', 'is_active', 'meta_title',
-            'meta_description', 'created_at', 'updated_at'
+            'related_products', 'also_bought', 'is_featured', 'is_active',
+            'created_at', 'updated_at'
         )
         read_only_fields = ('id', 'slug', 'created_at', 'updated_at')
 
@@ -194,6 +231,9 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         ).exclude(id=obj.id)[:4]
         return ProductListSerializer(related, many=True).data
 
+    def get_also_bought(self, obj):
+        return ProductListSerializer(also_bought([obj.id]), many=True).data
+
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     """
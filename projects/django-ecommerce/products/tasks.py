@@ -0,0 +1,77 @@
+"""
+Background tasks for products.
+"""
+
+import logging
+
+from celery import shared_task
+from django.core.cache import cache
+from django.core.mail import mail_admins
+from django.db.models import F
+
+from . import recommendations
+from .models import Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+CO_PURCHASES_LOCK = 'products:co-purchases:lock'
+CO_PURCHASES_LOCK_TIMEOUT = 60 * 10
+
+
+def product_detail_cache_key(slug):
+    return f'products:detail:{slug}'
+
+
+@shared_task
+def invalidate_product_caches(product_ids):
+    """
+    Drop cached product pages after their stock or details changed.
+    """
+    slugs = Product.objects.filter(id__in=product_ids).values_list('slug', flat=True)
+    cache.delete_many([product_detail_cache_key(slug) for slug in slugs])
+
+
+@shared_task
+def check_low_stock(product_ids):
+    """
+    Warn the admins about products and variants at or below their
+    low-stock threshold.
+    """
+    products = Product.objects.filter(
+        id__in=product_ids,
+        track_inventory=True,
+        stock_quantity__lte=F('low_stock_threshold')
+    ).values_list('name', 'sku', 'stock_quantity')
+    variants = ProductVariant.objects.filter(
+        product_id__in=product_ids,
+        product__track_inventory=True,
+        stock_quantity__lte=F('product__low_stock_threshold')
+    ).values_list('product__name', 'name', 'sku', 'stock_quantity')
+
+    lines = [f"{name} ({sku}): {stock} left" for name, sku, stock in products]
+    lines += [
+        f"{product_name} - {name} ({sku}): {stock} left"
+        for product_name, name, sku, stock in variants
+    ]
+    if lines:
+        logger.warning("Low stock: %s", '; '.join(lines))
+        mail_admins('Low stock', '\n'.join(lines))
+    return len(lines)
+
+
+@shared_task
+def update_co_purchases():
+    """
+    Fold the orders closed since the last run into the co-purchase
+    recommendations.
+
+    Scheduled by beat rather than per order: runs are incremental from a
+    watermark, so one run covers every order since the last, and a run
+    already in progress makes this a no-op.
+    """
+    if not cache.add(CO_PURCHASES_LOCK, 1, timeout=CO_PURCHASES_LOCK_TIMEOUT):
+        return None
+    try:
+        return recommendations.update_co_purchases().orders_processed
+    finally:
+        cache.delete(CO_PURCHASES_LOCK)
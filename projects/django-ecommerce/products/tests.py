@@ -1,3 +1,89 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from orders.models import Order, OrderItem
+from outbox.relay import relay
+
+from .models import Brand, Category, Product
+from .recommendations import update_co_purchases
+from .tasks import product_detail_cache_key
+
+
+class ProductDetailTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='buyer@example.com', username='buyer', password='secret',
+            first_name='Buyer', last_name='One'
+        )
+        category = Category.objects.create(name='Tools')
+        brand = Brand.objects.create(name='Acme')
+        self.products = [
+            Product.objects.create(
+                name=f'Product {i}', description='Description', sku=f'SKU-{i}',
+                price=Decimal('10.00'), category=category, brand=brand, stock_quantity=10
+            )
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def deliver(self, products):
+        order = Order.objects.create(
+            user=self.user, status='delivered', delivered_at=timezone.now() - timedelta(hours=1),
+            subtotal=0, total_amount=0,
+            billing_first_name='Buyer', billing_last_name='One', billing_address_line_1='1 Main St',
+            billing_city='Springfield', billing_state='IL', billing_postal_code='62701',
+            billing_country='US',
+            shipping_first_name='Buyer', shipping_last_name='One', shipping_address_line_1='1 Main St',
+            shipping_city='Springfield', shipping_state='IL', shipping_postal_code='62701',
+            shipping_country='US'
+        )
+        for product in products:
+            OrderItem.objects.create(
+                order=order, product=product, quantity=1,
+                unit_price=product.price, total_price=product.price
+            )
+        return order
+
+    def test_detail_lists_products_bought_together(self):
+        first, second, third = self.products
+        self.deliver([first, second])
+        self.deliver([first, second, third])
+        self.deliver([third])
+        update_co_purchases()
+
+        response = self.client.get(f'/api/products/{first.slug}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product['id'] for product in response.data['also_bought']],
+            [second.id, third.id]
+        )
+
+    def test_detail_is_cached_until_the_product_changes(self):
+        product = self.products[0]
+        url = f'/api/products/{product.slug}/'
+
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, first.data)
+
+        product.price = Decimal('12.50')
+        product.save()
+        relay()
+        self.assertIsNone(cache.get(product_detail_cache_key(product.slug)))
 
-# Create your tests here.
+        response = self.client.get(url)
+        self.assertEqual(response.data['price'], '12.50')
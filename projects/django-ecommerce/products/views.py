@@ -7,6 +7,8 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q, Avg, Count
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404
@@ -18,6 +20,7 @@ from .serializers import (
     ProductImageSerializer, ProductVariantSerializer, ProductReviewSerializer,
     ProductSearchSerializer
 )
+from .tasks import product_detail_cache_key
 
 
 class BrandListView(generics.ListCreateAPIView):
@@ -93,6 +96,26 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
 
+    def retrieve(self, request, *args, **kwargs):
+        cache_key = product_detail_cache_key(kwargs[self.lookup_field])
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().retrieve(request, *args, **kwargs).data
+            cache.set(cache_key, data, settings.PRODUCT_CACHE_TIMEOUT)
+        return Response(data)
+
+    def perform_update(self, serializer):
+        old_slug = serializer.instance.slug
+        super().perform_update(serializer)
+        cache.delete_many([
+            product_detail_cache_key(old_slug),
+            product_detail_cache_key(serializer.instance.slug)
+        ])
+
+    def perform_destroy(self, instance):
+        cache.delete(product_detail_cache_key(instance.slug))
+        super().perform_destroy(instance)
+
 
 class ProductSearchView(APIView):
     """
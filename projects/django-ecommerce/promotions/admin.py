@@ -0,0 +1,37 @@
+from django.contrib import admin
+from .models import Promotion
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = (
+        'name', 'promotion_type', 'value', 'product', 'category', 'brand',
+        'is_exclusive', 'is_active', 'valid_from', 'valid_until'
+    )
+    list_filter = ('promotion_type', 'is_exclusive', 'is_active', 'valid_from', 'valid_until')
+    search_fields = ('name', 'description')
+    list_select_related = ('product', 'category', 'brand')
+    raw_id_fields = ('product',)
+    readonly_fields = ('created_at', 'updated_at')
+
+    fieldsets = (
+        ('Promotion', {
+            'fields': ('name', 'description', 'promotion_type', 'value', 'is_exclusive')
+        }),
+        ('Covers', {
+            'fields': ('product', 'category', 'brand', 'minimum_amount')
+        }),
+        ('Buy X Get Y', {
+            'fields': ('buy_quantity', 'get_quantity')
+        }),
+        ('Tiers', {
+            'fields': ('tiers',)
+        }),
+        ('Validity', {
+            'fields': ('is_active', 'valid_from', 'valid_until')
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
@@ -0,0 +1,307 @@
+"""
+Promotion engine.
+
+Active promotions are compiled into arrays, one entry per promotion, with
+an index of the promotions covering each product, category and brand. The
+compiled promotions are cached until a promotion is saved or the next one
+starts or ends. Their ``generation`` changes whenever the active promotions
+do, so responses showing discounts can be revalidated against it.
+
+``evaluate`` looks the candidates for a cart up in the index and computes
+the discount of every candidate on every line in one pass of array
+operations. Promotions that are not exclusive all apply. Among exclusive
+ones it picks the combination with the largest discount in which no two
+discount the same line: every combination is tried for up to
+``PROMOTIONS_EXACT_LIMIT`` candidates, larger sets are filled greedily.
+Lines are never discounted below zero.
+"""
+
+import hashlib
+import math
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Promotion
+
+COMPILED_CACHE_KEY = 'promotions:compiled:2'
+
+PERCENTAGE, FIXED, BOGO, TIERED = range(4)
+TYPE_CODES = {'percentage': PERCENTAGE, 'fixed': FIXED, 'bogo': BOGO, 'tiered': TIERED}
+
+EVERYWHERE, PRODUCT, CATEGORY, BRAND = range(4)
+
+CENT = Decimal('0.01')
+
+# A cart line; ``category_id`` and ``brand_id`` may be ``None``.
+Line = namedtuple('Line', ['product_id', 'category_id', 'brand_id', 'quantity', 'unit_price'])
+
+# ``promotions`` lists the applied promotions as ``{'id', 'name', 'discount'}``.
+Evaluation = namedtuple('Evaluation', ['discount', 'line_discounts', 'promotions'])
+
+
+def _cents(amount):
+    return float(amount) * 100
+
+
+def _amount(cents):
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+
+class CompiledPromotions:
+    """
+    Promotions as arrays by position, indexed by what they cover.
+
+    ``changes_at`` is when the next promotion starts or ends. ``generation``
+    identifies the active promotions and their versions.
+    """
+
+    def __init__(self, promotions, changes_at=None):
+        self.changes_at = changes_at
+        self.generation = hashlib.blake2b(
+            repr([(promotion.pk, promotion.updated_at) for promotion in promotions]).encode(),
+            digest_size=8
+        ).hexdigest()
+        self.ids = [promotion.pk for promotion in promotions]
+        self.names = [promotion.name for promotion in promotions]
+        self.types = np.array(
+            [TYPE_CODES[promotion.promotion_type] for promotion in promotions], dtype=np.int8
+        )
+        self.values = np.array([float(promotion.value) for promotion in promotions])
+        self.minimums = np.array([_cents(promotion.minimum_amount or 0) for promotion in promotions])
+        self.buy_quantities = np.array(
+            [promotion.buy_quantity for promotion in promotions], dtype=np.int64
+        )
+        self.get_quantities = np.array(
+            [promotion.get_quantity for promotion in promotions], dtype=np.int64
+        )
+        self.exclusive = np.array([promotion.is_exclusive for promotion in promotions], dtype=bool)
+
+        tiers = [
+            sorted((_cents(tier['minimum_amount']), float(tier['percentage'])) for tier in promotion.tiers)
+            if promotion.promotion_type == 'tiered' else []
+            for promotion in promotions
+        ]
+        width = max([len(promotion_tiers) for promotion_tiers in tiers] + [1])
+        self.tier_minimums = np.full((len(promotions), width), np.inf)
+        self.tier_percentages = np.zeros((len(promotions), width))
+        for position, promotion_tiers in enumerate(tiers):
+            for column, (minimum, percentage) in enumerate(promotion_tiers):
+                self.tier_minimums[position, column] = minimum
+                self.tier_percentages[position, column] = percentage
+
+        self.scopes = np.zeros(len(promotions), dtype=np.int8)
+        self.scope_ids = np.zeros(len(promotions), dtype=np.int64)
+        self.everywhere = []
+        self.index = {PRODUCT: defaultdict(list), CATEGORY: defaultdict(list), BRAND: defaultdict(list)}
+        for position, promotion in enumerate(promotions):
+            for scope, scope_id in (
+                (PRODUCT, promotion.product_id),
+                (CATEGORY, promotion.category_id),
+                (BRAND, promotion.brand_id),
+            ):
+                if scope_id:
+                    self.scopes[position] = scope
+                    self.scope_ids[position] = scope_id
+                    self.index[scope][scope_id].append(position)
+                    break
+            else:
+                self.everywhere.append(position)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def candidates(self, product_ids, category_ids, brand_ids):
+        """
+        Return the positions of the promotions covering any of the ids.
+        """
+        positions = set(self.everywhere)
+        for scope, ids in ((PRODUCT, product_ids), (CATEGORY, category_ids), (BRAND, brand_ids)):
+            index = self.index[scope]
+            for scope_id in set(ids):
+                positions.update(index.get(scope_id, ()))
+        return np.array(sorted(positions), dtype=np.intp)
+
+
+def compile_promotions(now=None):
+    """
+    Compile the promotions active at ``now``.
+    """
+    now = now or timezone.now()
+    active = []
+    changes_at = None
+    for promotion in Promotion.objects.filter(is_active=True, valid_until__gt=now).order_by('pk'):
+        if promotion.valid_from <= now:
+            active.append(promotion)
+            boundary = promotion.valid_until
+        else:
+            boundary = promotion.valid_from
+        changes_at = boundary if changes_at is None else min(changes_at, boundary)
+    return CompiledPromotions(active, changes_at)
+
+
+def get_compiled():
+    """
+    Return the compiled active promotions, from the cache when possible.
+    """
+    compiled = cache.get(COMPILED_CACHE_KEY)
+    if compiled is None:
+        now = timezone.now()
+        compiled = compile_promotions(now)
+        timeout = settings.PROMOTIONS_CACHE_TIMEOUT
+        if compiled.changes_at is not None:
+            timeout = max(1, min(timeout, math.ceil((compiled.changes_at - now).total_seconds())))
+        cache.set(COMPILED_CACHE_KEY, compiled, timeout)
+    return compiled
+
+
+def invalidate():
+    cache.delete(COMPILED_CACHE_KEY)
+
+
+def invalidate_on_commit():
+    """
+    Drop the compiled promotions once the current transaction commits.
+    """
+    transaction.on_commit(invalidate)
+
+
+def _choose_exclusive(support, amounts):
+    """
+    Pick the exclusive promotions to apply: the combination with the
+    largest total ``amounts`` in which no two share a line of ``support``.
+    """
+    count = len(amounts)
+    if count <= settings.PROMOTIONS_EXACT_LIMIT:
+        subsets = (np.arange(1 << count)[:, None] >> np.arange(count)) & 1
+        disjoint = (subsets @ support.astype(np.int64) <= 1).all(axis=1)
+        totals = np.where(disjoint, subsets @ amounts, -1)
+        return subsets[totals.argmax()].astype(bool)
+
+    chosen = np.zeros(count, dtype=bool)
+    used = np.zeros(support.shape[1], dtype=bool)
+    for position in np.argsort(-amounts, kind='stable'):
+        if not (support[position] & used).any():
+            chosen[position] = True
+            used |= support[position]
+    return chosen
+
+
+def evaluate(lines, compiled=None):
+    """
+    Apply the active promotions to ``lines`` (``Line`` tuples).
+
+    Returns an ``Evaluation`` with the total discount, the discount of each
+    line in order, and the promotions applied, largest discount first.
+    """
+    lines = list(lines)
+    no_discount = Evaluation(Decimal('0.00'), [Decimal('0.00')] * len(lines), [])
+    if not lines:
+        return no_discount
+    compiled = get_compiled() if compiled is None else compiled
+
+    product_ids = np.array([line.product_id for line in lines], dtype=np.int64)
+    category_ids = np.array([line.category_id or 0 for line in lines], dtype=np.int64)
+    brand_ids = np.array([line.brand_id or 0 for line in lines], dtype=np.int64)
+    positions = compiled.candidates(product_ids.tolist(), category_ids.tolist(), brand_ids.tolist())
+    if not positions.size:
+        return no_discount
+
+    quantities = np.array([line.quantity for line in lines], dtype=np.int64)
+    prices = np.array([_cents(line.unit_price) for line in lines])
+    totals = quantities * prices
+
+    # Which candidate covers which line, and the total of the lines covered.
+    scopes = compiled.scopes[positions][:, None]
+    scope_ids = compiled.scope_ids[positions][:, None]
+    covered = (
+        (scopes == EVERYWHERE) |
+        ((scopes == PRODUCT) & (scope_ids == product_ids)) |
+        ((scopes == CATEGORY) & (scope_ids == category_ids)) |
+        ((scopes == BRAND) & (scope_ids == brand_ids))
+    )
+    covered_totals = covered * totals
+    subtotals = covered_totals.sum(axis=1)
+
+    # The discount of every candidate on every line, for each type.
+    types = compiled.types[positions][:, None]
+    values = compiled.values[positions]
+    percentage = covered_totals * values[:, None] / 100
+    fixed_shares = np.divide(
+        np.minimum(values * 100, subtotals), subtotals,
+        out=np.zeros_like(subtotals), where=subtotals > 0
+    )
+    fixed = covered_totals * fixed_shares[:, None]
+    buy_quantities = compiled.buy_quantities[positions]
+    get_quantities = compiled.get_quantities[positions]
+    free_units = (
+        quantities // np.maximum(buy_quantities + get_quantities, 1)[:, None]
+    ) * get_quantities[:, None]
+    bogo = covered * free_units * prices * values[:, None] / 100
+    tier_percentages = np.where(
+        subtotals[:, None] >= compiled.tier_minimums[positions],
+        compiled.tier_percentages[positions],
+        0
+    ).max(axis=1)
+    tiered = covered_totals * tier_percentages[:, None] / 100
+    discounts = np.select(
+        [types == PERCENTAGE, types == FIXED, types == BOGO], [percentage, fixed, bogo], tiered
+    )
+    qualifies = (subtotals > 0) & (subtotals >= compiled.minimums[positions])
+    discounts = np.minimum(discounts * qualifies[:, None], totals)
+    amounts = discounts.sum(axis=1)
+
+    # Stack the non-exclusive promotions on the best exclusive combination.
+    chosen = amounts > 0
+    exclusive = np.flatnonzero(chosen & compiled.exclusive[positions])
+    if exclusive.size:
+        chosen[exclusive] = _choose_exclusive(discounts[exclusive] > 0, amounts[exclusive])
+    applied = np.flatnonzero(chosen)
+    if not applied.size:
+        return no_discount
+
+    stacked = discounts[applied].sum(axis=0)
+    line_discounts = np.round(np.minimum(stacked, totals))
+    scale = np.divide(line_discounts, stacked, out=np.zeros_like(stacked), where=stacked > 0)
+    # Split the rounded total between the promotions by largest remainder,
+    # so their amounts add up to it.
+    shares = (discounts[applied] * scale).sum(axis=1)
+    applied_amounts = np.floor(shares)
+    short = int(round(line_discounts.sum() - applied_amounts.sum()))
+    applied_amounts[np.argsort(applied_amounts - shares, kind='stable')[:short]] += 1
+
+    promotions = sorted(
+        (
+            {
+                'id': compiled.ids[positions[position]],
+                'name': compiled.names[positions[position]],
+                'discount': _amount(amount),
+            }
+            for position, amount in zip(applied, applied_amounts)
+        ),
+        key=lambda promotion: -promotion['discount']
+    )
+    return Evaluation(
+        _amount(line_discounts.sum()),
+        [_amount(cents) for cents in line_discounts],
+        promotions,
+    )
+
+
+def evaluate_items(items, price='unit_price'):
+    """
+    Apply the active promotions to cart items loaded with their products,
+    priced by their ``price`` attribute.
+    """
+    return evaluate(
+        Line(
+            item.product_id, item.product.category_id, item.product.brand_id,
+            item.quantity, getattr(item, price)
+        )
+        for item in items
+    )
@@ -0,0 +1,140 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:05
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("products", "0003_product_reserved_quantity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Promotion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200, verbose_name="name")),
+                (
+                    "description",
+                    models.TextField(blank=True, verbose_name="description"),
+                ),
+                (
+                    "promotion_type",
+                    models.CharField(
+                        choices=[
+                            ("percentage", "Percentage"),
+                            ("fixed", "Fixed Amount"),
+                            ("bogo", "Buy X Get Y"),
+                            ("tiered", "Tiered"),
+                        ],
+                        default="percentage",
+                        max_length=20,
+                        verbose_name="promotion type",
+                    ),
+                ),
+                (
+                    "value",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0"),
+                        max_digits=10,
+                        validators=[
+                            django.core.validators.MinValueValidator(Decimal("0"))
+                        ],
+                        verbose_name="value",
+                    ),
+                ),
+                (
+                    "minimum_amount",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=10,
+                        null=True,
+                        verbose_name="minimum amount",
+                    ),
+                ),
+                (
+                    "buy_quantity",
+                    models.PositiveIntegerField(default=1, verbose_name="buy quantity"),
+                ),
+                (
+                    "get_quantity",
+                    models.PositiveIntegerField(default=1, verbose_name="get quantity"),
+                ),
+                (
+                    "tiers",
+                    models.JSONField(blank=True, default=list, verbose_name="tiers"),
+                ),
+                (
+                    "is_exclusive",
+                    models.BooleanField(default=True, verbose_name="exclusive"),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="active")),
+                ("valid_from", models.DateTimeField(verbose_name="valid from")),
+                ("valid_until", models.DateTimeField(verbose_name="valid until")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="promotions",
+                        to="products.brand",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="promotions",
+                        to="products.category",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="promotions",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Promotion",
+                "verbose_name_plural": "Promotions",
+                "db_table": "promotions",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["is_active", "valid_until"], name="promotion_active_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,138 @@
+"""
+Promotion models for the e-commerce platform.
+"""
+
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class Promotion(models.Model):
+    """
+    Automatic discount applied to the cart lines it covers.
+
+    A promotion covers the lines of one product, category or brand, or every
+    line if none is set, and applies once the covered lines add up to
+    ``minimum_amount``:
+
+    * ``percentage`` takes ``value`` percent off the covered lines;
+    * ``fixed`` takes ``value`` off the covered lines as a whole;
+    * ``bogo`` takes ``value`` percent off ``get_quantity`` units of a line
+      for every ``buy_quantity`` units bought (100 makes them free);
+    * ``tiered`` takes the percentage of the highest tier whose
+      ``minimum_amount`` the covered lines reach, from ``tiers``, a list of
+      ``{"minimum_amount": ..., "percentage": ...}``.
+
+    Exclusive promotions never share a line with each other; the others
+    stack. See ``promotions.engine``.
+    """
+    PROMOTION_TYPES = [
+        ('percentage', _('Percentage')),
+        ('fixed', _('Fixed Amount')),
+        ('bogo', _('Buy X Get Y')),
+        ('tiered', _('Tiered')),
+    ]
+
+    name = models.CharField(_('name'), max_length=200)
+    description = models.TextField(_('description'), blank=True)
+    promotion_type = models.CharField(
+        _('promotion type'),
+        max_length=20,
+        choices=PROMOTION_TYPES,
+        default='percentage'
+    )
+    value = models.DecimalField(
+        _('value'),
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0'),
+        validators=[MinValueValidator(Decimal('0'))]
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='promotions'
+    )
+    category = models.ForeignKey(
+        'products.Category',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='promotions'
+    )
+    brand = models.ForeignKey(
+        'products.Brand',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='promotions'
+    )
+    minimum_amount = models.DecimalField(
+        _('minimum amount'),
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    buy_quantity = models.PositiveIntegerField(_('buy quantity'), default=1)
+    get_quantity = models.PositiveIntegerField(_('get quantity'), default=1)
+    tiers = models.JSONField(_('tiers'), default=list, blank=True)
+    is_exclusive = models.BooleanField(_('exclusive'), default=True)
+    is_active = models.BooleanField(_('active'), default=True)
+    valid_from = models.DateTimeField(_('valid from'))
+    valid_until = models.DateTimeField(_('valid until'))
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Promotion')
+        verbose_name_plural = _('Promotions')
+        db_table = 'promotions'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'valid_until'], name='promotion_active_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        scopes = [field for field in ('product', 'category', 'brand') if getattr(self, f'{field}_id')]
+        if len(scopes) > 1:
+            raise ValidationError(_('A promotion covers one product, category or brand at most.'))
+        if self.valid_until and self.valid_from and self.valid_until <= self.valid_from:
+            raise ValidationError({'valid_until': _('Must be after valid from.')})
+        if self.promotion_type == 'tiered':
+            try:
+                tiers = [
+                    (Decimal(str(tier['minimum_amount'])), Decimal(str(tier['percentage'])))
+                    for tier in self.tiers
+                ]
+            except (TypeError, KeyError, ArithmeticError):
+                tiers = None
+            if not tiers:
+                raise ValidationError({
+                    'tiers': _('List tiers as {"minimum_amount": ..., "percentage": ...}.')
+                })
+        if self.promotion_type == 'bogo' and not self.buy_quantity:
+            raise ValidationError({'buy_quantity': _('Must be at least 1.')})
+
+    def save(self, *args, **kwargs):
+        """
+        Save the promotion and recompile the active promotions.
+        """
+        from .engine import invalidate_on_commit
+
+        super().save(*args, **kwargs)
+        invalidate_on_commit()
+
+    def delete(self, *args, **kwargs):
+        from .engine import invalidate_on_commit
+
+        invalidate_on_commit()
+        return super().delete(*args, **kwargs)
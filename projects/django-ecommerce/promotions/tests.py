@@ -0,0 +1,184 @@
+from decimal import Decimal
+from itertools import count
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from .engine import CompiledPromotions, Line, _choose_exclusive, evaluate
+from .models import Promotion
+
+_ids = count(1)
+
+
+def promotion(promotion_type, value=0, **kwargs):
+    return Promotion(
+        pk=next(_ids), name=kwargs.pop('name', promotion_type),
+        promotion_type=promotion_type, value=Decimal(value), **kwargs
+    )
+
+
+def discounts(evaluation):
+    return {applied['name']: applied['discount'] for applied in evaluation.promotions}
+
+
+class ChooseExclusiveTests(SimpleTestCase):
+    # The first promotion covers both lines the other two cover one each of.
+    support = np.array([[1, 1, 0], [1, 0, 0], [0, 1, 0]], dtype=bool)
+    amounts = np.array([10.0, 6.0, 6.0])
+
+    def test_exact_finds_the_best_combination(self):
+        chosen = _choose_exclusive(self.support, self.amounts)
+        self.assertEqual(chosen.tolist(), [False, True, True])
+
+    @override_settings(PROMOTIONS_EXACT_LIMIT=2)
+    def test_greedy_takes_the_largest_first(self):
+        chosen = _choose_exclusive(self.support, self.amounts)
+        self.assertEqual(chosen.tolist(), [True, False, False])
+
+
+class EvaluateTests(SimpleTestCase):
+
+    def setUp(self):
+        # Products 1 and 2 are in category 1, product 3 in category 2;
+        # all three are brand 1.
+        self.kettle = Line(1, 1, 1, 3, Decimal('10.00'))
+        self.toaster = Line(2, 1, 1, 2, Decimal('11.00'))
+        self.blender = Line(3, 2, 1, 10, Decimal('12.00'))
+
+    def evaluate(self, lines, *promotions):
+        return evaluate(lines, CompiledPromotions(list(promotions)))
+
+    def test_no_promotions(self):
+        evaluation = self.evaluate([self.kettle])
+        self.assertEqual(evaluation.discount, Decimal('0.00'))
+        self.assertEqual(evaluation.line_discounts, [Decimal('0.00')])
+        self.assertEqual(evaluation.promotions, [])
+
+    def test_scopes_and_stacking(self):
+        evaluation = self.evaluate(
+            [self.kettle, self.toaster, self.blender],
+            promotion('percentage', 10, name='kettle', product_id=1, is_exclusive=False),
+            promotion('percentage', 5, name='category', category_id=2, is_exclusive=False),
+            promotion('fixed', 13, name='brand', brand_id=1, is_exclusive=False),
+            promotion('fixed', 100, name='other brand', brand_id=2, is_exclusive=False),
+        )
+        # The fixed 13.00 is shared in proportion to the lines' totals of
+        # 30.00, 22.00 and 120.00 out of 172.00.
+        self.assertEqual(
+            discounts(evaluation),
+            {'kettle': Decimal('3.00'), 'category': Decimal('6.00'), 'brand': Decimal('13.00')}
+        )
+        self.assertEqual(
+            evaluation.line_discounts, [Decimal('5.27'), Decimal('1.66'), Decimal('15.07')]
+        )
+        self.assertEqual(evaluation.discount, Decimal('22.00'))
+        self.assertEqual(
+            [applied['name'] for applied in evaluation.promotions], ['brand', 'category', 'kettle']
+        )
+
+    def test_exclusive_promotions_overlapping_on_one_line(self):
+        category = promotion('percentage', 10, name='category', category_id=1)
+        bogo = promotion(
+            'bogo', 100, name='bogo', product_id=1, buy_quantity=2, get_quantity=1
+        )
+        tiered = promotion('tiered', name='tiered', is_exclusive=False, tiers=[
+            {'minimum_amount': '50', 'percentage': '5'},
+            {'minimum_amount': '100', 'percentage': '15'},
+        ])
+
+        # Both cover the kettle: one free kettle (10.00) beats 10% of the
+        # category (3.00 + 2.20). The tiered promotion stacks on top.
+        evaluation = self.evaluate([self.kettle, self.toaster], category, bogo, tiered)
+        self.assertEqual(
+            discounts(evaluation), {'bogo': Decimal('10.00'), 'tiered': Decimal('2.60')}
+        )
+        self.assertEqual(evaluation.line_discounts, [Decimal('11.50'), Decimal('1.10')])
+        self.assertEqual(evaluation.discount, Decimal('12.60'))
+
+        # Ten more in the category make 10% of it (17.20) the better choice.
+        blenders = Line(3, 1, 1, 10, Decimal('12.00'))
+        evaluation = self.evaluate([self.kettle, self.toaster, blenders], category, bogo, tiered)
+        self.assertEqual(
+            discounts(evaluation), {'category': Decimal('17.20'), 'tiered': Decimal('25.80')}
+        )
+        self.assertEqual(evaluation.discount, Decimal('43.00'))
+
+    def test_exact_and_greedy_choice(self):
+        lines = [Line(1, 1, 1, 1, Decimal('20.00')), Line(2, 1, 1, 1, Decimal('20.00'))]
+        promotions = [
+            promotion('fixed', 10, name='category', category_id=1),
+            promotion('fixed', 6, name='first', product_id=1),
+            promotion('fixed', 6, name='second', product_id=2),
+        ]
+
+        evaluation = self.evaluate(lines, *promotions)
+        self.assertEqual(
+            discounts(evaluation), {'first': Decimal('6.00'), 'second': Decimal('6.00')}
+        )
+
+        with self.settings(PROMOTIONS_EXACT_LIMIT=2):
+            evaluation = self.evaluate(lines, *promotions)
+        self.assertEqual(discounts(evaluation), {'category': Decimal('10.00')})
+
+    def test_bogo(self):
+        free = promotion('bogo', 100, name='free', product_id=1, buy_quantity=2, get_quantity=1)
+        seven = Line(1, 1, 1, 7, Decimal('10.00'))
+        # Two complete sets of three: two kettles free.
+        self.assertEqual(self.evaluate([seven], free).discount, Decimal('20.00'))
+        self.assertEqual(
+            self.evaluate([self.kettle._replace(quantity=2)], free).discount, Decimal('0.00')
+        )
+
+        half = promotion('bogo', 50, name='half', product_id=1, buy_quantity=1, get_quantity=1)
+        # Three pairs, the second of each at half price.
+        self.assertEqual(self.evaluate([seven], half).discount, Decimal('15.00'))
+
+    def test_tiered(self):
+        tiered = promotion('tiered', tiers=[
+            {'minimum_amount': '100', 'percentage': '15'},
+            {'minimum_amount': '50', 'percentage': '5'},
+        ])
+        cases = [
+            (Line(1, 1, 1, 1, Decimal('49.99')), Decimal('0.00')),
+            (Line(1, 1, 1, 1, Decimal('50.00')), Decimal('2.50')),
+            (Line(1, 1, 1, 2, Decimal('50.00')), Decimal('15.00')),
+        ]
+        for line, discount in cases:
+            with self.subTest(total=line.quantity * line.unit_price):
+                self.assertEqual(self.evaluate([line], tiered).discount, discount)
+
+    def test_minimum_amount(self):
+        fixed = promotion('fixed', 5, minimum_amount=Decimal('52.01'))
+        self.assertEqual(self.evaluate([self.kettle, self.toaster], fixed).discount, Decimal('0.00'))
+        fixed.minimum_amount = Decimal('52.00')
+        self.assertEqual(self.evaluate([self.kettle, self.toaster], fixed).discount, Decimal('5.00'))
+
+    def test_lines_are_not_discounted_below_zero(self):
+        evaluation = self.evaluate(
+            [self.kettle, self.toaster],
+            promotion('fixed', 1000, name='huge', is_exclusive=False),
+            promotion('percentage', 50, name='half', is_exclusive=False),
+        )
+        self.assertEqual(evaluation.line_discounts, [Decimal('30.00'), Decimal('22.00')])
+        self.assertEqual(evaluation.discount, Decimal('52.00'))
+        self.assertEqual(sum(discounts(evaluation).values()), Decimal('52.00'))
+
+    def test_applied_amounts_add_up_to_the_rounded_discount(self):
+        # Each promotion takes 1.5 cents off a 0.15 line, 3 cents together.
+        evaluation = self.evaluate(
+            [Line(1, 1, 1, 1, Decimal('0.15'))],
+            promotion('percentage', 10, name='first', is_exclusive=False),
+            promotion('percentage', 10, name='second', is_exclusive=False),
+        )
+        self.assertEqual(evaluation.discount, Decimal('0.03'))
+        self.assertEqual(
+            discounts(evaluation), {'first': Decimal('0.02'), 'second': Decimal('0.01')}
+        )
+
+        # A fixed 1.00 shared by three equal lines rounds each share down.
+        evaluation = self.evaluate(
+            [Line(product_id, 1, 1, 1, Decimal('10.00')) for product_id in (1, 2, 3)],
+            promotion('fixed', 1, name='fixed'),
+        )
+        self.assertEqual(evaluation.line_discounts, [Decimal('0.33')] * 3)
+        self.assertEqual(discounts(evaluation), {'fixed': Decimal('0.99')})